@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QGISSolr
+                                 A QGIS plugin
+ This plugin allows the user to run and load SOLR queries into QGIS
+                              -------------------
+        begin                : 2018-04-02
+        git sha              : $Format:%H$
+        copyright            : (C) 2018 by Brian Maddox
+        email                : brian.maddox@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+Extracts search results to files without QGIS running, for scheduled jobs. Run it from the directory holding the
+plugin with the Python of a QGIS installation, for example:
+
+    python -m QGISSolr.extract --query "harbor" --table places --country FRA --output /data/harbors.fgb
+"""
+
+import argparse
+import os.path
+import sys
+
+
+# ******************************************************************************************************************
+def ParseBounds(inText: str) -> tuple:
+    """
+    Parse a bounding box argument
+    :param inText: string of xMin,yMin,xMax,yMax in degrees
+    :return: tuple of floats
+    """
+
+    try:
+        bounds = tuple(float(tValue) for tValue in inText.split(","))
+    except ValueError:
+        bounds = ()
+
+    if len(bounds) != 4:
+        raise argparse.ArgumentTypeError("expected xMin,yMin,xMax,yMax in degrees, got {}".format(inText))
+
+    return bounds
+
+
+# ******************************************************************************************************************
+def CreateParser() -> argparse.ArgumentParser:
+    """
+    Create the command line parser
+    :return: argparse.ArgumentParser
+    """
+
+    parser = argparse.ArgumentParser(description="Extract SOLR search results to FlatGeobuf, GeoPackage or "
+                                                 "GeoParquet files.")
+    parser.add_argument("--query", required=True, help="search terms")
+    parser.add_argument("--output", required=True, help="file to write, .fgb, .gpkg or .parquet. With several "
+                                                        "tables the table is appended to the name.")
+    parser.add_argument("--table", action="append", dest="tables", help="table to search, may be repeated. "
+                                                                        "All configured tables by default.")
+    parser.add_argument("--country", default="", help="alpha2, alpha3 or numeric code of the country to search")
+    parser.add_argument("--bbox", type=ParseBounds, help="xMin,yMin,xMax,yMax in degrees to search")
+    parser.add_argument("--workers", type=int, default=4, help="pages fetched at the same time per table")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.realpath(__file__)), "config.ini"),
+                        help="configuration file, the plugin's config.ini by default")
+    parser.add_argument("--quiet", action="store_true", help="do not report progress")
+
+    return parser
+
+
+# ******************************************************************************************************************
+def main(inArguments: list = None) -> int:
+    """
+    Run an extraction
+    :param inArguments: list of command line arguments, sys.argv by default
+    :return: exit status
+    """
+
+    arguments = CreateParser().parse_args(inArguments)
+
+    from qgis.core import QgsApplication
+    from . import iso3166
+    from .managers import ExtractionManager, QueryError
+
+    application = QgsApplication([], False)
+    application.initQgis()
+
+    try:
+        country = ""
+        if arguments.country:
+            if arguments.country not in iso3166.countries:
+                raise ValueError("Unknown country {}".format(arguments.country))
+            country = iso3166.countries.get(arguments.country).alpha3
+
+        def Progress(inTable, inWritten, inHits):
+            if not arguments.quiet:
+                sys.stderr.write("\r{}: {} of {}".format(inTable, inWritten, inHits))
+                sys.stderr.flush()
+
+        outcome = ExtractionManager(arguments.config).Extract(arguments.query, arguments.output, arguments.tables,
+                                                              country, arguments.bbox, arguments.workers, Progress)
+
+        if not arguments.quiet:
+            sys.stderr.write("\n")
+
+        for tTable, (path, written, seconds) in outcome.items():
+            print("{}\t{}\t{}\t{:.1f}\t{:.0f}".format(tTable, path, written, seconds,
+                                                     written / seconds if seconds else 0.0))
+
+        return 0
+
+    except (QueryError, ValueError) as e:
+        sys.stderr.write("extract: {}\n".format(e))
+        return 2
+
+    finally:
+        application.exitQgis()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
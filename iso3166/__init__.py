@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 
 from builtins import object
-import re
+from bisect import bisect_left
 from numbers import Integral
+import unicodedata
 from collections import namedtuple
 
+from .bounds import bounds as _bounds
+
 __all__ = ["countries"]
 
 try:
@@ -12,8 +15,18 @@ try:
 except NameError:
     str = str
 
-Country = namedtuple('Country',
-                     'name alpha2 alpha3 numeric apolitical_name')
+
+class Country(namedtuple('Country',
+                         'name alpha2 alpha3 numeric apolitical_name')):
+    __slots__ = ()
+
+    @property
+    def bbox(self):
+        """Approximate (min_lon, min_lat, max_lon, max_lat) of the country in
+        WGS84, or None if unknown. min_lon > max_lon when the box crosses the
+        antimeridian."""
+        return _bounds.get(self.alpha3)
+
 
 _records = [
     Country(u"Afghanistan", "AF", "AFG", "004", u"Afghanistan"),
@@ -334,6 +347,75 @@ countries_by_name = _by_name
 countries_by_apolitical_name = _by_apolitical_name
 
 
+def _normalize(text):
+    """Lower case text without accents or punctuation, for searching."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c if c.isalnum() else " "
+                   for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+def _trigrams(text):
+    padded = "  %s " % text
+    return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class _SearchIndex(object):
+    """Sorted keys for prefix matching and a trigram index for fuzzy
+    matching of the names, apolitical names and codes of the countries.
+    Every word of a name is a key too, so "korea" finds "Korea, Republic
+    of"."""
+
+    def __init__(self, records):
+        keys = set()
+        self.trigrams = {}
+        for i, r in enumerate(records):
+            names = set(_normalize(t) for t in (r.name, r.apolitical_name))
+            for name in names:
+                words = name.split()
+                for j in range(len(words)):
+                    keys.add((" ".join(words[j:]), i))
+                for t in _trigrams(name):
+                    self.trigrams.setdefault(t, set()).add(i)
+            for code in (r.alpha2, r.alpha3, r.numeric):
+                keys.add((code.lower(), i))
+
+        self.keys = sorted(keys)
+        self.records = records
+
+    def prefix(self, text):
+        """Indexes of the records with a key starting with text, in
+        the order of the shortest matching key."""
+        best = {}
+        i = bisect_left(self.keys, (text,))
+        while i < len(self.keys) and self.keys[i][0].startswith(text):
+            key, r = self.keys[i]
+            best[r] = min(best.get(r, len(key)), len(key))
+            i += 1
+        return sorted(best, key=lambda r: (best[r], self.records[r].name))
+
+    def fuzzy(self, text, threshold=0.5):
+        """Indexes of the records sharing at least threshold of the trigrams
+        of text, best match first and shorter names before longer ones."""
+        wanted = _trigrams(text)
+        shared = {}
+        for t in wanted:
+            for r in self.trigrams.get(t, ()):
+                shared[r] = shared.get(r, 0) + 1
+
+        scored = []
+        for r, count in shared.items():
+            score = float(count) / len(wanted)
+            if score >= threshold:
+                name = self.records[r].name
+                scored.append((-score, len(name), name, r))
+
+        return [r for _, _, _, r in sorted(scored)]
+
+
+_search_index = None
+
+
 NOT_FOUND = object()
 
 
@@ -346,7 +428,7 @@ class _CountryLookup(object):
             k = key.upper()
             if len(k) == 2:
                 r = _by_alpha2.get(k, default)
-            elif len(k) == 3 and re.match(r"[0-9]{3}", k):
+            elif len(k) == 3 and k.isdigit():
                 r = _by_numeric.get(k, default)
             elif len(k) == 3:
                 r = _by_alpha3.get(k, default)
@@ -364,6 +446,25 @@ class _CountryLookup(object):
 
     __getitem__ = get
 
+    def search(self, text, limit=10):
+        """Countries whose name, apolitical name, a word of either or a code
+        starts with text, followed by countries with a similar name. The
+        index is built on the first search."""
+        global _search_index
+        if _search_index is None:
+            _search_index = _SearchIndex(_records)
+
+        key = _normalize(text)
+        if not key:
+            return []
+
+        found = _search_index.prefix(key)
+        if len(found) < limit:
+            seen = set(found)
+            found += [r for r in _search_index.fuzzy(key) if r not in seen]
+
+        return [_records[r] for r in found[:limit]]
+
     def __len__(self):
         return len(_records)
 
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Approximate bounding boxes of the ISO 3166 countries in WGS84, as
+(min_lon, min_lat, max_lon, max_lat) rounded outwards to 0.1 degree.
+Outlying islands that belong to a country are included. Boxes that cross
+the antimeridian have min_lon > max_lon.
+"""
+
+bounds = {
+    "AFG": (60.4, 29.3, 75.0, 38.5),
+    "ALA": (19.2, 59.7, 21.4, 60.7),
+    "ALB": (19.2, 39.6, 21.1, 42.7),
+    "DZA": (-8.7, 18.9, 12.0, 37.2),
+    "ASM": (-171.2, -14.6, -168.1, -11.0),
+    "AND": (1.4, 42.4, 1.8, 42.7),
+    "AGO": (11.6, -18.1, 24.1, -4.3),
+    "AIA": (-63.5, 18.1, -62.9, 18.6),
+    "ATA": (-180.0, -90.0, 180.0, -60.0),
+    "ATG": (-62.4, 16.9, -61.6, 17.8),
+    "ARG": (-73.6, -55.1, -53.6, -21.7),
+    "ARM": (43.4, 38.8, 46.7, 41.4),
+    "ABW": (-70.1, 12.4, -69.8, 12.7),
+    "AUS": (112.9, -54.8, 159.2, -9.1),
+    "AUT": (9.5, 46.3, 17.2, 49.1),
+    "AZE": (44.7, 38.3, 50.7, 41.9),
+    "BHS": (-80.5, 20.9, -72.7, 27.3),
+    "BHR": (50.3, 25.5, 50.9, 26.4),
+    "BGD": (88.0, 20.6, 92.7, 26.7),
+    "BRB": (-59.7, 13.0, -59.4, 13.4),
+    "BLR": (23.1, 51.2, 32.8, 56.2),
+    "BEL": (2.5, 49.4, 6.5, 51.6),
+    "BLZ": (-89.3, 15.8, -87.4, 18.5),
+    "BEN": (0.7, 6.1, 3.9, 12.5),
+    "BMU": (-64.9, 32.2, -64.6, 32.4),
+    "BTN": (88.7, 26.7, 92.2, 28.4),
+    "BOL": (-69.7, -23.0, -57.4, -9.6),
+    "BES": (-68.5, 12.0, -62.9, 17.7),
+    "BIH": (15.7, 42.5, 19.7, 45.3),
+    "BWA": (19.9, -27.0, 29.4, -17.7),
+    "BVT": (3.2, -54.5, 3.5, -54.3),
+    "BRA": (-74.0, -33.8, -28.8, 5.3),
+    "IOT": (71.2, -7.5, 72.6, -5.2),
+    "BRN": (114.0, 4.0, 115.4, 5.1),
+    "BGR": (22.3, 41.2, 28.7, 44.3),
+    "BFA": (-5.6, 9.4, 2.5, 15.1),
+    "BDI": (28.9, -4.5, 30.9, -2.3),
+    "KHM": (102.3, 9.9, 107.7, 14.7),
+    "CMR": (8.4, 1.6, 16.3, 13.1),
+    "CAN": (-141.1, 41.6, -52.6, 83.2),
+    "CPV": (-25.4, 14.8, -22.6, 17.3),
+    "CYM": (-81.5, 19.2, -79.7, 19.8),
+    "CAF": (14.4, 2.2, 27.5, 11.1),
+    "TCD": (13.4, 7.4, 24.0, 23.5),
+    "CHL": (-109.5, -56.0, -66.4, -17.4),
+    "CHN": (73.4, 18.1, 134.8, 53.6),
+    "CXR": (105.5, -10.6, 105.8, -10.4),
+    "CCK": (96.8, -12.3, 97.0, -11.8),
+    "COL": (-81.9, -4.3, -66.8, 13.4),
+    "COM": (43.2, -12.5, 44.6, -11.3),
+    "COG": (11.1, -5.1, 18.7, 3.8),
+    "COD": (12.2, -13.5, 31.4, 5.4),
+    "COK": (-166.0, -22.0, -157.3, -8.9),
+    "CRI": (-87.2, 5.4, -82.5, 11.3),
+    "CIV": (-8.7, 4.3, -2.4, 10.8),
+    "HRV": (13.4, 42.3, 19.5, 46.6),
+    "CUB": (-85.0, 19.8, -74.1, 23.3),
+    "CUW": (-69.2, 12.0, -68.7, 12.4),
+    "CYP": (32.2, 34.5, 34.7, 35.8),
+    "CZE": (12.0, 48.5, 18.9, 51.1),
+    "DNK": (8.0, 54.5, 15.3, 57.8),
+    "DJI": (41.7, 10.9, 43.5, 12.8),
+    "DMA": (-61.5, 15.2, -61.2, 15.7),
+    "DOM": (-72.1, 17.4, -68.3, 20.0),
+    "ECU": (-92.1, -5.1, -75.1, 1.7),
+    "EGY": (24.6, 21.7, 37.0, 31.7),
+    "SLV": (-90.2, 13.1, -87.6, 14.5),
+    "GNQ": (5.6, -1.5, 11.4, 3.8),
+    "ERI": (36.4, 12.3, 43.2, 18.1),
+    "EST": (21.7, 57.5, 28.3, 59.8),
+    "ETH": (32.9, 3.4, 48.0, 15.0),
+    "FLK": (-61.4, -52.5, -57.6, -50.9),
+    "FRO": (-7.7, 61.3, -6.2, 62.5),
+    "FJI": (176.8, -21.1, -178.2, -12.4),
+    "FIN": (20.5, 59.7, 31.6, 70.1),
+    "FRA": (-5.2, 41.3, 9.6, 51.1),
+    "GUF": (-54.6, 2.1, -51.6, 5.8),
+    "PYF": (-154.8, -27.7, -134.9, -7.8),
+    "ATF": (39.6, -50.1, 77.6, -11.5),
+    "GAB": (8.6, -4.0, 14.6, 2.4),
+    "GMB": (-16.9, 13.0, -13.7, 13.9),
+    "GEO": (39.9, 41.0, 46.8, 43.6),
+    "DEU": (5.8, 47.2, 15.1, 55.1),
+    "GHA": (-3.3, 4.7, 1.2, 11.2),
+    "GIB": (-5.4, 36.1, -5.3, 36.2),
+    "GRC": (19.3, 34.8, 29.7, 41.8),
+    "GRL": (-73.1, 59.7, -11.3, 83.7),
+    "GRD": (-61.8, 11.9, -61.4, 12.6),
+    "GLP": (-61.9, 15.8, -61.0, 16.6),
+    "GUM": (144.6, 13.2, 145.0, 13.7),
+    "GTM": (-92.3, 13.7, -88.2, 17.9),
+    "GGY": (-2.7, 49.4, -2.1, 49.8),
+    "GIN": (-15.1, 7.1, -7.6, 12.7),
+    "GNB": (-16.8, 10.8, -13.6, 12.7),
+    "GUY": (-61.5, 1.1, -56.4, 8.6),
+    "HTI": (-74.5, 18.0, -71.6, 20.1),
+    "HMD": (73.2, -53.2, 73.9, -52.9),
+    "VAT": (12.4, 41.9, 12.5, 42.0),
+    "HND": (-89.4, 12.9, -83.1, 17.5),
+    "HKG": (113.8, 22.1, 114.5, 22.6),
+    "HUN": (16.1, 45.7, 22.9, 48.6),
+    "ISL": (-24.6, 63.3, -13.4, 66.6),
+    "IND": (68.1, 6.7, 97.5, 37.1),
+    "IDN": (94.9, -11.1, 141.1, 6.1),
+    "IRN": (44.0, 25.0, 63.4, 39.8),
+    "IRQ": (38.7, 29.0, 48.7, 37.4),
+    "IRL": (-10.7, 51.4, -5.9, 55.4),
+    "IMN": (-4.8, 54.0, -4.3, 54.5),
+    "ISR": (34.2, 29.4, 35.9, 33.4),
+    "ITA": (6.6, 35.4, 18.6, 47.1),
+    "JAM": (-78.4, 17.7, -76.1, 18.6),
+    "JPN": (122.9, 20.4, 154.0, 45.6),
+    "JEY": (-2.3, 49.1, -2.0, 49.3),
+    "JOR": (34.9, 29.1, 39.3, 33.4),
+    "KAZ": (46.4, 40.5, 87.4, 55.5),
+    "KEN": (33.9, -4.8, 41.9, 5.1),
+    "KIR": (169.5, -11.5, -150.2, 4.8),
+    "PRK": (124.1, 37.6, 130.7, 43.1),
+    "KOR": (124.6, 33.1, 131.9, 38.7),
+    "KWT": (46.5, 28.5, 48.5, 30.2),
+    "KGZ": (69.2, 39.1, 80.3, 43.3),
+    "LAO": (100.0, 13.9, 107.7, 22.6),
+    "LVA": (20.9, 55.6, 28.3, 58.1),
+    "LBN": (35.1, 33.0, 36.7, 34.7),
+    "LSO": (27.0, -30.7, 29.5, -28.5),
+    "LBR": (-11.5, 4.3, -7.3, 8.6),
+    "LBY": (9.3, 19.5, 25.2, 33.2),
+    "LIE": (9.4, 47.0, 9.7, 47.3),
+    "LTU": (20.9, 53.8, 26.9, 56.5),
+    "LUX": (5.7, 49.4, 6.6, 50.2),
+    "MAC": (113.5, 22.1, 113.6, 22.3),
+    "MKD": (20.4, 40.8, 23.1, 42.4),
+    "MDG": (43.2, -25.7, 50.5, -11.9),
+    "MWI": (32.6, -17.2, 35.9, -9.3),
+    "MYS": (99.6, 0.8, 119.3, 7.4),
+    "MDV": (72.6, -0.7, 73.8, 7.2),
+    "MLI": (-12.3, 10.1, 4.3, 25.0),
+    "MLT": (14.1, 35.8, 14.6, 36.1),
+    "MHL": (160.7, 4.5, 172.2, 14.7),
+    "MTQ": (-61.3, 14.3, -60.8, 14.9),
+    "MRT": (-17.1, 14.7, -4.8, 27.3),
+    "MUS": (56.5, -20.6, 63.6, -10.3),
+    "MYT": (45.0, -13.1, 45.3, -12.6),
+    "MEX": (-118.5, 14.5, -86.7, 32.8),
+    "FSM": (137.3, 0.9, 163.1, 10.1),
+    "MDA": (26.6, 45.4, 30.2, 48.5),
+    "MCO": (7.4, 43.7, 7.5, 43.8),
+    "MNG": (87.7, 41.5, 119.9, 52.2),
+    "MNE": (18.4, 41.8, 20.4, 43.6),
+    "MSR": (-62.3, 16.6, -62.1, 16.9),
+    "MAR": (-13.2, 27.6, -1.0, 35.9),
+    "MOZ": (30.2, -26.9, 40.9, -10.4),
+    "MMR": (92.1, 9.6, 101.2, 28.6),
+    "NAM": (11.7, -29.0, 25.3, -16.9),
+    "NRU": (166.9, -0.6, 167.0, -0.5),
+    "NPL": (80.0, 26.3, 88.2, 30.5),
+    "NLD": (3.3, 50.7, 7.3, 53.6),
+    "NCL": (163.5, -22.8, 171.4, -19.5),
+    "NZL": (165.8, -52.7, -176.1, -29.2),
+    "NIC": (-87.7, 10.7, -82.6, 15.1),
+    "NER": (0.1, 11.6, 16.0, 23.6),
+    "NGA": (2.6, 4.2, 14.7, 13.9),
+    "NIU": (-170.0, -19.2, -169.7, -18.9),
+    "NFK": (167.9, -29.2, 168.0, -29.0),
+    "MNP": (144.8, 14.1, 146.1, 20.6),
+    "NOR": (4.5, 57.9, 31.2, 71.2),
+    "OMN": (51.9, 16.6, 59.9, 26.4),
+    "PAK": (60.8, 23.6, 77.9, 37.1),
+    "PLW": (131.1, 2.8, 134.8, 8.2),
+    "PSE": (34.2, 31.2, 35.6, 32.6),
+    "PAN": (-83.1, 7.2, -77.1, 9.7),
+    "PNG": (140.8, -11.7, 159.5, -0.8),
+    "PRY": (-62.7, -27.7, -54.2, -19.2),
+    "PER": (-81.4, -18.4, -68.6, 0.0),
+    "PHL": (116.9, 4.5, 126.7, 21.2),
+    "PCN": (-130.8, -25.1, -124.7, -23.9),
+    "POL": (14.1, 49.0, 24.2, 54.9),
+    "PRT": (-31.3, 30.0, -6.1, 42.2),
+    "PRI": (-67.3, 17.9, -65.2, 18.6),
+    "QAT": (50.7, 24.4, 51.7, 26.2),
+    "REU": (55.2, -21.4, 55.9, -20.8),
+    "ROU": (20.2, 43.6, 29.8, 48.3),
+    "RUS": (19.6, 41.1, -169.0, 81.9),
+    "RWA": (28.8, -2.9, 30.9, -1.0),
+    "BLM": (-62.9, 17.8, -62.8, 18.0),
+    "SHN": (-14.5, -40.4, -5.6, -7.8),
+    "KNA": (-62.9, 17.0, -62.5, 17.5),
+    "LCA": (-61.1, 13.7, -60.8, 14.2),
+    "MAF": (-63.2, 18.0, -63.0, 18.2),
+    "SPM": (-56.5, 46.7, -56.1, 47.2),
+    "VCT": (-61.5, 12.5, -61.1, 13.4),
+    "WSM": (-172.8, -14.1, -171.4, -13.4),
+    "SMR": (12.4, 43.8, 12.6, 44.0),
+    "STP": (6.4, -0.1, 7.5, 1.8),
+    "SAU": (34.5, 16.3, 55.7, 32.2),
+    "SEN": (-17.6, 12.3, -11.3, 16.7),
+    "SRB": (18.8, 42.2, 23.1, 46.2),
+    "SYC": (46.2, -10.3, 56.3, -3.7),
+    "SLE": (-13.4, 6.9, -10.2, 10.0),
+    "SGP": (103.6, 1.1, 104.1, 1.5),
+    "SXM": (-63.2, 18.0, -63.0, 18.1),
+    "SVK": (16.8, 47.7, 22.6, 49.7),
+    "SVN": (13.3, 45.4, 16.7, 46.9),
+    "SLB": (155.5, -12.4, 170.3, -5.0),
+    "SOM": (40.9, -1.7, 51.5, 12.1),
+    "ZAF": (16.4, -47.0, 38.0, -22.1),
+    "SGS": (-38.1, -59.5, -26.2, -53.9),
+    "SSD": (23.4, 3.4, 36.0, 12.3),
+    "ESP": (-18.2, 27.6, 4.4, 43.8),
+    "LKA": (79.6, 5.9, 81.9, 9.9),
+    "SDN": (21.8, 8.6, 38.7, 22.3),
+    "SUR": (-58.1, 1.8, -53.9, 6.1),
+    "SJM": (-9.1, 70.8, 33.6, 80.9),
+    "SWZ": (30.7, -27.4, 32.2, -25.7),
+    "SWE": (10.9, 55.3, 24.2, 69.1),
+    "CHE": (5.9, 45.8, 10.5, 47.9),
+    "SYR": (35.7, 32.3, 42.4, 37.4),
+    "TWN": (118.2, 21.8, 122.1, 26.4),
+    "TJK": (67.3, 36.6, 75.2, 41.1),
+    "TZA": (29.3, -11.8, 40.5, -0.9),
+    "THA": (97.3, 5.6, 105.7, 20.5),
+    "TLS": (124.0, -9.6, 127.4, -8.1),
+    "TGO": (-0.2, 6.1, 1.9, 11.2),
+    "TKL": (-172.6, -9.5, -171.1, -8.5),
+    "TON": (-176.3, -22.4, -173.7, -15.5),
+    "TTO": (-62.0, 10.0, -60.5, 11.4),
+    "TUN": (7.5, 30.2, 11.6, 37.6),
+    "TUR": (25.6, 35.8, 44.9, 42.2),
+    "TKM": (52.4, 35.1, 66.7, 42.8),
+    "TCA": (-72.5, 21.1, -71.1, 22.0),
+    "TUV": (176.0, -10.8, 179.9, -5.6),
+    "UGA": (29.5, -1.5, 35.1, 4.3),
+    "UKR": (22.1, 44.3, 40.3, 52.4),
+    "ARE": (51.5, 22.6, 56.4, 26.1),
+    "GBR": (-8.7, 49.8, 1.8, 60.9),
+    "USA": (172.4, 18.9, -66.9, 71.4),
+    "UMI": (166.6, -0.4, -75.0, 28.5),
+    "URY": (-58.5, -35.0, -53.1, -30.1),
+    "UZB": (55.9, 37.1, 73.2, 45.6),
+    "VUT": (166.5, -20.3, 170.3, -13.0),
+    "VEN": (-73.4, 0.6, -59.8, 15.7),
+    "VNM": (102.1, 8.4, 109.5, 23.4),
+    "VGB": (-64.9, 18.3, -64.2, 18.8),
+    "VIR": (-65.1, 17.6, -64.5, 18.5),
+    "WLF": (-178.2, -14.4, -176.1, -13.2),
+    "ESH": (-17.2, 20.7, -8.6, 27.7),
+    "YEM": (41.8, 12.1, 54.6, 19.0),
+    "ZMB": (21.9, -18.1, 33.8, -8.2),
+    "ZWE": (25.2, -22.5, 33.1, -15.6),
+}
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+ColumnarPage.py holds the ColumnarPage class that turns a page of Solr documents into one column per field so layer
+features can be built by column index instead of document by document.
+"""
+
+import re
+from qgis.core import QgsGeometry, QgsPointXY
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Joins the values of a multi-valued field into one attribute
+MULTI_VALUE_SEPARATOR = ", "
+
+POINT_REGEX = re.compile(r"^\s*POINT\s*\(\s*([^\s()]+)\s+([^\s()]+)\s*\)\s*$", re.IGNORECASE)
+
+# Blanks out the word and brackets of point WKT, so only the coordinates are left
+POINT_BLANKS = str.maketrans(dict.fromkeys("POINTpoint()", " "))
+
+# Numbers separated by white space
+NUMBERS_REGEX = re.compile(r"(?:\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)*\s*")
+
+
+class ColumnarPage(object):
+    """
+    Class to hold a page of results as columns. Every column has one value per document, None where the document
+    does not have the field. The point coordinates of the geometry field are parsed once into x and y arrays, which
+    are NumPy arrays when NumPy is available so the coordinates are parsed and the bounds computed in vectorized steps.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inResults, inGeomField: str = "the_geom"):
+        """
+        Initialization
+        :param inResults: iterable of Solr documents, such as pysolr.Results
+        :param inGeomField: field holding the WKT geometry
+        """
+
+        self.hits = getattr(inResults, "hits", 0)
+        self.geomField = inGeomField
+
+        docs = list(inResults)
+        fieldNames = dict.fromkeys(tField for doc in docs for tField in doc)
+
+        self.count = len(docs)
+        self.columns = dict((tField, [doc.get(tField) for doc in docs]) for tField in fieldNames)
+
+        self.x, self.y = self.__ParseCoordinates(self.columns.get(inGeomField, [None] * self.count))
+
+    # ******************************************************************************************************************
+    @classmethod
+    def FromColumns(cls, inColumns: dict, inHits: int = 0, inGeomField: str = "the_geom", inX=None, inY=None):
+        """
+        Create a page from columns that were already split, such as those of a spooled page
+        :param inColumns: dictionary of field -> list of values, all of the same length
+        :param inHits: number of documents the search found
+        :param inGeomField: field holding the WKT geometry
+        :param inX: optional x coordinates that were already parsed, NaN where there is no point
+        :param inY: optional y coordinates that were already parsed, NaN where there is no point
+        :return: ColumnarPage
+        """
+
+        page = cls.__new__(cls)
+        page.hits = inHits
+        page.geomField = inGeomField
+        page.columns = inColumns
+        page.count = len(next(iter(inColumns.values()), ()))
+        if inX is not None and inY is not None:
+            page.x, page.y = inX, inY
+        else:
+            page.x, page.y = page.__ParseCoordinates(inColumns.get(inGeomField, [None] * page.count))
+
+        return page
+
+    # ******************************************************************************************************************
+    def __len__(self):
+        return self.count
+
+    # ******************************************************************************************************************
+    def __ParseCoordinates(self, inWkts: list):
+        """
+        Parse the coordinates of point geometries. Missing and non point geometries get NaN coordinates.
+        :param inWkts: list of WKT strings
+        :return: tuple of x and y arrays
+        """
+
+        if numpy is not None:
+            coordinates = self.__ParsePointColumn(inWkts)
+            if coordinates is not None:
+                return coordinates
+
+        nan = float("nan")
+        x = [nan] * len(inWkts)
+        y = [nan] * len(inWkts)
+
+        for index, tWkt in enumerate(inWkts):
+            match = POINT_REGEX.match(tWkt) if isinstance(tWkt, str) else None
+            if match is not None:
+                try:
+                    x[index], y[index] = float(match.group(1)), float(match.group(2))
+                except ValueError:
+                    pass
+
+        if numpy is not None:
+            return numpy.array(x, dtype=numpy.float64), numpy.array(y, dtype=numpy.float64)
+
+        return x, y
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __ParsePointColumn(inWkts: list):
+        """
+        Parse the coordinates of a column where every geometry is a 2D point in one NumPy call. The words and brackets
+        of the WKT are blanked out, which leaves x and y of every point one after the other.
+        :param inWkts: list of WKT strings
+        :return: tuple of x and y arrays, or None if not every geometry is a point written that way
+        """
+
+        count = len(inWkts)
+        if not count or not all(isinstance(tWkt, str) for tWkt in inWkts):
+            return None
+
+        text = "\n".join(inWkts)
+        upper = text.upper()
+        if upper.count("POINT") != count or upper.count("(") != count or upper.count(")") != count:
+            return None
+
+        numbers = text.translate(POINT_BLANKS)
+        if NUMBERS_REGEX.fullmatch(numbers) is None:
+            return None
+
+        coordinates = numpy.fromstring(numbers, dtype=numpy.float64, sep=" ")
+        if len(coordinates) != 2 * count:
+            return None
+
+        return coordinates[0::2].copy(), coordinates[1::2].copy()
+
+    # ******************************************************************************************************************
+    def Decode(self, inDecoder=None):
+        """
+        Convert the columns to attribute values in place. With a decoder each column is converted by its field type,
+        without one every value becomes a string like Solr returned it. The raw values of multi-valued fields are
+        joined into one string either way.
+        :param inDecoder: optional pysolr.SchemaDecoder for the table
+        :return: self
+        """
+
+        for tField, column in self.columns.items():
+            convert = None
+            multiValued = True
+
+            if inDecoder is not None:
+                convert = inDecoder.get_converter(tField)
+                multiValued = inDecoder.get_field_info(tField)[1]
+
+            if multiValued:
+                self.columns[tField] = [None if value is None else self.__JoinValues(value) for value in column]
+            elif convert is not None:
+                self.columns[tField] = [None if value is None else convert(value) for value in column]
+
+        return self
+
+    # ******************************************************************************************************************
+    def GetAttributes(self, inFieldNames: list):
+        """
+        Returns the attribute rows for a layer, with values in the order of the layer fields. Fields of the layer
+        that are not in the page are NULL and fields of the page that are not in the layer are left out.
+        :param inFieldNames: list of the layer field names
+        :return: iterator of attribute lists
+        """
+
+        # zip of no columns would give no rows at all instead of one empty row per document
+        if not inFieldNames:
+            return ([] for _ in range(self.count))
+
+        empty = [None] * self.count
+        return (list(row) for row in zip(*[self.columns.get(tField, empty) for tField in inFieldNames]))
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __JoinValues(inValue) -> str:
+        """
+        Join the values of a multi-valued field the way Solr returned them
+        :param inValue: list of values, or a single value
+        :return: string
+        """
+
+        if isinstance(inValue, (list, tuple)):
+            return MULTI_VALUE_SEPARATOR.join(str(tValue) for tValue in inValue)
+
+        return str(inValue)
+
+    # ******************************************************************************************************************
+    def GetPoints(self) -> list:
+        """
+        Returns the parsed point coordinates as Python floats, ready to build geometries from
+        :return: list of (x, y) tuples, None where the document has no point
+        """
+
+        if numpy is not None:
+            x, y = numpy.asarray(self.x, dtype=numpy.float64), numpy.asarray(self.y, dtype=numpy.float64)
+            valid = ~(numpy.isnan(x) | numpy.isnan(y))
+            return [tPoint if tValid else None for tPoint, tValid in zip(zip(x.tolist(), y.tolist()), valid.tolist())]
+
+        # NaN marks a coordinate that was not parsed
+        return [(tX, tY) if tX == tX and tY == tY else None for tX, tY in zip(self.x, self.y)]
+
+    # ******************************************************************************************************************
+    def GetGeometries(self) -> list:
+        """
+        Build the geometries of the page. Points are created straight from the parsed coordinates, anything else is
+        parsed from its WKT.
+        :return: list of QgsGeometry, None where the document has no geometry
+        """
+
+        geometries = list()
+        wkts = self.columns.get(self.geomField, [None] * self.count)
+
+        for tPoint, tWkt in zip(self.GetPoints(), wkts):
+            if tPoint is not None:
+                geometries.append(QgsGeometry.fromPointXY(QgsPointXY(*tPoint)))
+            elif tWkt:
+                geometry = QgsGeometry.fromWkt(str(tWkt))
+                geometries.append(None if geometry.isNull() else geometry)
+            else:
+                geometries.append(None)
+
+        return geometries
+
+    # ******************************************************************************************************************
+    def GetBounds(self):
+        """
+        Returns the bounds of the parsed point coordinates
+        :return: tuple of xMin, yMin, xMax, yMax, or None if the page has no points
+        """
+
+        if numpy is not None:
+            valid = ~(numpy.isnan(self.x) | numpy.isnan(self.y))
+            if not valid.any():
+                return None
+            x, y = self.x[valid], self.y[valid]
+            return float(x.min()), float(y.min()), float(x.max()), float(y.max())
+
+        points = [(tX, tY) for tX, tY in zip(self.x, self.y) if tX == tX and tY == tY]
+        if not points:
+            return None
+
+        xs, ys = zip(*points)
+        return min(xs), min(ys), max(xs), max(ys)
+
+    # ******************************************************************************************************************
+    def GetRange(self, inField: str):
+        """
+        Returns the range of the numeric values of a decoded column. Values that are not numbers are ignored.
+        :param inField: string of the field name
+        :return: tuple of minimum and maximum, or None if the column has no numbers
+        """
+
+        column = self.columns.get(inField, ())
+
+        if numpy is not None:
+            try:
+                # None becomes NaN, and the positions of the extremes give back the original values and types
+                values = numpy.array(column, dtype=numpy.float64)
+                if not numpy.isnan(values).all():
+                    return column[int(numpy.nanargmin(values))], column[int(numpy.nanargmax(values))]
+                return None
+            except (TypeError, ValueError):
+                pass  # Values that did not decode to numbers, sort them out below
+
+        numbers = [value for value in column
+                   if isinstance(value, (int, float)) and not isinstance(value, bool) and value == value]
+        if not numbers:
+            return None
+
+        return min(numbers), max(numbers)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+ConfigManager.py holds the ConfigManager class that reads and writes the plugin configuration file
+"""
+
+import configparser
+import os
+from collections import namedtuple
+
+# Prefix of the sections holding the settings of a single table
+TABLE_SECTION_PREFIX = "table:"
+
+# Field holding the id of the documents, always returned for tables whose layers can be refreshed
+REFRESH_ID_FIELD = "system_id"
+
+# Settings of a table that are left out unless they are set
+OPTIONAL_TABLE_SETTINGS = ("query_parser", "qf", "mm", "pf", "timestamp_field", "deleted_field")
+
+
+class Configuration(namedtuple("Configuration", "endpoint tables zookeeper writeback warmup spool")):
+    """
+    The values of the [QGISSOLR] section: the default endpoint, list of tables, ZooKeeper hosts, whether edits are
+    written back, whether the cores are warmed up when the plugin loads and whether pages are spooled to disk.
+    """
+
+    __slots__ = ()
+
+
+class ConfigManager(object):
+    """
+    Class to abstract handling of config.ini. The file is parsed again only when its modification time changes, so
+    callers can ask for the configuration every time they need it.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inConfigPath: str):
+        """
+        Initialization
+        :param inConfigPath: path of the configuration file
+        """
+
+        self.configPath = inConfigPath
+        self.config = None
+        self.modifiedTime = None
+
+    # ******************************************************************************************************************
+    def __Load(self):
+        """
+        Parse the configuration file if it changed since it was last read
+        :return: configparser.ConfigParser
+        """
+
+        modifiedTime = os.stat(self.configPath).st_mtime_ns
+
+        if self.config is None or modifiedTime != self.modifiedTime:
+            config = configparser.ConfigParser()
+            config.read(self.configPath)
+
+            self.config = config
+            self.modifiedTime = modifiedTime
+
+        return self.config
+
+    # ******************************************************************************************************************
+    def GetConfiguration(self) -> Configuration:
+        """
+        Get the configuration values
+        :return: Configuration. The tables are those in SOLR_TABLES followed by those only named by a
+                 [table:<name>] section.
+        """
+
+        config = self.__Load()
+
+        endPoint = config.get("QGISSOLR", "SOLR_ENDPOINT")
+        tableList = config.get("QGISSOLR", "SOLR_TABLES").split(",")
+        tableList += [tSection[len(TABLE_SECTION_PREFIX):] for tSection in config.sections()
+                      if tSection.startswith(TABLE_SECTION_PREFIX)
+                      and tSection[len(TABLE_SECTION_PREFIX):] not in tableList]
+        zooKeeperHosts = config.get("QGISSOLR", "SOLR_ZOOKEEPER", fallback="")
+        writeBack = config.getboolean("QGISSOLR", "SOLR_WRITEBACK", fallback=False)
+        warmUp = config.getboolean("QGISSOLR", "SOLR_WARMUP", fallback=False)
+        spool = config.getboolean("QGISSOLR", "SOLR_SPOOL", fallback=False)
+
+        return Configuration(endPoint, tableList, zooKeeperHosts, writeBack, warmUp, spool)
+
+    # ******************************************************************************************************************
+    def GetTableSettings(self, inTables: list) -> dict:
+        """
+        Get the settings of each table from its optional [table:<name>] section. Missing settings get their defaults:
+        the SOLR_ENDPOINT endpoint, the table name without underscores as the core, no authentication, a 60 second
+        timeout, 500 rows per page, all fields and 10 connections. The query parser settings and the timestamp_field and
+        deleted_field used to refresh layers and cc3_bbox are only present when set. With a timestamp_field the chosen fields always
+        include it and system_id.
+        :param inTables: list of tables
+        :return: dictionary of table -> dictionary of settings
+        """
+
+        config = self.__Load()
+
+        endPoint = config.get("QGISSOLR", "SOLR_ENDPOINT")
+
+        settings = dict()
+        for tTable in inTables:
+            section = TABLE_SECTION_PREFIX + tTable
+            values = dict(config.items(section, raw=True)) if config.has_section(section) else dict()
+
+            tableSettings = {tName: values[tName] for tName in OPTIONAL_TABLE_SETTINGS if tName in values}
+
+            tableSettings["endpoint"] = values.get("endpoint", endPoint).rstrip("/")
+            tableSettings["core"] = values.get("core", tTable.replace("_", ""))
+            tableSettings["auth"] = (values["username"], values.get("password", "")) if values.get("username") else None
+            tableSettings["timeout"] = float(values.get("timeout", 60))
+            tableSettings["rows"] = int(values.get("rows", 500))
+            tableSettings["max_connections"] = int(values.get("max_connections", 10))
+            tableSettings["fields"] = [tField.strip() for tField in values.get("fields", "").split(",") if tField.strip()]
+            if "cc3_bbox" in values:
+                tableSettings["cc3_bbox"] = config.getboolean(section, "cc3_bbox")
+
+            # Refreshing a layer needs the id and the timestamp of every document, whatever fields were chosen
+            if tableSettings["fields"] and tableSettings.get("timestamp_field"):
+                tableSettings["fields"] += [tField for tField in (REFRESH_ID_FIELD, tableSettings["timestamp_field"])
+                                            if tField not in tableSettings["fields"]]
+
+            settings[tTable] = tableSettings
+
+        return settings
+
+    # ******************************************************************************************************************
+    def SetConfiguration(self, inEndPoint: str, inTables: str):
+        """
+        Save a new endpoint and table list
+        :param inEndPoint: string of the SOLR endpoint
+        :param inTables: comma separated string of tables
+        :return: None
+        """
+
+        config = self.__Load()
+
+        config.set("QGISSOLR", "SOLR_ENDPOINT", inEndPoint)
+        config.set("QGISSOLR", "SOLR_TABLES", inTables)
+
+        with open(self.configPath, "w") as configfile:
+            config.write(configfile)
+
+        # Some filesystems only keep whole seconds, so do not rely on the new modification time to notice the change
+        self.config = None
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+ConnectionPool.py holds the ConnectionPool class that shares HTTP connections between the tables on the same host.
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ConnectionPool(object):
+    """
+    Class to hand out one requests.Session per Solr host. Every table on a host uses the same session, so its
+    connections are reused across tables instead of each table opening its own. The pool of a host grows to the
+    largest number of connections any of its tables asked for, and blocks instead of opening more. The session
+    leaves TLS verification to each request, so clients sharing it keep their own verify setting.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self):
+        """
+        Initialization
+        """
+
+        self.sessions = dict()  # (scheme, host) -> requests.Session
+        self.poolSizes = dict()  # (scheme, host) -> number of connections
+        self.lock = threading.Lock()
+
+    # ******************************************************************************************************************
+    def GetSession(self, inURL: str, inMaxConnections: int = 10) -> requests.Session:
+        """
+        Returns the session of the host of a URL
+        :param inURL: string of any URL on the host
+        :param inMaxConnections: number of connections the caller may use at the same time
+        :return: requests.Session
+        """
+
+        parts = urlsplit(inURL)
+        key = (parts.scheme, parts.netloc)
+
+        with self.lock:
+            if key not in self.sessions:
+                session = requests.Session()
+                session.stream = False
+                self.sessions[key] = session
+                self.poolSizes[key] = 0
+
+            if inMaxConnections > self.poolSizes[key]:
+                prefix = "{}://{}".format(*key)
+
+                # Close the connections of the smaller pool it replaces
+                if self.poolSizes[key]:
+                    self.sessions[key].get_adapter(prefix).close()
+
+                self.poolSizes[key] = inMaxConnections
+                self.sessions[key].mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=inMaxConnections,
+                                                             pool_block=True))
+
+            return self.sessions[key]
+
+    # ******************************************************************************************************************
+    def Close(self):
+        """
+        Close the connections of every host
+        :return: None
+        """
+
+        with self.lock:
+            for tSession in self.sessions.values():
+                tSession.close()
+
+            self.sessions = dict()
+            self.poolSizes = dict()
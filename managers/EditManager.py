@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+EditManager.py holds the EditManager class that pushes attribute and geometry edits made to loaded layers back to Solr.
+"""
+
+from qgis.core import NULL, Qgis, QgsApplication, QgsMessageLog, QgsTask
+
+
+class EditManager(object):
+    """
+    Class to track edits to layers loaded from Solr. When the user saves their edits the changed features are read
+    from the layer's edit buffer before it is committed and, once QGIS committed them, sent to Solr in the background
+    as atomic updates, so only the edited fields of the edited documents are rewritten. Edits that fail to commit or
+    are rolled back are never sent. Solr needs the id field as its uniqueKey and all fields stored or docValues for
+    atomic updates to work. Multi-valued fields are loaded as one joined string, so their edits are not sent back.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inQueryManager, inQIface, inIdField: str = "system_id", inCommitWithin: int = 10000,
+                 inBatchSize: int = 500, inTableManager=None):
+        """
+        Initialization
+        :param inQueryManager: QueryManager holding the Solr connections
+        :param inQIface: QGIS interface used to report the outcome
+        :param inIdField: field holding the Solr uniqueKey
+        :param inCommitWithin: milliseconds within which Solr should make the updates visible
+        :param inBatchSize: number of documents per update request
+        :param inTableManager: optional TableManager to tell the multi-valued fields from
+        """
+
+        self.queryManager = inQueryManager
+        self.iface = inQIface
+        self.idField = inIdField
+        self.commitWithin = inCommitWithin
+        self.batchSize = inBatchSize
+        self.tableManager = inTableManager
+        self.trackedLayers = dict()  # layer id -> Solr table
+        self.pendingDocs = dict()  # layer id -> documents of the edits being committed
+        self.tasks = list()  # QgsTasks must be referenced from Python until they finish
+
+    # ******************************************************************************************************************
+    def TrackLayer(self, inLayer, inTable: str):
+        """
+        Start tracking edits on a layer loaded from a table
+        :param inLayer: QgsVectorLayer
+        :param inTable: Solr table the layer was loaded from
+        :return: None
+        """
+
+        layerId = inLayer.id()
+        self.trackedLayers[layerId] = inTable
+
+        # The edit buffer is gone once the edits are committed, so the changes are read before
+        inLayer.beforeCommitChanges.connect(lambda *args: self.__CaptureChanges(inLayer))
+        inLayer.afterCommitChanges.connect(lambda: self.__SendChanges(inLayer))
+        inLayer.afterRollBack.connect(lambda: self.pendingDocs.pop(layerId, None))
+        inLayer.willBeDeleted.connect(lambda: self.UntrackLayer(layerId))
+
+    # ******************************************************************************************************************
+    def UntrackLayer(self, inLayerId: str):
+        """
+        Stop sending edits of a layer back to Solr
+        :param inLayerId: id of the layer
+        :return: None
+        """
+
+        self.trackedLayers.pop(inLayerId, None)
+        self.pendingDocs.pop(inLayerId, None)
+
+    # ******************************************************************************************************************
+    def GetChangedDocuments(self, inLayer) -> list:
+        """
+        Build atomic update documents for the features changed in the layer's edit buffer. Features added during the
+        edit session are not in Solr and are skipped, and so are edits of the id field and of multi-valued fields.
+        :param inLayer: QgsVectorLayer in edit mode
+        :return: list of dicts holding the id field and the changed fields
+        """
+
+        editBuffer = inLayer.editBuffer()
+        if editBuffer is None:
+            return list()
+
+        changedAttributes = editBuffer.changedAttributeValues()
+        changedGeometries = editBuffer.changedGeometries()
+
+        fields = inLayer.fields()
+        idIndex = fields.indexOf(self.idField)
+        if idIndex < 0:
+            QgsMessageLog.logMessage("EditManager::GetChangedDocuments: Layer {} has no {} field."
+                                     .format(inLayer.name(), self.idField))
+            return list()
+
+        # Multi-valued fields hold their values joined into one string, which must not overwrite the list in Solr
+        multiValuedFields = set()
+        table = self.trackedLayers.get(inLayer.id())
+        fieldDecoder = self.tableManager.GetFieldDecoder(table) if self.tableManager and table else None
+        if fieldDecoder is not None:
+            multiValuedFields = set(tField.name() for tField in fields if fieldDecoder.get_field_info(tField.name())[1])
+
+        changedDocs = list()
+
+        for featureId in set(changedAttributes.keys()) | set(changedGeometries.keys()):
+            if featureId < 0:
+                continue
+
+            docId = inLayer.getFeature(featureId)[idIndex]
+            if docId is None or docId == "":
+                continue
+
+            doc = {self.idField: docId}
+
+            for fieldIndex, value in changedAttributes.get(featureId, {}).items():
+                fieldName = fields.at(fieldIndex).name()
+                if fieldIndex == idIndex:
+                    continue
+
+                if fieldName in multiValuedFields:
+                    QgsMessageLog.logMessage("EditManager::GetChangedDocuments: Not sending the edit of multi-valued "
+                                             "field {} of {}".format(fieldName, docId))
+                    continue
+
+                # NULL attributes remove the field from the document, empty strings are set as they are
+                doc[fieldName] = None if value is None or value == NULL else self.__ToPython(value)
+
+            if featureId in changedGeometries:
+                doc["the_geom"] = changedGeometries[featureId].asWkt()
+
+            if len(doc) > 1:
+                changedDocs.append(doc)
+
+        return changedDocs
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __ToPython(inValue):
+        """
+        Convert Qt date and time values, which pysolr does not know, to Python ones it sends as ISO 8601
+        :param inValue: attribute value
+        :return: value pysolr can send
+        """
+
+        if hasattr(inValue, "toPyDateTime"):
+            # pysolr treats naive datetimes as UTC
+            return inValue.toUTC().toPyDateTime().replace(tzinfo=None)
+
+        if hasattr(inValue, "toPyDate"):
+            return inValue.toPyDate()
+
+        return inValue
+
+    # ******************************************************************************************************************
+    def __CaptureChanges(self, inLayer):
+        """
+        Keep the documents of the edits a layer is about to commit until the commit succeeded
+        :param inLayer: QgsVectorLayer about to commit its edits
+        :return: None
+        """
+
+        layerId = inLayer.id()
+        self.pendingDocs.pop(layerId, None)
+
+        if layerId not in self.trackedLayers:
+            return
+
+        try:
+            self.pendingDocs[layerId] = self.GetChangedDocuments(inLayer)
+
+        except Exception as e:
+            QgsMessageLog.logMessage("EditManager::__CaptureChanges: Exception: {}".format(e))
+            self.iface.messageBar().pushMessage("QGIS SOLR", "Could not send edits to SOLR!", level=Qgis.Critical)
+
+    # ******************************************************************************************************************
+    def __SendChanges(self, inLayer):
+        """
+        Send the edits a layer committed to Solr in a background task
+        :param inLayer: QgsVectorLayer that committed its edits
+        :return: None
+        """
+
+        table = self.trackedLayers.get(inLayer.id())
+        changedDocs = self.pendingDocs.pop(inLayer.id(), None)
+        if table is None or not changedDocs:
+            return
+
+        try:
+
+            fieldUpdates = dict()
+            for doc in changedDocs:
+                for field in doc:
+                    if field != self.idField:
+                        fieldUpdates[field] = "set"
+
+            task = QgsTask.fromFunction("Saving {} edits to SOLR".format(len(changedDocs)), self.__UpdateSolr,
+                                        self.queryManager.GetSolr(table), changedDocs, fieldUpdates,
+                                        on_finished=self.__UpdateFinished)
+            self.tasks.append(task)
+            QgsApplication.taskManager().addTask(task)
+
+        except Exception as e:
+            QgsMessageLog.logMessage("EditManager::__SendChanges: Exception: {}".format(e))
+            self.iface.messageBar().pushMessage("QGIS SOLR", "Could not send edits to SOLR!", level=Qgis.Critical)
+
+    # ******************************************************************************************************************
+    def __UpdateSolr(self, inTask, inSolr, inDocs: list, inFieldUpdates: dict):
+        """
+        Send the atomic updates. Runs in a QgsTask thread.
+        :return: number of documents updated
+        """
+
+        inSolr.add(inDocs, fieldUpdates=inFieldUpdates, commitWithin=self.commitWithin, solrapi="JSON",
+                   batch_size=self.batchSize)
+
+        return len(inDocs)
+
+    # ******************************************************************************************************************
+    def __UpdateFinished(self, inException, inResult=None):
+        """
+        Report the outcome of a background update. Runs in the main thread.
+        :param inException: exception raised by the task, if any
+        :param inResult: number of documents updated
+        :return: None
+        """
+
+        self.tasks = [task for task in self.tasks if task.status() not in (QgsTask.Complete, QgsTask.Terminated)]
+
+        if inException is not None:
+            QgsMessageLog.logMessage("EditManager::__UpdateFinished: Exception: {}".format(inException))
+            self.iface.messageBar().pushMessage("QGIS SOLR", "Saving edits to SOLR failed. Please consult the QGIS log!",
+                                                level=Qgis.Critical)
+        else:
+            QgsMessageLog.logMessage("EditManager: Sent {} updated documents to SOLR".format(inResult))
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+ExportManager.py holds the ExportManager class that writes search results straight to a file with OGR.
+"""
+
+import os
+from qgis.core import QgsMessageLog
+from .ColumnarPage import ColumnarPage
+
+# Output formats by file extension: OGR driver and layer creation options
+EXPORT_FORMATS = {
+    ".fgb": ("FlatGeobuf", ["SPATIAL_INDEX=NO"]),  # The index would keep every feature until the file is closed
+    ".gpkg": ("GPKG", []),
+    ".parquet": ("Parquet", []),
+}
+
+
+class ExportManager(object):
+    """
+    Class to export the results of a search without building a layer. Pages are fetched by the QueryManager a few at
+    a time and written as OGR features in one transaction per page, so memory stays bounded by the page size no
+    matter how many documents match. No QgsFeature is created along the way.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inQueryManager, inTableManager):
+        """
+        Initialization
+        :param inQueryManager: QueryManager to run the search with
+        :param inTableManager: TableManager to get the fields and their types from
+        """
+
+        self.queryManager = inQueryManager
+        self.tableManager = inTableManager
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def GetFormat(inPath: str) -> tuple:
+        """
+        Returns the OGR driver and layer creation options for a file
+        :param inPath: string of the file path
+        :return: tuple of the driver name and list of options
+        :raises ValueError: for unsupported extensions
+        """
+
+        extension = os.path.splitext(inPath)[1].lower()
+        if extension not in EXPORT_FORMATS:
+            raise ValueError("Can not export to {} files, use one of {}".format(extension,
+                                                                                ", ".join(sorted(EXPORT_FORMATS))))
+
+        return EXPORT_FORMATS[extension]
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def GetTablePath(inPath: str, inTable: str, inTableCount: int) -> str:
+        """
+        Returns the file a table is exported to. When several tables are exported each gets its own file, named
+        after the chosen one with the table appended.
+        :param inPath: string of the chosen file
+        :param inTable: string with the table
+        :param inTableCount: number of tables exported
+        :return: string of the file path
+        """
+
+        if inTableCount == 1:
+            return inPath
+
+        base, extension = os.path.splitext(inPath)
+        return "{}_{}{}".format(base, inTable, extension)
+
+    # ******************************************************************************************************************
+    def Export(self, inQuery, inTable: str, inPath: str, inLayerName: str = "", inProgress=None,
+               inMaxWorkers: int = 4) -> int:
+        """
+        Search a table and write every result to a file
+        :param inQuery: QueryPlan or string of the search, as taken by QueryManager.GetPages
+        :param inTable: string with the table
+        :param inPath: string of the file to write, its extension chooses the format
+        :param inLayerName: optional name of the layer in the file, the table by default
+        :param inProgress: optional function called with the number of documents written and the number of hits
+                           after every page. Returning False stops the export.
+        :param inMaxWorkers: number of pages fetched at the same time
+        :return: number of documents written
+        """
+
+        from osgeo import ogr, osr
+
+        driverName, options = self.GetFormat(inPath)
+        driver = ogr.GetDriverByName(driverName)
+        if driver is None:
+            raise ValueError("The installed GDAL does not have the {} driver".format(driverName))
+
+        fieldDecoder = self.tableManager.GetFieldDecoder(inTable)
+        fieldNames = self.tableManager.GetTableColumns(inTable)
+
+        if os.path.exists(inPath):
+            driver.DeleteDataSource(inPath)
+
+        dataSource = driver.CreateDataSource(inPath)
+        spatialReference = osr.SpatialReference()
+        spatialReference.ImportFromEPSG(4326)
+        spatialReference.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+        layer = dataSource.CreateLayer(inLayerName or inTable, spatialReference, ogr.wkbUnknown, options)
+        setters = list()
+        for tField in fieldNames:
+            fieldType, subType, setter = self.__GetFieldType(ogr, tField, fieldDecoder)
+            fieldDefinition = ogr.FieldDefn(tField, fieldType)
+            fieldDefinition.SetSubType(subType)
+            layer.CreateField(fieldDefinition)
+            setters.append(setter)
+
+        layerDefinition = layer.GetLayerDefn()
+        written = 0
+
+        pages = self.queryManager.GetPages(inQuery, inTable, inMaxWorkers)
+
+        try:
+            for tResults in pages:
+                page = tResults if isinstance(tResults, ColumnarPage) else ColumnarPage(tResults)
+                page.Decode(fieldDecoder)
+
+                layer.StartTransaction()
+                for tAttributes, tGeometry in zip(page.GetAttributes(fieldNames), self.__GetGeometries(ogr, page)):
+                    feature = ogr.Feature(layerDefinition)
+                    for index, (tValue, tSetter) in enumerate(zip(tAttributes, setters)):
+                        if tValue is not None:
+                            tSetter(feature, index, tValue)
+                    if tGeometry is not None:
+                        feature.SetGeometryDirectly(tGeometry)
+                    layer.CreateFeature(feature)
+                layer.CommitTransaction()
+
+                written += len(page)
+                if inProgress is not None and inProgress(written, page.hits) is False:
+                    break
+
+        finally:
+            # Stop fetching, and close the data source to flush what is left to disk
+            pages.close()
+            layer = None
+            dataSource = None
+
+        QgsMessageLog.logMessage("ExportManager::Export: Wrote {} documents of {} to {}".format(written, inTable,
+                                                                                                 inPath))
+        return written
+
+    # ******************************************************************************************************************
+    def __GetFieldType(self, inOGR, inField: str, inFieldDecoder=None) -> tuple:
+        """
+        Get the OGR field type of a Solr field and the function setting its values
+        :param inOGR: osgeo.ogr module
+        :param inField: string of the field name
+        :param inFieldDecoder: optional pysolr.SchemaDecoder for the table
+        :return: tuple of the field type, field subtype and setter
+        """
+
+        def SetValue(inFeature, inIndex, inValue):
+            inFeature.SetField(inIndex, inValue)
+
+        def SetBoolean(inFeature, inIndex, inValue):
+            inFeature.SetField(inIndex, int(inValue) if isinstance(inValue, bool) else inValue)
+
+        def SetDateTime(inFeature, inIndex, inValue):
+            if hasattr(inValue, "tzinfo"):
+                # Solr stores every date in UTC, which is time zone flag 100 in OGR
+                inFeature.SetField(inIndex, inValue.year, inValue.month, inValue.day, inValue.hour, inValue.minute,
+                                   inValue.second + inValue.microsecond / 1000000.0, 100)
+            else:
+                inFeature.SetField(inIndex, inValue)
+
+        from .pysolr import SchemaDecoder
+
+        if inFieldDecoder is None:
+            kind, multiValued = SchemaDecoder.STRING, True
+        else:
+            kind, multiValued = inFieldDecoder.get_field_info(inField)
+        if multiValued:
+            return inOGR.OFTString, inOGR.OFSTNone, SetValue
+
+        return {
+            SchemaDecoder.INTEGER: (inOGR.OFTInteger64, inOGR.OFSTNone, SetValue),
+            SchemaDecoder.FLOAT: (inOGR.OFTReal, inOGR.OFSTNone, SetValue),
+            SchemaDecoder.BOOLEAN: (inOGR.OFTInteger, inOGR.OFSTBoolean, SetBoolean),
+            SchemaDecoder.DATETIME: (inOGR.OFTDateTime, inOGR.OFSTNone, SetDateTime),
+        }.get(kind, (inOGR.OFTString, inOGR.OFSTNone, SetValue))
+
+    # ******************************************************************************************************************
+    def __GetGeometries(self, inOGR, inPage: ColumnarPage):
+        """
+        Build the OGR geometries of a page. Points are created straight from the parsed coordinates, anything else is
+        parsed from its WKT.
+        :param inOGR: osgeo.ogr module
+        :param inPage: ColumnarPage
+        :return: iterator of ogr.Geometry, None where the document has no geometry
+        """
+
+        wkts = inPage.columns.get(inPage.geomField, [None] * len(inPage))
+
+        for tPoint, tWkt in zip(inPage.GetPoints(), wkts):
+            if tPoint is not None:
+                geometry = inOGR.Geometry(inOGR.wkbPoint)
+                geometry.AddPoint_2D(*tPoint)
+                yield geometry
+            elif tWkt:
+                try:
+                    yield inOGR.CreateGeometryFromWkt(str(tWkt))  # None for invalid WKT unless exceptions are on
+                except RuntimeError:
+                    yield None
+            else:
+                yield None
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+ExtractionManager.py holds the ExtractionManager class that runs searches into files without the plugin dialog, for
+the command line and the Processing algorithm.
+"""
+
+import time
+from qgis.core import QgsMessageLog
+from .ConfigManager import ConfigManager
+from .ConnectionPool import ConnectionPool
+from .ExportManager import ExportManager
+from .QueryManager import QueryManager
+from .TableManager import TableManager
+
+
+class ExtractionManager(object):
+    """
+    Class to extract search results to files headless. The managers are built from config.ini the same way the
+    plugin builds them, with no QGIS interface, and every table is streamed to its file through an ExportManager
+    with its pages fetched in parallel. The number of documents and the time taken are kept per table.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inConfigPath: str):
+        """
+        Initialization
+        :param inConfigPath: path of the configuration file
+        """
+
+        self.configManager = ConfigManager(inConfigPath)
+
+        configuration = self.configManager.GetConfiguration()
+        self.tables = configuration.tables
+        tableSettings = self.configManager.GetTableSettings(self.tables)
+        connectionPool = ConnectionPool()
+
+        self.tableManager = TableManager(configuration.endpoint, self.tables, tableSettings, connectionPool)
+        self.queryManager = QueryManager(configuration.endpoint, None, self.tables, configuration.zookeeper,
+                                         inColumnar=True,
+                                         inTableSettings=tableSettings, inConnectionPool=connectionPool)
+        self.exportManager = ExportManager(self.queryManager, self.tableManager)
+
+    # ******************************************************************************************************************
+    def GetTables(self) -> list:
+        """
+        Returns the configured tables
+        :return: list of tables
+        """
+
+        return list(self.tables)
+
+    # ******************************************************************************************************************
+    def Extract(self, inQuery: str, inPath: str, inTables: list = None, inCC3: str = "", inBounds: tuple = None,
+                inMaxWorkers: int = 4, inProgress=None) -> dict:
+        """
+        Search tables and write their results to files
+        :param inQuery: string with the search term(s)
+        :param inPath: string of the file to write, its extension chooses the format. With several tables each
+                       table gets its own file.
+        :param inTables: optional list of tables, all configured tables by default
+        :param inCC3: optional string with the alpha3 code of the country to search
+        :param inBounds: optional tuple of xMin, yMin, xMax, yMax in degrees to search
+        :param inMaxWorkers: number of pages fetched at the same time per table
+        :param inProgress: optional function called with the table, documents written and hits after every page.
+                           Returning False stops the extraction.
+        :return: dictionary of table -> tuple of the file, the number of documents written and the seconds taken
+        :raises QueryError: if the search terms can not be searched
+        :raises ValueError: for unknown tables and unsupported files
+        """
+
+        tables = list(inTables) if inTables else self.GetTables()
+
+        unknownTables = [tTable for tTable in tables if tTable not in self.tables]
+        if unknownTables:
+            raise ValueError("Unknown tables {}, use one of {}".format(", ".join(unknownTables),
+                                                                       ", ".join(self.tables)))
+
+        ExportManager.GetFormat(inPath)
+
+        # Build every plan before writing anything so a bad query fails fast
+        plans = {tTable: self.queryManager.CreatePlan(inQuery, inCC3, tTable, inBounds) for tTable in tables}
+
+        outcome = dict()
+        stopped = list()
+
+        for tTable in tables:
+            path = ExportManager.GetTablePath(inPath, tTable, len(tables))
+
+            def Progress(inWritten, inHits, inTable=tTable):
+                if inProgress is not None and inProgress(inTable, inWritten, inHits) is False:
+                    stopped.append(inTable)
+                    return False
+                return True
+
+            start = time.perf_counter()
+            written = self.exportManager.Export(plans[tTable], tTable, path, inProgress=Progress,
+                                                inMaxWorkers=inMaxWorkers)
+            seconds = time.perf_counter() - start
+
+            outcome[tTable] = (path, written, seconds)
+            QgsMessageLog.logMessage("ExtractionManager::Extract: {} documents of {} in {:.1f} s, {:.0f} per second"
+                                     .format(written, tTable, seconds, written / seconds if seconds else 0.0))
+
+            if stopped:
+                break
+
+        return outcome
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+LayerStatistics.py holds the LayerStatistics class that keeps running statistics of a layer while its pages load.
+"""
+
+from qgis.core import QgsRectangle
+
+
+class LayerStatistics(object):
+    """
+    Class to accumulate the feature count, the number of documents without a usable geometry, the bounding box and
+    the range of numeric fields page by page, so none of them needs another pass over the features of the layer.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inLayerName: str, inNumericFields=()):
+        """
+        Initialization
+        :param inLayerName: string of the layer name
+        :param inNumericFields: names of the numeric fields to keep the range of
+        """
+
+        self.layerName = inLayerName
+        self.numericFields = list(inNumericFields)
+        self.featureCount = 0
+        self.nullGeometryCount = 0
+        self.bounds = None  # xMin, yMin, xMax, yMax
+        self.fieldRanges = dict()  # field -> (minimum, maximum)
+
+    # ******************************************************************************************************************
+    def AddPage(self, inPage, inFeatureCount: int):
+        """
+        Add a loaded page to the statistics
+        :param inPage: decoded ColumnarPage
+        :param inFeatureCount: number of features of the page that were added to the layer
+        :return: None
+        """
+
+        self.featureCount += inFeatureCount
+        self.nullGeometryCount += len(inPage) - inFeatureCount
+
+        pageBounds = inPage.GetBounds()
+        if pageBounds is not None:
+            if self.bounds is None:
+                self.bounds = pageBounds
+            else:
+                self.bounds = (min(self.bounds[0], pageBounds[0]), min(self.bounds[1], pageBounds[1]),
+                               max(self.bounds[2], pageBounds[2]), max(self.bounds[3], pageBounds[3]))
+
+        for tField in self.numericFields:
+            pageRange = inPage.GetRange(tField)
+            if pageRange is None:
+                continue
+
+            fieldRange = self.fieldRanges.get(tField)
+            if fieldRange is None:
+                self.fieldRanges[tField] = pageRange
+            else:
+                self.fieldRanges[tField] = (min(fieldRange[0], pageRange[0]), max(fieldRange[1], pageRange[1]))
+
+    # ******************************************************************************************************************
+    def GetExtent(self):
+        """
+        Returns the bounding box of the loaded features
+        :return: QgsRectangle, or None if no feature had a point geometry
+        """
+
+        if self.bounds is None:
+            return None
+
+        return QgsRectangle(*self.bounds)
+
+    # ******************************************************************************************************************
+    def GetSummary(self) -> str:
+        """
+        Returns a human readable summary of the statistics
+        :return: string
+        """
+
+        lines = ["{}: {} features".format(self.layerName, self.featureCount)]
+
+        if self.nullGeometryCount:
+            lines.append("    {} results without a location were skipped".format(self.nullGeometryCount))
+
+        if self.bounds is not None:
+            lines.append("    Extent: {:.6f}, {:.6f} : {:.6f}, {:.6f}".format(*self.bounds))
+
+        for tField in self.numericFields:
+            if tField in self.fieldRanges:
+                lines.append("    {}: {} to {}".format(tField, *self.fieldRanges[tField]))
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+PageCodec.py holds the PageCodec class that packs a ColumnarPage into a compact binary record and back.
+"""
+
+import json
+import struct
+from .ColumnarPage import ColumnarPage
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Magic, version, flags, hits, documents and fields. Its size is a multiple of 8 so the coordinates after it are
+# aligned whenever the record is.
+PAGE_HEADER = struct.Struct("<4sHHQII")
+PAGE_MAGIC = b"QSPG"
+PAGE_VERSION = 1
+FLAG_COORDINATES = 1  # The coordinates follow the header, left out when the page has no geometry field
+
+# Column encodings
+KIND_NONE = 0  # Every value is None, nothing follows
+KIND_STRING = 1  # Offsets and UTF-8 bytes of every value
+KIND_DICTIONARY = 2  # The distinct strings once, then the index of every value
+KIND_INTEGER = 3  # int64
+KIND_FLOAT = 4  # float64
+KIND_BOOLEAN = 5  # One byte per value
+KIND_JSON = 6  # Strings of JSON, for lists and mixed types
+
+COLUMN_HEADER = struct.Struct("<BB")  # Encoding and whether a presence byte per value follows
+LENGTH = struct.Struct("<I")
+
+
+class PageCodec(object):
+    """
+    Class to turn pages into bytes and back without going through JSON. A record is laid out as:
+
+        header          magic, version, flags, hits, number of documents and of fields
+        coordinates     x then y of every document as float64, NaN where no point was parsed. Only there when
+                        the page has a geometry field.
+        geometry field  length prefixed UTF-8
+        field names     length prefixed UTF-8, the order of the columns
+        columns         encoding, optional presence bytes, then the values
+
+    String columns with few distinct values are dictionary encoded. Decoding slices a memoryview of the record, so a
+    memory-mapped file is read in place. With NumPy the coordinates are arrays over the record itself and are not
+    copied or parsed again.
+    """
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def Encode(inPage: ColumnarPage) -> bytes:
+        """
+        Pack a page into a record
+        :param inPage: ColumnarPage, before it is decoded
+        :return: bytes
+        """
+
+        count = len(inPage)
+        flags = FLAG_COORDINATES if inPage.geomField in inPage.columns else 0
+        parts = [PAGE_HEADER.pack(PAGE_MAGIC, PAGE_VERSION, flags, inPage.hits, count, len(inPage.columns))]
+
+        if flags & FLAG_COORDINATES:
+            if numpy is not None:
+                parts.extend(numpy.asarray(tArray, dtype="<f8").tobytes() for tArray in (inPage.x, inPage.y))
+            else:
+                parts.extend(struct.pack("<{}d".format(count), *tArray) for tArray in (inPage.x, inPage.y))
+
+        parts.append(PageCodec.__PackString(inPage.geomField))
+
+        parts.extend(PageCodec.__PackString(tField) for tField in inPage.columns)
+
+        for tColumn in inPage.columns.values():
+            parts.append(PageCodec.__PackColumn(tColumn))
+
+        return b"".join(parts)
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def Decode(inBuffer) -> ColumnarPage:
+        """
+        Unpack a record into a page
+        :param inBuffer: bytes-like object holding the record, such as a memoryview of a mapped file
+        :return: ColumnarPage
+        :raises ValueError: if the buffer does not hold a record of this version
+        """
+
+        view = memoryview(inBuffer)
+        if len(view) < PAGE_HEADER.size:
+            raise ValueError("Page record is truncated")
+
+        magic, version, flags, hits, count, fieldCount = PAGE_HEADER.unpack_from(view, 0)
+        if magic != PAGE_MAGIC:
+            raise ValueError("Not a page record")
+        if version != PAGE_VERSION:
+            raise ValueError("Unsupported page record version {}, expected {}".format(version, PAGE_VERSION))
+
+        position = PAGE_HEADER.size
+        x = y = None
+
+        if flags & FLAG_COORDINATES:
+            size = 8 * count
+            if numpy is not None:
+                x = numpy.frombuffer(view, dtype="<f8", count=count, offset=position)
+                y = numpy.frombuffer(view, dtype="<f8", count=count, offset=position + size)
+            else:
+                x = list(struct.unpack_from("<{}d".format(count), view, position))
+                y = list(struct.unpack_from("<{}d".format(count), view, position + size))
+            position += 2 * size
+
+        geomField, position = PageCodec.__UnpackString(view, position)
+
+        fieldNames = list()
+        for _ in range(fieldCount):
+            field, position = PageCodec.__UnpackString(view, position)
+            fieldNames.append(field)
+
+        columns = dict()
+        for tField in fieldNames:
+            columns[tField], position = PageCodec.__UnpackColumn(view, position, count)
+
+        return ColumnarPage.FromColumns(columns, hits, geomField, x, y)
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __PackString(inText: str) -> bytes:
+        """
+        Pack a length prefixed string
+        :param inText: string
+        :return: bytes
+        """
+
+        data = inText.encode("utf-8")
+        return LENGTH.pack(len(data)) + data
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __UnpackString(inView: memoryview, inPosition: int) -> tuple:
+        """
+        Unpack a length prefixed string
+        :param inView: memoryview of the record
+        :param inPosition: offset of the string
+        :return: tuple of the string and the offset after it
+        """
+
+        length, = LENGTH.unpack_from(inView, inPosition)
+        start = inPosition + LENGTH.size
+        return str(inView[start:start + length], "utf-8"), start + length
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __PackStrings(inValues: list) -> bytes:
+        """
+        Pack strings as the offsets of their ends followed by their UTF-8 bytes
+        :param inValues: list of strings
+        :return: bytes
+        """
+
+        data = [tValue.encode("utf-8") for tValue in inValues]
+
+        ends = list()
+        end = 0
+        for tData in data:
+            end += len(tData)
+            ends.append(end)
+
+        return struct.pack("<{}I".format(len(ends)), *ends) + b"".join(data)
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __UnpackStrings(inView: memoryview, inPosition: int, inCount: int) -> tuple:
+        """
+        Unpack strings packed by __PackStrings
+        :param inView: memoryview of the record
+        :param inPosition: offset of the offsets
+        :param inCount: number of strings
+        :return: tuple of the list of strings and the offset after them
+        """
+
+        ends = struct.unpack_from("<{}I".format(inCount), inView, inPosition)
+        base = inPosition + 4 * inCount
+
+        values = list()
+        start = 0
+        for tEnd in ends:
+            values.append(str(inView[base + start:base + tEnd], "utf-8"))
+            start = tEnd
+
+        return values, base + start
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __GetKind(inValues: list) -> int:
+        """
+        Choose the encoding of a column from its values
+        :param inValues: list of the values that are not None
+        :return: one of the KIND constants
+        """
+
+        if not inValues:
+            return KIND_NONE
+
+        types = set(type(tValue) for tValue in inValues)
+
+        if types == {str}:
+            return KIND_DICTIONARY if len(set(inValues)) <= len(inValues) // 2 else KIND_STRING
+        if types == {bool}:
+            return KIND_BOOLEAN
+        if types == {int} and all(-2 ** 63 <= tValue < 2 ** 63 for tValue in inValues):
+            return KIND_INTEGER
+        if types == {float}:
+            return KIND_FLOAT
+
+        return KIND_JSON
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __PackColumn(inColumn: list) -> bytes:
+        """
+        Pack a column
+        :param inColumn: list of values, None where a document does not have the field
+        :return: bytes
+        """
+
+        present = [tValue is not None for tValue in inColumn]
+        hasMissing = not all(present)
+        values = [tValue for tValue in inColumn if tValue is not None]
+        kind = PageCodec.__GetKind(values)
+
+        parts = [COLUMN_HEADER.pack(kind, hasMissing and kind != KIND_NONE)]
+        if hasMissing and kind != KIND_NONE:
+            parts.append(bytes(present))
+
+        # Only the values that are present are stored
+        if kind == KIND_STRING:
+            parts.append(PageCodec.__PackStrings(values))
+        elif kind == KIND_DICTIONARY:
+            dictionary = list(dict.fromkeys(values))
+            indexes = dict((tValue, index) for index, tValue in enumerate(dictionary))
+            code = "B" if len(dictionary) <= 0xFF else "H" if len(dictionary) <= 0xFFFF else "I"
+            parts.append(LENGTH.pack(len(dictionary)))
+            parts.append(PageCodec.__PackStrings(dictionary))
+            parts.append(struct.pack("<{}{}".format(len(values), code), *[indexes[tValue] for tValue in values]))
+        elif kind == KIND_INTEGER:
+            parts.append(struct.pack("<{}q".format(len(values)), *values))
+        elif kind == KIND_FLOAT:
+            parts.append(struct.pack("<{}d".format(len(values)), *values))
+        elif kind == KIND_BOOLEAN:
+            parts.append(bytes(values))
+        elif kind == KIND_JSON:
+            parts.append(PageCodec.__PackStrings([json.dumps(tValue, separators=(",", ":")) for tValue in values]))
+
+        return b"".join(parts)
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __UnpackColumn(inView: memoryview, inPosition: int, inCount: int) -> tuple:
+        """
+        Unpack a column packed by __PackColumn
+        :param inView: memoryview of the record
+        :param inPosition: offset of the column
+        :param inCount: number of documents in the page
+        :return: tuple of the list of values and the offset after the column
+        :raises ValueError: for unknown encodings
+        """
+
+        kind, hasMissing = COLUMN_HEADER.unpack_from(inView, inPosition)
+        position = inPosition + COLUMN_HEADER.size
+
+        if kind == KIND_NONE:
+            return [None] * inCount, position
+
+        present = None
+        valueCount = inCount
+        if hasMissing:
+            present = inView[position:position + inCount]
+            valueCount = inCount - present.tobytes().count(0)
+            position += inCount
+
+        if kind == KIND_STRING:
+            values, position = PageCodec.__UnpackStrings(inView, position, valueCount)
+        elif kind == KIND_DICTIONARY:
+            size, = LENGTH.unpack_from(inView, position)
+            dictionary, position = PageCodec.__UnpackStrings(inView, position + LENGTH.size, size)
+            code = "B" if size <= 0xFF else "H" if size <= 0xFFFF else "I"
+            indexes = struct.unpack_from("<{}{}".format(valueCount, code), inView, position)
+            values = [dictionary[tIndex] for tIndex in indexes]
+            position += struct.calcsize("<{}{}".format(valueCount, code))
+        elif kind == KIND_INTEGER:
+            values = list(struct.unpack_from("<{}q".format(valueCount), inView, position))
+            position += 8 * valueCount
+        elif kind == KIND_FLOAT:
+            values = list(struct.unpack_from("<{}d".format(valueCount), inView, position))
+            position += 8 * valueCount
+        elif kind == KIND_BOOLEAN:
+            values = [tValue != 0 for tValue in inView[position:position + valueCount]]
+            position += valueCount
+        elif kind == KIND_JSON:
+            strings, position = PageCodec.__UnpackStrings(inView, position, valueCount)
+            values = [json.loads(tString) for tString in strings]
+        else:
+            raise ValueError("Unknown column encoding {}".format(kind))
+
+        if present is None:
+            return values, position
+
+        # Put the None values back in place of the documents without the field
+        iterator = iter(values)
+        return [next(iterator) if tPresent else None for tPresent in present], position
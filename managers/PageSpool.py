@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+PageSpool.py holds the PageSpool class that parks fetched pages in a temporary file until they are read.
+"""
+
+import mmap
+import struct
+import tempfile
+import threading
+from qgis.core import QgsMessageLog
+from .ColumnarPage import ColumnarPage
+from .PageCodec import PageCodec
+
+# Every record starts with the length of its body, and records are padded to 8 bytes so the coordinates of the body
+# stay aligned in the file
+RECORD_HEADER = struct.Struct("<Q")
+RECORD_ALIGNMENT = 8
+
+
+class PageSpool(object):
+    """
+    Class to decouple fetching pages from reading them. A writer appends each page to a temporary file as one
+    PageCodec record, which is far smaller than the documents since every field name is written once. A reader maps
+    only the window of the file holding the next record and decodes it in place, so its memory is bounded by one page
+    no matter how far the writer is ahead. Writer and reader run at their own speed in different threads.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inDirectory: str = None):
+        """
+        Initialization
+        :param inDirectory: optional directory of the temporary file, the system default otherwise
+        """
+
+        self.file = tempfile.TemporaryFile(dir=inDirectory)
+        self.records = list()  # (offset, length) of the body of every record
+        self.size = 0  # Bytes written to the file
+        self.finished = False
+        self.error = None  # Exception that stopped the writer
+        self.condition = threading.Condition()
+        self.thread = None
+
+    # ******************************************************************************************************************
+    def Append(self, inPage: ColumnarPage):
+        """
+        Write a page to the end of the spool
+        :param inPage: ColumnarPage, before it is decoded
+        :return: None
+        """
+
+        body = PageCodec.Encode(inPage)
+        padding = -len(body) % RECORD_ALIGNMENT
+
+        self.file.seek(self.size)
+        self.file.write(RECORD_HEADER.pack(len(body)))
+        self.file.write(body)
+        self.file.write(bytes(padding))
+        self.file.flush()
+
+        with self.condition:
+            self.records.append((self.size + RECORD_HEADER.size, len(body)))
+            self.size += RECORD_HEADER.size + len(body) + padding
+            self.condition.notify_all()
+
+    # ******************************************************************************************************************
+    def Finish(self, inError: Exception = None):
+        """
+        Mark the spool as complete, so readers stop once they have read every page
+        :param inError: optional exception that stopped the writer, raised to the reader after the last page
+        :return: None
+        """
+
+        with self.condition:
+            self.finished = True
+            self.error = inError
+            self.condition.notify_all()
+
+    # ******************************************************************************************************************
+    def Start(self, inPages):
+        """
+        Append pages from an iterator in a background thread
+        :param inPages: iterator of ColumnarPage, such as QueryManager.GetPages
+        :return: None
+        """
+
+        def Write():
+            try:
+                for tPage in inPages:
+                    if self.file.closed:
+                        break
+                    self.Append(tPage)
+                self.Finish()
+
+            except Exception as e:
+                QgsMessageLog.logMessage("PageSpool::Start: Exception: {}".format(e))
+                self.Finish(e)
+
+            finally:
+                # Stop fetching pages nobody will read
+                if hasattr(inPages, "close"):
+                    inPages.close()
+
+        self.thread = threading.Thread(target=Write, name="PageSpool writer", daemon=True)
+        self.thread.start()
+
+    # ******************************************************************************************************************
+    def Read(self, inIndex: int) -> ColumnarPage:
+        """
+        Read a page back by mapping only the part of the file that holds it. The mapping is released once the page,
+        whose coordinates may still point into it, is no longer used.
+        :param inIndex: index of the page
+        :return: ColumnarPage
+        """
+
+        offset, length = self.records[inIndex]
+
+        # Mappings have to start on a multiple of the allocation granularity
+        start = offset - offset % mmap.ALLOCATIONGRANULARITY
+
+        window = mmap.mmap(self.file.fileno(), offset + length - start, access=mmap.ACCESS_READ, offset=start)
+        return PageCodec.Decode(memoryview(window)[offset - start:])
+
+    # ******************************************************************************************************************
+    def Pages(self):
+        """
+        Yield the pages in the order they were written, waiting for the writer when the reader catches up
+        :return: iterator of ColumnarPage
+        """
+
+        index = 0
+
+        while True:
+            with self.condition:
+                while index >= len(self.records) and not self.finished:
+                    self.condition.wait()
+
+                if index >= len(self.records):
+                    if self.error is not None:
+                        raise self.error
+                    return
+
+            yield self.Read(index)
+            index += 1
+
+    # ******************************************************************************************************************
+    def Close(self):
+        """
+        Delete the temporary file. A writer thread still running stops before its next page.
+        :return: None
+        """
+
+        self.Finish(self.error)
+        self.file.close()
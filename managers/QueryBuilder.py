@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+QueryBuilder.py holds the QueryBuilder class that turns what the user typed into a safe Solr query, and the QueryPlan
+class it returns.
+"""
+
+import json
+import re
+from collections import namedtuple
+
+# Characters with a meaning in the Lucene query syntax
+SPECIAL_CHARACTERS = frozenset('\\+-!():^[]"{}~*?|&/')
+
+# Words the standard query parser reads as operators
+RESERVED_WORDS = frozenset(["AND", "OR", "NOT", "TO"])
+
+# A quoted phrase or a run of anything else up to the next whitespace
+TOKEN_REGEX = re.compile(r'"([^"]*)"|(\S+)')
+
+# Query parsers a plan can be built for
+QUERY_PARSERS = ("standard", "edismax")
+
+
+class QueryError(ValueError):
+    """
+    Raised when the user input can not be turned into a query Solr could run cheaply
+    """
+
+
+class QueryPlan(namedtuple("QueryPlan", "q fq fl sort params")):
+    """
+    Everything sent to Solr for one search. It is immutable and hashable, so it can be logged and used as a cache key.
+    fq is a tuple of filter queries, fl and sort are strings that are left out when empty and params is a sorted tuple
+    of (name, value) pairs of any other parameters, such as the query parser and its settings.
+    """
+
+    __slots__ = ()
+
+    # ******************************************************************************************************************
+    def GetParameters(self) -> dict:
+        """
+        Returns the plan as keyword arguments for pysolr search
+        :return: dictionary of parameters
+        """
+
+        parameters = {"q": self.q, "fq": list(self.fq)}
+
+        if self.fl:
+            parameters["fl"] = self.fl
+        if self.sort:
+            parameters["sort"] = self.sort
+
+        parameters.update(self.params)
+
+        return parameters
+
+    # ******************************************************************************************************************
+    def ToJSON(self) -> str:
+        """
+        Returns the plan as a JSON string, to keep it with a layer
+        :return: string
+        """
+
+        return json.dumps(self._asdict())
+
+    # ******************************************************************************************************************
+    @classmethod
+    def FromJSON(cls, inText: str):
+        """
+        Create a plan from a string returned by ToJSON
+        :param inText: JSON string
+        :return: QueryPlan
+        """
+
+        values = json.loads(inText)
+
+        return cls(values["q"], tuple(values["fq"]), values["fl"], values["sort"],
+                   tuple(tuple(tPair) for tPair in values["params"]))
+
+
+class QueryBuilder(object):
+    """
+    Class to build query plans. The input is split into words and quoted phrases and every special character is
+    escaped. For the standard parser the terms are ANDed together on one field. For edismax they are sent once as
+    plain text and Solr matches them against the qf fields, requiring all of them unless mm says otherwise. Leading
+    wildcards would make Solr scan every term of a field, so they are dropped, as are wildcards after very short
+    prefixes. Inputs with more terms than allowed are rejected instead of sent as one huge query.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inField: str = "_text_", inMaxTerms: int = 32, inMinWildcardPrefix: int = 3):
+        """
+        Initialization
+        :param inField: field the terms are searched in
+        :param inMaxTerms: maximum number of distinct terms in a query
+        :param inMinWildcardPrefix: number of characters needed in front of a wildcard
+        """
+
+        self.field = inField
+        self.maxTerms = inMaxTerms
+        self.minWildcardPrefix = inMinWildcardPrefix
+
+    # ******************************************************************************************************************
+    def Tokenize(self, inQuery: str) -> list:
+        """
+        Split user input into terms
+        :param inQuery: string the user typed
+        :return: list of (text, isPhrase) tuples
+        """
+
+        tokens = list()
+
+        for tPhrase, tWord in TOKEN_REGEX.findall(inQuery):
+            if tPhrase.strip():
+                tokens.append((" ".join(tPhrase.split()), True))
+            elif tWord:
+                tokens.append((tWord, False))
+
+        return tokens
+
+    # ******************************************************************************************************************
+    def EscapeTerm(self, inTerm: str) -> str:
+        """
+        Escape a word, keeping * and ? as wildcards where they are cheap to expand
+        :param inTerm: string of the word
+        :return: string of the escaped word, empty if nothing searchable is left
+        """
+
+        # Leading wildcards force a scan of every term
+        term = inTerm.lstrip("*?")
+
+        # Only a long enough prefix keeps its wildcards
+        firstWildcard = min([tIndex for tIndex in (term.find("*"), term.find("?")) if tIndex >= 0], default=-1)
+        keepWildcards = firstWildcard >= self.minWildcardPrefix
+
+        if not keepWildcards:
+            term = term.replace("*", "").replace("?", "")
+
+        if not term:
+            return ""
+
+        if term in RESERVED_WORDS:
+            return self.EscapePhrase(term)
+
+        return "".join("\\" + tChar if tChar in SPECIAL_CHARACTERS and not (keepWildcards and tChar in "*?")
+                       else tChar for tChar in term)
+
+    # ******************************************************************************************************************
+    def EscapePhrase(self, inPhrase: str) -> str:
+        """
+        Quote a phrase
+        :param inPhrase: string of the phrase
+        :return: string of the quoted phrase
+        """
+
+        return '"{}"'.format(inPhrase.replace("\\", "\\\\").replace('"', '\\"'))
+
+    # ******************************************************************************************************************
+    def Build(self, inQuery: str, inFilterQueries=(), inFields=(), inSort: str = "", inParser: str = "standard",
+              inParserParameters: dict = None) -> QueryPlan:
+        """
+        Build the plan of a search
+        :param inQuery: string the user typed
+        :param inFilterQueries: iterable of filter queries
+        :param inFields: iterable of fields to return, all fields when empty
+        :param inSort: string of the sort order, relevance when empty
+        :param inParser: "standard" or "edismax"
+        :param inParserParameters: dictionary of edismax parameters such as qf, mm and pf
+        :return: QueryPlan
+        """
+
+        if inParser not in QUERY_PARSERS:
+            raise QueryError("Unknown query parser {}".format(inParser))
+
+        terms = list()
+
+        for tText, tIsPhrase in self.Tokenize(inQuery):
+            term = self.EscapePhrase(tText) if tIsPhrase else self.EscapeTerm(tText)
+
+            # Repeating a term does not change an AND query
+            if term and term not in terms:
+                terms.append(term)
+
+        if not terms:
+            raise QueryError("The query has no searchable terms")
+
+        if len(terms) > self.maxTerms:
+            raise QueryError("The query has {} terms, at most {} are allowed".format(len(terms), self.maxTerms))
+
+        if inParser == "edismax":
+            parameters = {"defType": "edismax", "qf": self.field, "mm": "100%"}
+            parameters.update(inParserParameters or dict())
+
+            return QueryPlan(" ".join(terms), tuple(inFilterQueries), ",".join(inFields), inSort,
+                             tuple(sorted(parameters.items())))
+
+        query = " AND ".join("{}:{}".format(self.field, tTerm) for tTerm in terms)
+
+        return QueryPlan(query, tuple(inFilterQueries), ",".join(inFields), inSort, ())
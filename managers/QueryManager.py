@@ -2,7 +2,11 @@
 """
 This file contains the QueryManager class that helps to abstract and move the query handling into a single class.
 """
+from functools import partial
 from . import pysolr
+from .ColumnarPage import ColumnarPage
+from .ConnectionPool import ConnectionPool
+from .QueryBuilder import QueryBuilder, QueryPlan
 from qgis.core import *
 from qgis.gui import *
 
@@ -14,20 +18,84 @@ class QueryManager(object):
     """
 
     # ******************************************************************************************************************
-    def __init__(self, inSOLREndpoint: str, inQIface, inSolrTables: list):
+    def __init__(self, inSOLREndpoint: str, inQIface, inSolrTables: list, inZooKeeperHosts: str = "",
+                 inColumnar: bool = False, inTableSettings: dict = None, inConnectionPool: ConnectionPool = None):
         """
         Initialize ourself
+        :param inZooKeeperHosts: optional ZooKeeper connect string. When set, tables on the default endpoint are
+                                 SolrCloud collections and each query is sent directly to every shard instead of
+                                 through one coordinator.
+        :param inColumnar: return pages as ColumnarPage objects instead of pysolr.Results
+        :param inTableSettings: optional dictionary of table -> settings, as returned by
+                                ConfigManager.GetTableSettings. They choose the endpoint, core, auth, timeout, page
+                                size, returned fields and number of connections of each table. query_parser chooses
+                                between the standard parser and edismax, whose qf, mm and pf parameters are taken from
+                                the settings too.
+        :param inConnectionPool: optional ConnectionPool to share connections with other managers
         """
 
         # Variables for SOLR
         self.solrEndpoint = inSOLREndpoint
         self.rows = 500  # Number of rows to process at a time
         self.queryOK = False  # Have we run a query that worked ok?
-        self.queryTerms = ""  # search terms from the user
+        self.queryBuilder = QueryBuilder()
+        self.queryPlan = None  # QueryPlan of the current search
+        self.tableSettings = inTableSettings or dict()
+        self.connectionPool = inConnectionPool or ConnectionPool()
+        self.columnar = inColumnar
         self.mySOLR = dict()
+        self.retryPolicy = pysolr.RetryPolicy()  # Shared so a down host trips one breaker for all tables
+        # Pages are read once, so drop the raw response and hand the documents over as they are read
+        self.resultsClass = partial(pysolr.CompactResults, keep_raw=False, release_docs=True)
         self.iface = inQIface
+        self.zooKeeper = None
+        self.shardPages = dict()  # Per-table page generators when querying shards directly
+        self._ConnectZooKeeper(inZooKeeperHosts)
         self._MakeSOLRObjects(inSolrTables)
 
+    # ******************************************************************************************************************
+    def _ConnectZooKeeper(self, inZooKeeperHosts: str):
+        """
+        Connect to ZooKeeper so queries can be routed to the shards of each collection
+        :param inZooKeeperHosts: ZooKeeper connect string, empty to use the plain endpoint
+        :return: None
+        """
+
+        if not inZooKeeperHosts:
+            return
+
+        try:
+            self.zooKeeper = pysolr.ZooKeeper(inZooKeeperHosts)
+
+        except Exception as e:
+            self.zooKeeper = None
+            QgsMessageLog.logMessage("QueryManager::_ConnectZooKeeper: Could not connect, using {} instead."
+                                     .format(self.solrEndpoint))
+            QgsMessageLog.logMessage("QueryManager::_ConnectZooKeeper: Exception: {}".format(e))
+
+    # ******************************************************************************************************************
+    def Close(self):
+        """
+        Stop the ZooKeeper client and close the connections to Solr. The manager can not be used afterwards.
+        :return: None
+        """
+
+        for tPages in self.shardPages.values():
+            tPages.close()
+        self.shardPages = dict()
+
+        if self.zooKeeper is not None:
+            try:
+                self.zooKeeper.close()
+            except Exception as e:
+                QgsMessageLog.logMessage("QueryManager::Close: Exception: {}".format(e))
+            self.zooKeeper = None
+
+        for tSolr in self.mySOLR.values():
+            tSolr.close()
+
+        self.connectionPool.Close()
+
     # ******************************************************************************************************************
     def _MakeSOLRObjects(self, inSOLRTables: list):
         """
@@ -38,38 +106,79 @@ class QueryManager(object):
 
         try:
             for table in inSOLRTables:
-                self.mySOLR[table] = pysolr.Solr(self.solrEndpoint + "/" + table.replace("_", ""))
+                endPoint = self.__GetSetting(table, "endpoint", self.solrEndpoint)
+                coreName = self.__GetSetting(table, "core", table.replace("_", ""))
+                session = self.connectionPool.GetSession(endPoint, self.__GetSetting(table, "max_connections", 10))
+
+                if self.zooKeeper and endPoint == self.solrEndpoint:
+                    self.mySOLR[table] = pysolr.SolrCloud(self.zooKeeper, coreName,
+                                                          timeout=self.__GetSetting(table, "timeout", 60),
+                                                          auth=self.__GetSetting(table, "auth", None),
+                                                          retry_policy=self.retryPolicy,
+                                                          results_cls=self.resultsClass, session=session)
+                else:
+                    self.mySOLR[table] = pysolr.Solr(endPoint + "/" + coreName,
+                                                   timeout=self.__GetSetting(table, "timeout", 60),
+                                                   auth=self.__GetSetting(table, "auth", None),
+                                                   retry_policy=self.retryPolicy, results_cls=self.resultsClass,
+                                                   session=session)
 
         except Exception as e:
             self.queryOK = False
             QgsMessageLog.logMessage("QueryManager::_MakeSOLRObjects: Could not make objects.")
             QgsMessageLog.logMessage("QueryManager::_MakeSOLRObjects: Exception: {}".format(e))
 
+    # ******************************************************************************************************************
+    def __GetSetting(self, inTable: str, inName: str, inDefault=None):
+        """
+        Returns a setting of a table
+        :param inTable: string with the table
+        :param inName: string with the name of the setting
+        :param inDefault: value for tables without the setting
+        :return: value of the setting
+        """
+
+        return self.tableSettings.get(inTable, dict()).get(inName, inDefault)
+
+    # ******************************************************************************************************************
+    def CreatePlan(self, inQuery: str, inCC3: str = "", inTable: str = "", inBounds: tuple = None) -> QueryPlan:
+        """
+        Build the plan of a search. Set inCC3 to "QGIS" to pull the bounds of the current QGIS view.
+        :param inQuery: string with the search term(s)
+        :param inCC3: string with the country to search
+        :param inTable: string with the table whose query parser settings are used
+        :param inBounds: optional tuple of xMin, yMin, xMax, yMax in degrees to limit the search to
+        :return: QueryPlan
+        :raises QueryError: if the search terms can not be searched
+        """
+
+        settings = self.tableSettings.get(inTable, dict())
+        parserParameters = {tName: settings[tName] for tName in ("qf", "mm", "pf") if settings.get(tName)}
+
+        filterQueries = self.__CreateCC3(inCC3, inTable)
+        if inBounds is not None:
+            filterQueries.append(self.__CreateBBoxFilter(inBounds))
+
+        return self.queryBuilder.Build(inQuery, filterQueries, inFields=settings.get("fields", ()),
+                                       inParser=settings.get("query_parser", "standard"),
+                                       inParserParameters=parserParameters)
+
     # ******************************************************************************************************************
     def Search(self, inQuery, inTable, inCC3="", ) -> pysolr.Results:
         """
         Perform the Solr search. Set useCurrentViewport to true to pull the bounds of the current
         QGIS view.
-        :param inQuery: string with the search term(s)
-        :param inCC3: string with the country to search
+        :param inQuery: string with the search term(s), or a QueryPlan from CreatePlan to reuse across tables
+        :param inCC3: string with the country to search, ignored when inQuery is a QueryPlan
         :param inTable: string with the table to search
         :return: pysolr.results
         """
 
         try:
-            self.queryTerms = str()
-
-            # Build the query
-            tempList = inQuery.split()
-            for item in tempList:
-                if item != tempList[-1]:
-                    self.queryTerms += "_text_:" + item + " AND "
-                    # self.queryTerms += item + " AND "
-                else:
-                    self.queryTerms += "_text_:" + item
-
-            if inCC3:
-                self.queryTerms += " AND {}".format(self.__CreateCC3(inCC3))
+            if isinstance(inQuery, QueryPlan):
+                self.queryPlan = inQuery
+            else:
+                self.queryPlan = self.CreatePlan(inQuery, inCC3, inTable)
 
             self.queryOK = True  # so the other functions know to go ahead
 
@@ -80,7 +189,53 @@ class QueryManager(object):
             QgsMessageLog.logMessage("QueryManager::Search: Exception: {}".format(e))
             QgsMessageLog.logMessage("QueryManager::Search: Traceback: {}".format(e.__traceback__))
             self.queryOK = False
-            return pysolr.Results()
+            return pysolr.Results({})
+
+    # ******************************************************************************************************************
+    def GetSolr(self, inTable):
+        """
+        Returns the Solr connection for a table
+        :param inTable: string with the table
+        :return: pysolr.Solr class
+        """
+
+        return self.mySOLR[inTable]
+
+    # ******************************************************************************************************************
+    def Ping(self, inTable):
+        """
+        Run a query that returns no documents against a table, which opens the connection and warms Solr's caches
+        :param inTable: string with the table
+        :return: number of documents in the table
+        """
+
+        return self.mySOLR[inTable].search(q="*:*", rows=0).hits
+
+    # ******************************************************************************************************************
+    def Suggest(self, inTables: list, inPrefix: str, inLimit: int = 10) -> tuple:
+        """
+        Get the most frequent indexed terms starting with a prefix from the terms component of the tables
+        :param inTables: list of tables to get terms from
+        :param inPrefix: string of the prefix
+        :param inLimit: maximum number of terms
+        :return: tuple of a list of (term, count) tuples, most frequent first, and whether those are all the terms
+                 with the prefix
+        """
+
+        counts = dict()
+        complete = True
+
+        for table in inTables:
+            terms = self.mySOLR[table].suggest_terms("_text_", inPrefix.lower(),
+                                                     **{"terms.limit": inLimit, "terms.sort": "count"})
+
+            terms = terms.get("_text_", ())
+            complete = complete and len(terms) < inLimit
+
+            for term, count in terms:
+                counts[term] = counts.get(term, 0) + count
+
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:inLimit], complete
 
     # ******************************************************************************************************************
     def GetPage(self, inTable, inPageNumber=0):
@@ -96,34 +251,146 @@ class QueryManager(object):
         except Exception as e:
             QgsMessageLog.logMessage("QueryManager::getpage: Exception: {}".format(e))
             self.queryOK = False
-            return pysolr.Results
+            return pysolr.Results({})
 
     # ******************************************************************************************************************
-    def __CreateCC3(self, inCC3=""):
+    def GetPages(self, inQuery, inTable: str, inMaxWorkers: int = 4):
         """
-        Creates the FQ parameter to pass in to SOLR
+        Run a search and yield all of its pages, fetching the next pages while the current one is read. Unlike Search
+        and GetPage this keeps no state, so it can run next to other searches. Pages are read with cursorMark, sorted
+        on the unique key after the sort of the plan, so deep pages cost no more than the first and no document is
+        skipped or repeated while the table changes. SolrCloud tables are read shard by shard in parallel. At most
+        inMaxWorkers pages are in memory beyond the one being read.
+        :param inQuery: string with the search term(s), or a QueryPlan from CreatePlan
+        :param inTable: string with the table to search
+        :param inMaxWorkers: number of pages fetched ahead of the reader, and of shards read at the same time, capped
+                             by max_connections of the table
+        :return: iterator of pysolr.Results classes, or ColumnarPage classes if columnar pages were requested
         """
 
-        if inCC3:
-            if inCC3 == "QGIS":
-                viewBounds = self.iface.mapCanvas().extent()
-                xMin, yMin, xMax, yMax = self.__ConvertExtentToGeographic(viewBounds)
+        plan = inQuery if isinstance(inQuery, QueryPlan) else self.CreatePlan(inQuery, "", inTable)
+        solr = self.mySOLR[inTable]
+        rows = self.__GetSetting(inTable, "rows", self.rows)
+        workers = max(1, min(inMaxWorkers, self.__GetSetting(inTable, "max_connections", inMaxWorkers)))
+        wrap = ColumnarPage if self.columnar else (lambda inResults: inResults)
 
-                # Swap the order to pass in since qgis is lat, long and solr is long, lat
-                return "the_geom:[{},{} TO {},{}]".format(yMin, xMin, yMax, xMax)
-            else:
-                return "_cc3:{}".format(inCC3)
+        parameters = plan.GetParameters()
+        parameters["sort"] = self.__GetCursorSort(plan.sort, solr.get_unique_key())
+
+        if isinstance(solr, pysolr.SolrCloud):
+            pages = solr.search_shards(rows=rows, max_workers=workers, **parameters)
+        else:
+            pages = solr.search_cursor(rows=rows, max_pages=workers, **parameters)
+
+        try:
+            for tPage in pages:
+                yield wrap(tPage)
+        finally:
+            pages.close()
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __GetCursorSort(inSort: str, inUniqueKey: str) -> str:
+        """
+        Returns a sort that cursorMark accepts, which is the sort of a plan ending with the unique key
+        :param inSort: string with the sort of the plan, or an empty string
+        :param inUniqueKey: string with the uniqueKey field of the table
+        :return: string with the sort
+        """
+
+        fields = [tClause.split()[0] for tClause in inSort.split(",") if tClause.strip()]
+        if inUniqueKey in fields:
+            return inSort
+
+        return ",".join(tClause for tClause in (inSort, "{} asc".format(inUniqueKey)) if tClause)
+
+    # ******************************************************************************************************************
+    def __CreateCC3(self, inCC3="", inTable: str = ""):
+        """
+        Creates the FQ parameters to pass in to SOLR. Tables with cc3_bbox set also limit countries to their padded
+        bounding box so Solr can prune spatially. The boxes are approximate, so this drops documents of the country
+        whose geometry lies outside them. Documents without a geometry are kept.
+        :param inCC3: string with the country to search
+        :param inTable: string with the table whose settings are used
+        :return: list of filter queries
+        """
+
+        if not inCC3:
+            return list()
+
+        if inCC3 == "QGIS":
+            viewBounds = self.iface.mapCanvas().extent()
+            return [self.__CreateBBoxFilter(self.__ConvertExtentToGeographic(viewBounds))]
+
+        if not self.__GetSetting(inTable, "cc3_bbox", False):
+            return ["_cc3:{}".format(inCC3)]
+
+        from .. import iso3166
+
+        country = iso3166.countries.get(inCC3, None)
+        if country is None or country.bbox is None:
+            return ["_cc3:{}".format(inCC3)]
+
+        return ["_cc3:{} AND ({} OR (*:* -the_geom:[* TO *]))".format(
+            inCC3, self.__CreateBBoxFilter(country.bbox, inPadding=0.5))]
+
+    # ******************************************************************************************************************
+    def __CreateBBoxFilter(self, inBounds, inPadding: float = 0.0):
+        """
+        Creates a bounding box filter on the_geom
+        :param inBounds: tuple of xMin, yMin, xMax, yMax in degrees. xMin > xMax crosses the antimeridian.
+        :param inPadding: degrees to grow the box by on every side
+        :return: string of the filter query
+        """
+
+        xMin, yMin, xMax, yMax = inBounds
+        yMin, yMax = max(yMin - inPadding, -90.0), min(yMax + inPadding, 90.0)
+
+        if xMin <= xMax:
+            xMin, xMax = max(xMin - inPadding, -180.0), min(xMax + inPadding, 180.0)
+        else:
+            xMin, xMax = min(xMin - inPadding, 180.0), max(xMax + inPadding, -180.0)
+
+        # Swap the order to pass in since qgis is lat, long and solr is long, lat
+        return "the_geom:[{},{} TO {},{}]".format(yMin, xMin, yMax, xMax)
 
     # ******************************************************************************************************************
     def __RunQuery(self, inTable, inPageNumber=0):
         """
         Actually perform the internal query
         :param inPageNumber: int pagenumber
-        :return: pysolr.Results class
+        :return: pysolr.Results class, or ColumnarPage class if columnar pages were requested
         """
 
         if self.queryOK:
-            return self.mySOLR[inTable].search(q=self.queryTerms, start=inPageNumber * self.rows, rows=self.rows)
+            if isinstance(self.mySOLR[inTable], pysolr.SolrCloud):
+                results = self.__RunShardQuery(inTable, inPageNumber)
+            else:
+                rows = self.__GetSetting(inTable, "rows", self.rows)
+                results = self.mySOLR[inTable].search(start=inPageNumber * rows, rows=rows,
+                                                      **self.queryPlan.GetParameters())
+
+            return ColumnarPage(results) if self.columnar else results
+
+    # ******************************************************************************************************************
+    def __RunShardQuery(self, inTable, inPageNumber=0):
+        """
+        Return the next page of the distrib=false fan-out over the shards of the table. Pages come back in arrival
+        order, so they can only be read sequentially.
+        :param inPageNumber: int pagenumber, 0 starts a new query
+        :return: pysolr.Results class
+        """
+
+        if inPageNumber == 0:
+            self.shardPages[inTable] = self.mySOLR[inTable].search_shards(
+                rows=self.__GetSetting(inTable, "rows", self.rows),
+                max_workers=self.__GetSetting(inTable, "max_connections", None), **self.queryPlan.GetParameters())
+
+        try:
+            return next(self.shardPages[inTable])
+        except StopIteration:
+            del self.shardPages[inTable]
+            return pysolr.Results({})
 
     # ******************************************************************************************************************
     def __ConvertExtentToGeographic(self, inExtent):
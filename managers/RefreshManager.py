@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+RefreshManager.py holds the RefreshManager class that brings loaded layers up to date with only the documents that
+changed in Solr since they were loaded.
+"""
+
+import datetime
+from qgis.core import QgsFeatureRequest, QgsMessageLog
+from .QueryBuilder import QueryPlan
+
+# Layer custom properties, kept with the layer in the project
+PROPERTY_TABLE = "qgissolr/table"
+PROPERTY_PLAN = "qgissolr/plan"
+PROPERTY_LATEST = "qgissolr/latest"
+
+
+class RefreshManager(object):
+    """
+    Class to refresh layers incrementally. Every layer loaded from a table with a timestamp_field keeps its QueryPlan
+    and the latest timestamp it holds as custom properties. A refresh searches again with the plan limited to the
+    documents changed since then and updates or adds them by their id through an index of id -> feature id. The ids
+    of all changed documents are fetched as well, so the features of documents that no longer match the plan, or are
+    marked deleted through the table's deleted_field, are removed. Both searches stop at the latest timestamp in the
+    table when the refresh starts, so they see the same changes and anything changed while they run is left to the
+    next refresh. The work done is proportional to the number of changes, not the size of the layer. Documents
+    deleted outright from Solr can not be seen this way.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inQueryManager, inTableManager, inTableSettings: dict = None, inIdField: str = "system_id"):
+        """
+        Initialization
+        :param inQueryManager: QueryManager to run the searches with
+        :param inTableManager: TableManager to get the fields and their types from
+        :param inTableSettings: optional dictionary of table -> settings from ConfigManager.GetTableSettings
+        :param inIdField: field holding the Solr uniqueKey
+        """
+
+        self.queryManager = inQueryManager
+        self.tableManager = inTableManager
+        self.tableSettings = inTableSettings or dict()
+        self.idField = inIdField
+        self.indexes = dict()  # layer id -> dictionary of document id -> feature id
+
+    # ******************************************************************************************************************
+    def IsRefreshable(self, inTable: str) -> bool:
+        """
+        Returns whether layers of a table can be refreshed
+        :param inTable: string with the table
+        :return: True if the table has a timestamp_field
+        """
+
+        return bool(self.tableSettings.get(inTable, dict()).get("timestamp_field"))
+
+    # ******************************************************************************************************************
+    def TrackLayer(self, inLayer, inTable: str, inPlan: QueryPlan):
+        """
+        Remember what a layer was loaded with. Call it before the pages are added with AddPage.
+        :param inLayer: QgsVectorLayer
+        :param inTable: Solr table the layer is loaded from
+        :param inPlan: QueryPlan the layer is loaded with
+        :return: None
+        """
+
+        layerId = inLayer.id()
+        self.indexes[layerId] = dict()
+
+        inLayer.setCustomProperty(PROPERTY_TABLE, inTable)
+        inLayer.setCustomProperty(PROPERTY_PLAN, inPlan.ToJSON())
+        inLayer.removeCustomProperty(PROPERTY_LATEST)
+        inLayer.willBeDeleted.connect(lambda: self.indexes.pop(layerId, None))
+
+    # ******************************************************************************************************************
+    def AddPage(self, inLayer, inPage, inFeatures: list):
+        """
+        Index the features added to a layer for a page and keep the latest timestamp of the page
+        :param inLayer: QgsVectorLayer being loaded
+        :param inPage: decoded ColumnarPage the features were built from
+        :param inFeatures: list of QgsFeature returned by the data provider, so with their feature ids
+        :return: None
+        """
+
+        table = inLayer.customProperty(PROPERTY_TABLE)
+        index = self.indexes.get(inLayer.id())
+        if index is None or not self.IsRefreshable(table):
+            return
+
+        idIndex = inLayer.fields().indexOf(self.idField)
+        for tFeature in inFeatures:
+            index[tFeature.attributes()[idIndex]] = tFeature.id()
+
+        field = self.tableSettings[table]["timestamp_field"]
+        latest = self.__GetLatest(inLayer.customProperty(PROPERTY_LATEST), inPage.columns.get(field, ()))
+        if latest is not None:
+            inLayer.setCustomProperty(PROPERTY_LATEST, latest)
+
+    # ******************************************************************************************************************
+    def Refresh(self, inLayer, inCreateFeatures) -> tuple:
+        """
+        Bring a layer up to date with the documents changed since it was loaded or last refreshed
+        :param inLayer: QgsVectorLayer tracked with TrackLayer
+        :param inCreateFeatures: function building the list of QgsFeature of a layer from a decoded ColumnarPage
+        :return: tuple of the number of features added, updated and removed
+        :raises ValueError: if the layer can not be refreshed
+        """
+
+        table = inLayer.customProperty(PROPERTY_TABLE)
+        plan = inLayer.customProperty(PROPERTY_PLAN)
+        latest = inLayer.customProperty(PROPERTY_LATEST)
+
+        if not table or not plan or not self.IsRefreshable(table):
+            raise ValueError("{} was not loaded from a table with a timestamp_field".format(inLayer.name()))
+        if latest is None:
+            raise ValueError("{} has no timestamps to refresh from".format(inLayer.name()))
+        if inLayer.isEditable():
+            raise ValueError("Save or discard the edits of {} before refreshing it".format(inLayer.name()))
+
+        settings = self.tableSettings[table]
+        timestampField = settings["timestamp_field"]
+        deletedField = settings.get("deleted_field")
+
+        # Inclusive, so documents changed within the same instant as the latest one are not missed. Updating them
+        # again does no harm.
+        cutoff = self.__GetCutoff(table, timestampField, latest)
+        if cutoff is None:
+            return 0, 0, 0
+
+        changedFilter = '{}:["{}" TO "{}"]'.format(timestampField, latest, cutoff)
+
+        plan = QueryPlan.FromJSON(plan)
+        filterQueries = plan.fq + (changedFilter,)
+        if deletedField:
+            filterQueries += ("-{}:true".format(deletedField),)
+
+        index = self.__GetIndex(inLayer)
+        dataProvider = inLayer.dataProvider()
+        fieldDecoder = self.tableManager.GetFieldDecoder(table)
+        idIndex = inLayer.fields().indexOf(self.idField)
+        if idIndex < 0:
+            raise ValueError("{} has no {} field".format(inLayer.name(), self.idField))
+
+        matching = set()
+        updated = 0
+        added = list()
+
+        for tPage in self.queryManager.GetPages(plan._replace(fq=filterQueries), table):
+            tPage.Decode(fieldDecoder)
+
+            attributeChanges = dict()
+            geometryChanges = dict()
+            for tFeature in inCreateFeatures(inLayer, tPage):
+                documentId = tFeature.attributes()[idIndex]
+                matching.add(documentId)
+
+                featureId = index.get(documentId)
+                if featureId is None:
+                    added.append(tFeature)
+                else:
+                    attributeChanges[featureId] = dict(enumerate(tFeature.attributes()))
+                    geometryChanges[featureId] = tFeature.geometry()
+
+            if attributeChanges:
+                dataProvider.changeAttributeValues(attributeChanges)
+                dataProvider.changeGeometryValues(geometryChanges)
+                updated += len(attributeChanges)
+
+        if added:
+            _, added = dataProvider.addFeatures(added)
+            for tFeature in added:
+                index[tFeature.attributes()[idIndex]] = tFeature.id()
+
+        # Every other changed document in the layer no longer belongs to it
+        changedPlan = QueryPlan("*:*", (changedFilter,), ",".join((self.idField, timestampField)), "", ())
+        removed = list()
+
+        for tPage in self.queryManager.GetPages(changedPlan, table):
+            tPage.Decode(fieldDecoder)
+
+            for tId in tPage.columns.get(self.idField, ()):
+                if tId not in matching and tId in index:
+                    removed.append(index.pop(tId))
+
+        if removed:
+            dataProvider.deleteFeatures(removed)
+
+        # Only moved on once every change is in the layer, so the changes of a failed refresh are fetched again
+        inLayer.setCustomProperty(PROPERTY_LATEST, cutoff)
+
+        if added or updated or removed:
+            inLayer.updateExtents()
+            inLayer.triggerRepaint()
+
+        QgsMessageLog.logMessage("RefreshManager::Refresh: {} added, {} updated and {} removed in {} since {}"
+                                 .format(len(added), updated, len(removed), inLayer.name(), latest))
+
+        return len(added), updated, len(removed)
+
+    # ******************************************************************************************************************
+    def __GetCutoff(self, inTable: str, inTimestampField: str, inLatest: str):
+        """
+        Returns the latest timestamp in a table, which bounds the searches of a refresh
+        :param inTable: string with the table
+        :param inTimestampField: string of the timestamp field
+        :param inLatest: string of the latest timestamp in the layer
+        :return: string of the timestamp, or None if nothing changed since inLatest
+        """
+
+        results = self.queryManager.GetSolr(inTable).search(q="*:*",
+                                                            fq=['{}:["{}" TO *]'.format(inTimestampField, inLatest)],
+                                                            fl=inTimestampField,
+                                                            sort="{} desc".format(inTimestampField), rows=1)
+
+        for tDoc in results:
+            if tDoc.get(inTimestampField) is not None:
+                return self.__FormatTimestamp(tDoc[inTimestampField])
+
+        return None
+
+    # ******************************************************************************************************************
+    def __GetIndex(self, inLayer) -> dict:
+        """
+        Returns the document id -> feature id index of a layer, reading it from the layer when it was not built while
+        loading, such as after the configuration changed
+        :param inLayer: QgsVectorLayer
+        :return: dictionary of document id -> feature id
+        """
+
+        index = self.indexes.get(inLayer.id())
+        if index is not None:
+            return index
+
+        index = dict()
+        idIndex = inLayer.fields().indexOf(self.idField)
+        if idIndex >= 0:
+            request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([idIndex])
+            for tFeature in inLayer.getFeatures(request):
+                index[tFeature.attributes()[idIndex]] = tFeature.id()
+
+        self.indexes[inLayer.id()] = index
+        return index
+
+    # ******************************************************************************************************************
+    def __GetLatest(self, inLatest, inTimestamps):
+        """
+        Returns the latest of a timestamp and a column of timestamps
+        :param inLatest: string of the latest timestamp so far, or None
+        :param inTimestamps: iterable of decoded timestamps, datetimes, date strings or numbers
+        :return: string of the latest timestamp, or None if there is none
+        """
+
+        candidates = [self.__FormatTimestamp(tValue) for tValue in inTimestamps if tValue is not None]
+        if inLatest is not None:
+            candidates.append(inLatest)
+
+        return max(candidates, key=self.__GetTimestampKey) if candidates else None
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __FormatTimestamp(inValue) -> str:
+        """
+        Format a timestamp the way Solr takes it in a range query
+        :param inValue: date string, datetime or number
+        :return: string
+        """
+
+        if isinstance(inValue, datetime.datetime):
+            if inValue.tzinfo is not None:
+                inValue = inValue.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+            return inValue.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        return str(inValue)
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __GetTimestampKey(inValue: str):
+        """
+        Returns what timestamps are compared by. Solr date strings sort as text once the trailing Z is dropped, so
+        fractions of a second sort after the whole second. Numbers sort as numbers.
+        :param inValue: string of the timestamp
+        :return: sort key
+        """
+
+        try:
+            return 0, float(inValue), ""
+        except ValueError:
+            return 1, 0.0, inValue.rstrip("Z")
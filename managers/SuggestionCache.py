@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+SuggestionCache.py holds the SuggestionCache class, a prefix trie of the term suggestions returned by Solr.
+"""
+
+
+class SuggestionCache(object):
+    """
+    Class to cache term suggestions by prefix. Every trie node can hold the terms Solr returned for its prefix. When
+    that list was complete, because Solr returned fewer terms than it was asked for, the suggestions of any longer
+    prefix are the terms of the list that start with it, so they are answered without asking Solr again.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inLimit: int = 10, inMaxEntries: int = 5000):
+        """
+        Initialization
+        :param inLimit: number of terms asked for per prefix
+        :param inMaxEntries: number of cached prefixes after which the cache starts over
+        """
+
+        self.limit = inLimit
+        self.maxEntries = inMaxEntries
+        self.root = dict()
+        self.entries = 0
+        self.hits = 0
+        self.misses = 0
+
+    # ******************************************************************************************************************
+    def Clear(self):
+        """
+        Forget all cached suggestions
+        :return: None
+        """
+
+        self.root = dict()
+        self.entries = 0
+
+    # ******************************************************************************************************************
+    def Lookup(self, inPrefix: str):
+        """
+        Get the suggestions for a prefix from the cache
+        :param inPrefix: string of the prefix
+        :return: list of (term, count) tuples, or None if Solr has to be asked
+        """
+
+        prefix = inPrefix.lower()
+        node = self.root
+        complete = None  # Terms of the longest complete prefix seen on the way down
+
+        for tChar in prefix:
+            if "terms" in node and node["complete"]:
+                complete = node["terms"]
+
+            node = node.get(tChar)
+            if node is None:
+                break
+
+        if node is not None and "terms" in node:
+            self.hits += 1
+            return node["terms"]
+
+        if complete is not None:
+            self.hits += 1
+            terms = [(tTerm, tCount) for tTerm, tCount in complete if tTerm.lower().startswith(prefix)]
+            self.Store(prefix, terms, True)
+            return terms
+
+        self.misses += 1
+        return None
+
+    # ******************************************************************************************************************
+    def Store(self, inPrefix: str, inTerms: list, inComplete: bool = None):
+        """
+        Cache the suggestions for a prefix
+        :param inPrefix: string of the prefix
+        :param inTerms: list of (term, count) tuples sorted by count
+        :param inComplete: whether these are all the terms with the prefix, by default when fewer than the limit
+        :return: None
+        """
+
+        if self.entries >= self.maxEntries:
+            self.Clear()
+
+        node = self.root
+        for tChar in inPrefix.lower():
+            node = node.setdefault(tChar, dict())
+
+        if "terms" not in node:
+            self.entries += 1
+
+        node["terms"] = list(inTerms)
+        node["complete"] = len(inTerms) < self.limit if inComplete is None else inComplete
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+SuggestionManager.py holds the SuggestionManager class that autocompletes the query box with terms from Solr.
+"""
+
+from qgis.core import QgsApplication, QgsMessageLog, QgsTask
+from qgis.PyQt.QtCore import QStringListModel, Qt, QTimer
+from qgis.PyQt.QtWidgets import QCompleter
+from .SuggestionCache import SuggestionCache
+
+
+class SuggestionManager(object):
+    """
+    Class to suggest completions of the last word typed in a line edit. Suggestions are asked for once typing pauses,
+    answered from a SuggestionCache when possible and otherwise fetched from the terms component of the tables in a
+    background task, so typing never waits on Solr.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inLineEdit, inGetSource, inMinimumLength: int = 3, inDelay: int = 250, inLimit: int = 10):
+        """
+        Initialization
+        :param inLineEdit: QLineEdit to complete
+        :param inGetSource: function returning the QueryManager and the list of tables to get terms from
+        :param inMinimumLength: number of characters of a word before suggestions are shown
+        :param inDelay: milliseconds typing has to pause before suggestions are looked up
+        :param inLimit: number of suggestions shown
+        """
+
+        self.lineEdit = inLineEdit
+        self.getSource = inGetSource
+        self.minimumLength = inMinimumLength
+        self.limit = inLimit
+        self.caches = dict()  # tables -> SuggestionCache
+        self.queryManager = None  # QueryManager the caches were filled from
+        self.task = None  # QgsTasks must be referenced from Python until they finish
+        self.suggestAgain = False  # The text changed while a task was running
+
+        self.model = QStringListModel()
+        self.completer = QCompleter(self.model, self.lineEdit)
+        self.completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.lineEdit.setCompleter(self.completer)
+
+        # Restarted on every keystroke, so it only fires once typing pauses
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(inDelay)
+        self.timer.timeout.connect(self.__Suggest)
+        self.lineEdit.textEdited.connect(lambda inText: self.timer.start())
+
+    # ******************************************************************************************************************
+    def __GetCache(self, inQueryManager, inTables: list):
+        """
+        Returns the cache for a set of tables, starting over when the QueryManager was replaced
+        :return: SuggestionCache
+        """
+
+        if inQueryManager is not self.queryManager:
+            self.caches = dict()
+            self.queryManager = inQueryManager
+
+        key = tuple(sorted(inTables))
+        if key not in self.caches:
+            self.caches[key] = SuggestionCache(self.limit)
+
+        return self.caches[key]
+
+    # ******************************************************************************************************************
+    def __Suggest(self):
+        """
+        Suggest completions for the last word of the line edit
+        :return: None
+        """
+
+        try:
+            text = self.lineEdit.text()
+            prefix = text.split(" ")[-1]
+            if len(prefix) < self.minimumLength:
+                return
+
+            queryManager, tables = self.getSource()
+            if queryManager is None or not tables:
+                return
+
+            cache = self.__GetCache(queryManager, tables)
+            terms = cache.Lookup(prefix)
+
+            if terms is not None:
+                self.__ShowTerms(text[:len(text) - len(prefix)], terms)
+            elif self.task is not None:
+                # Look again once the running request is done, it may already answer this prefix
+                self.suggestAgain = True
+            else:
+                self.task = QgsTask.fromFunction("SOLR suggestions for {}".format(prefix), self.__FetchTerms,
+                                                 queryManager, tables, prefix,
+                                                 on_finished=lambda inException, inResult=None:
+                                                 self.__FetchFinished(inException, inResult, cache, prefix))
+                QgsApplication.taskManager().addTask(self.task)
+
+        except Exception as e:
+            QgsMessageLog.logMessage("SuggestionManager::__Suggest: Exception: {}".format(e))
+
+    # ******************************************************************************************************************
+    def __FetchTerms(self, inTask, inQueryManager, inTables: list, inPrefix: str):
+        """
+        Get the terms from Solr. Runs in a QgsTask thread.
+        :return: tuple of the terms and whether they are complete
+        """
+
+        return inQueryManager.Suggest(inTables, inPrefix, self.limit)
+
+    # ******************************************************************************************************************
+    def __FetchFinished(self, inException, inResult, inCache, inPrefix: str):
+        """
+        Cache the fetched terms and show them if they still fit the text. Runs in the main thread.
+        :return: None
+        """
+
+        self.task = None
+
+        if inException is not None:
+            self.suggestAgain = False
+            QgsMessageLog.logMessage("SuggestionManager::__FetchFinished: Exception: {}".format(inException))
+            return
+
+        terms, complete = inResult
+        inCache.Store(inPrefix, terms, complete)
+
+        if self.suggestAgain or self.lineEdit.text().split(" ")[-1].lower() == inPrefix.lower():
+            self.suggestAgain = False
+            self.__Suggest()
+
+    # ******************************************************************************************************************
+    def __ShowTerms(self, inLeadingText: str, inTerms: list):
+        """
+        Offer the terms as completions of the last word
+        :param inLeadingText: text in front of the last word
+        :param inTerms: list of (term, count) tuples
+        :return: None
+        """
+
+        self.model.setStringList([inLeadingText + tTerm for tTerm, _ in inTerms])
+
+        if inTerms and self.lineEdit.hasFocus():
+            self.completer.complete()
@@ -3,10 +3,11 @@
 TableManager.py holds the class TableManager that handles grabbing the SOLR tables on startup
 """
 
-import requests
 import configparser
 import os
 from qgis.core import QgsMessageLog
+from . import pysolr
+from .ConnectionPool import ConnectionPool
 
 
 class TableManager(object):
@@ -16,14 +17,22 @@ class TableManager(object):
     """
 
     # ******************************************************************************************************************
-    def __init__(self, inSOLREndpoint: str, inSOLRTables: list):
+    def __init__(self, inSOLREndpoint: str, inSOLRTables: list, inTableSettings: dict = None,
+                 inConnectionPool: ConnectionPool = None):
         """
         Initialization
+        :param inTableSettings: optional dictionary of table -> settings, as returned by ConfigManager.GetTableSettings
+        :param inConnectionPool: optional ConnectionPool to share connections with other managers
         """
 
         self.SOLREndpoint = inSOLREndpoint
         self.SOLRTables = inSOLRTables
+        self.tableSettings = inTableSettings or dict()
+        self.connectionPool = inConnectionPool or ConnectionPool()  # Keeps the connections to Solr open
+        self.timeout = 60  # seconds, for tables without their own timeout
         self.tableDict = dict()
+        self.schemaCache = dict()  # Schemas only change on a redeploy, so fetch each one once
+        self.decoderCache = dict()
         self.__SolrTables()
 
     # ******************************************************************************************************************
@@ -53,26 +62,63 @@ class TableManager(object):
 
         return self.tableDict
 
+    # ******************************************************************************************************************
+    def GetTableSchema(self, inTableName: str) -> dict:
+        """
+        Query Solr for the schema of a table. The schema is cached after the first successful request.
+        :param inTableName: string with the table
+        :return: dictionary with the schema part of the Schema API response
+        """
+
+        if inTableName in self.schemaCache:
+            return self.schemaCache[inTableName]
+
+        settings = self.tableSettings.get(inTableName, dict())
+        endPoint = settings.get("endpoint", self.SOLREndpoint)
+        coreName = settings.get("core", inTableName.replace("_", ""))
+        session = self.connectionPool.GetSession(endPoint, settings.get("max_connections", 10))
+
+        tResponse = session.get(endPoint + "/" + coreName + "/schema", timeout=settings.get("timeout", self.timeout),
+                                auth=settings.get("auth", None))
+        tResponse.raise_for_status()
+
+        self.schemaCache[inTableName] = tResponse.json()["schema"]
+        return self.schemaCache[inTableName]
+
     # ******************************************************************************************************************
     def GetTableColumns(self, inTableName: str) -> list:
         """
         Query Solr and get the schema.
-        :return: list of Solr columns
+        :return: list of Solr columns, limited to the fields configured for the table if there are any
         """
 
         try:
-            coreName = inTableName.replace("_", "")
+            columns = [tColumn["name"] for tColumn in self.GetTableSchema(inTableName)["fields"]]
 
-            returnList = list()
-            tResponse = requests.get(self.SOLREndpoint + "/" + coreName + "/schema")
+            fields = self.tableSettings.get(inTableName, dict()).get("fields")
+            if fields:
+                columns = [tColumn for tColumn in columns if tColumn in fields]
 
-            if tResponse.json():
-                for tColumn in tResponse.json()["schema"]["fields"]:
-                    returnList.append(tColumn["name"])
-
-            return returnList
+            return columns
 
         except Exception as e:
             QgsMessageLog.logMessage("TableManger:GetTableColumns: Exception: {}".format(e))
             return list()
 
+    # ******************************************************************************************************************
+    def GetFieldDecoder(self, inTableName: str):
+        """
+        Returns the decoder that converts the documents of a table using the field types of its schema
+        :param inTableName: string with the table
+        :return: pysolr.SchemaDecoder, or None if the schema could not be read
+        """
+
+        if inTableName not in self.decoderCache:
+            try:
+                self.decoderCache[inTableName] = pysolr.SchemaDecoder(self.GetTableSchema(inTableName))
+
+            except Exception as e:
+                QgsMessageLog.logMessage("TableManger:GetFieldDecoder: Exception: {}".format(e))
+                return None
+
+        return self.decoderCache[inTableName]
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+WarmUpManager.py holds the WarmUpManager class that warms up and checks the configured cores in the background.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from qgis.core import QgsApplication, QgsMessageLog, QgsTask
+
+
+class WarmUpManager(object):
+    """
+    Class to get the first search off to a warm start. For every table it fetches and caches the schema through the
+    TableManager, which also opens its pooled connection, and then runs a rows=0 query through the QueryManager, which
+    opens the pooled connection of the table's Solr object and warms up Solr's caches. The latency of that query and
+    whether the core answered at all are kept per table. The managers themselves may be built in the task too, so
+    connecting to ZooKeeper does not hold up QGIS.
+    """
+
+    # ******************************************************************************************************************
+    def __init__(self, inTableManager=None, inQueryManager=None, inMaxWorkers: int = 8, inCreateManagers=None):
+        """
+        Initialization
+        :param inTableManager: TableManager of the configured tables
+        :param inQueryManager: QueryManager of the configured tables
+        :param inMaxWorkers: number of tables to warm up at the same time
+        :param inCreateManagers: optional function returning a tuple of the TableManager and QueryManager, called in
+                                 the task instead of passing them in. They are available once the warm up finished.
+        """
+
+        self.tableManager = inTableManager
+        self.queryManager = inQueryManager
+        self.createManagers = inCreateManagers
+        self.maxWorkers = inMaxWorkers
+        self.status = dict()  # table -> (available, latency in milliseconds, error message)
+        self.task = None  # QgsTasks must be referenced from Python until they finish
+        self.onFinished = None
+
+    # ******************************************************************************************************************
+    def Start(self, inOnFinished=None):
+        """
+        Start warming up the tables in a background task
+        :param inOnFinished: optional function called with the status dictionary in the main thread when done
+        :return: None
+        """
+
+        self.onFinished = inOnFinished
+        self.task = QgsTask.fromFunction("Warming up SOLR connections", self.__WarmUp,
+                                         on_finished=self.__WarmUpFinished)
+        QgsApplication.taskManager().addTask(self.task)
+
+    # ******************************************************************************************************************
+    def GetStatus(self) -> dict:
+        """
+        Returns the outcome of the last warm up
+        :return: dictionary of table -> (available, latency in milliseconds, error message)
+        """
+
+        return self.status
+
+    # ******************************************************************************************************************
+    def CheckTable(self, inTable: str) -> tuple:
+        """
+        Warm up and check a single table
+        :param inTable: string with the table
+        :return: tuple of whether the core answered, the query latency in milliseconds and the error message
+        """
+
+        try:
+            self.tableManager.GetTableSchema(inTable)
+
+            start = time.perf_counter()
+            self.queryManager.Ping(inTable)
+
+            return True, (time.perf_counter() - start) * 1000.0, ""
+
+        except Exception as e:
+            return False, None, str(e)
+
+    # ******************************************************************************************************************
+    def __WarmUp(self, inTask) -> dict:
+        """
+        Build the managers if asked to and check all tables. Runs in a QgsTask thread.
+        :return: status dictionary
+        """
+
+        if self.createManagers is not None:
+            self.tableManager, self.queryManager = self.createManagers()
+
+        tables = list(self.tableManager.GetSOLRTables())
+        if not tables:
+            return dict()
+
+        with ThreadPoolExecutor(max_workers=min(self.maxWorkers, len(tables))) as executor:
+            return dict(zip(tables, executor.map(self.CheckTable, tables)))
+
+    # ******************************************************************************************************************
+    def __WarmUpFinished(self, inException, inResult=None):
+        """
+        Keep the outcome of the warm up. Runs in the main thread.
+        :param inException: exception raised by the task, if any
+        :param inResult: status dictionary
+        :return: None
+        """
+
+        self.task = None
+
+        if inException is not None:
+            QgsMessageLog.logMessage("WarmUpManager::__WarmUpFinished: Exception: {}".format(inException))
+            return
+
+        self.status = inResult
+
+        for tTable, (available, latency, error) in self.status.items():
+            if available:
+                QgsMessageLog.logMessage("WarmUpManager: {} answered in {:.0f} ms".format(tTable, latency))
+            else:
+                QgsMessageLog.logMessage("WarmUpManager: {} is not available: {}".format(tTable, error))
+
+        if self.onFinished is not None:
+            self.onFinished(self.status)
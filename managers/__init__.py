@@ -1,4 +1,58 @@
-from .QueryManager import QueryManager
-from .TableManager import TableManager
+"""
+The managers are imported when they are first used, so loading the plugin does not pull in pysolr, requests and the
+other dependencies of the managers.
+"""
 
-__all__ = ["QueryManager", "TableManager"]
+import importlib
+import sys
+import types
+
+# Exported name -> module holding it
+_EXPORTS = {
+    "ColumnarPage": "ColumnarPage",
+    "ConfigManager": "ConfigManager",
+    "Configuration": "ConfigManager",
+    "ConnectionPool": "ConnectionPool",
+    "EditManager": "EditManager",
+    "ExportManager": "ExportManager",
+    "ExtractionManager": "ExtractionManager",
+    "LayerStatistics": "LayerStatistics",
+    "PageCodec": "PageCodec",
+    "PageSpool": "PageSpool",
+    "QueryBuilder": "QueryBuilder",
+    "QueryError": "QueryBuilder",
+    "QueryManager": "QueryManager",
+    "QueryPlan": "QueryBuilder",
+    "RefreshManager": "RefreshManager",
+    "SuggestionCache": "SuggestionCache",
+    "SuggestionManager": "SuggestionManager",
+    "TableManager": "TableManager",
+    "WarmUpManager": "WarmUpManager",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+
+class _Package(types.ModuleType):
+    """
+    Importing a module binds it to its package under its own name, which here is also the name of its class. Those
+    bindings are dropped so the name keeps resolving to the class.
+    """
+
+    def __setattr__(self, inName, inValue):
+        if inName in _EXPORTS and isinstance(inValue, types.ModuleType):
+            return
+        super().__setattr__(inName, inValue)
+
+
+sys.modules[__name__].__class__ = _Package
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+    value = getattr(importlib.import_module("." + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
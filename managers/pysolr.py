@@ -7,9 +7,14 @@ import logging
 import os
 import random
 import re
+import threading
 import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from types import MappingProxyType
 from xml.etree import ElementTree
-from pkg_resources import DistributionNotFound, get_distribution, parse_version
 
 import requests
 
@@ -33,10 +38,18 @@ except ImportError:
 
 try:
     # Python 3.X
-    from urllib.parse import quote
+    from urllib.parse import quote, urlsplit
 except ImportError:
     # Python 2.X
     from urllib import quote
+    from urlparse import urlsplit
+
+try:
+    # Python 3.X
+    import queue
+except ImportError:
+    # Python 2.X
+    import Queue as queue
 
 try:
     # Python 3.X
@@ -64,16 +77,31 @@ except NameError:
 __author__ = 'Daniel Lindsley, Joseph Kocherhans, Jacob Kaplan-Moss'
 __all__ = ['Solr']
 
-try:
-    pkg_distribution = get_distribution(__name__)
-    __version__ = pkg_distribution.version
-    version_info = pkg_distribution.parsed_version
-except DistributionNotFound:
-    __version__ = '0.0.dev0'
-    version_info = parse_version(__version__)
+
+def _load_version():
+    # pkg_resources is slow to import and scans every installed distribution,
+    # so the version is only looked up when something asks for it.
+    from pkg_resources import DistributionNotFound, get_distribution, parse_version
+
+    try:
+        pkg_distribution = get_distribution(__name__)
+        return pkg_distribution.version, pkg_distribution.parsed_version
+    except DistributionNotFound:
+        return '0.0.dev0', parse_version('0.0.dev0')
+
+
+def __getattr__(name):
+    if name in ('__version__', 'version_info'):
+        version, parsed_version = _load_version()
+        globals().update(__version__=version, version_info=parsed_version)
+        return globals()[name]
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
 
 def get_version():
-    return __version__
+    if '__version__' in globals():
+        return globals()['__version__']
+    return __getattr__('__version__')
 
 
 DATETIME_REGEX = re.compile(r'^(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})T(?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2})(\.\d+)?Z$')
@@ -217,21 +245,194 @@ def is_valid_xml_char_ordinal(i):
         )
 
 
+# Complement of the XML ``Char`` production checked by is_valid_xml_char_ordinal
+INVALID_XML_CHARS_REGEX = re.compile(r'[^\x09\x0a\x0d\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+
+
 def clean_xml_string(s):
     """
     Cleans string from invalid xml chars
 
-    Solution was found there::
-
-    http://stackoverflow.com/questions/8733233/filtering-out-certain-bytes-in-python
+    Equivalent to keeping only the characters accepted by
+    ``is_valid_xml_char_ordinal``, but done in one regular expression pass
+    that returns ``s`` itself when there is nothing to remove.
     """
-    return ''.join(c for c in s if is_valid_xml_char_ordinal(ord(c)))
+    if INVALID_XML_CHARS_REGEX.search(s) is None:
+        return s
+    return INVALID_XML_CHARS_REGEX.sub('', s)
 
 
 class SolrError(Exception):
     pass
 
 
+class SolrTransientError(SolrError):
+    """
+    Raised for failures that may succeed when retried: timeouts, refused
+    connections and 5xx responses. Client errors (4xx) stay plain ``SolrError``.
+    """
+    pass
+
+
+class CircuitBreaker(object):
+    """
+    Per-host circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and no
+    traffic is sent to the host for ``reset_timeout`` seconds. After that a
+    single half-open probe is let through: success closes the breaker again,
+    failure re-opens it for another ``reset_timeout``.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.time):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _reset_elapsed(self):
+        return self.clock() - self.opened_at >= self.reset_timeout
+
+    def is_available(self):
+        """
+        Returns whether a request could be sent now, without reserving the
+        half-open probe.
+        """
+        with self._lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return True
+            if self.state == CircuitBreaker.OPEN:
+                return self._reset_elapsed()
+            return not self._probing
+
+    def allow_request(self):
+        """
+        Returns whether a request may be sent now. When the breaker is open and
+        ``reset_timeout`` has passed this reserves the half-open probe.
+        """
+        with self._lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return True
+
+            if self.state == CircuitBreaker.OPEN:
+                if not self._reset_elapsed():
+                    return False
+                self.state = CircuitBreaker.HALF_OPEN
+                self._probing = False
+
+            if self._probing:
+                return False
+
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = CircuitBreaker.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == CircuitBreaker.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = CircuitBreaker.OPEN
+                self.opened_at = self.clock()
+            self._probing = False
+
+
+class RetryPolicy(object):
+    """
+    Retry policy shared by ``Solr`` and ``SolrCloud``.
+
+    Failed requests are retried up to ``max_attempts`` total attempts with
+    exponential backoff (``backoff * multiplier ** (attempt - 1)``, capped at
+    ``max_backoff``) and full jitter on the ``jitter`` fraction of each delay.
+
+    Retries are limited by a budget: every request deposits ``retry_budget``
+    tokens (capped at ``max_budget``) and every retry spends one, so a failing
+    cluster sees at most ``retry_budget`` extra load instead of a retry storm.
+
+    Each host gets a ``CircuitBreaker`` so failing nodes are skipped until a
+    half-open probe succeeds.
+
+    Usage::
+
+        policy = pysolr.RetryPolicy(max_attempts=4, backoff=0.5)
+        solr = pysolr.Solr('http://localhost:8983/solr/core', retry_policy=policy)
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.2, multiplier=2.0, max_backoff=10.0, jitter=0.5,
+                 retry_budget=0.2, max_budget=10.0, failure_threshold=5, reset_timeout=30.0, clock=time.time,
+                 sleep=time.sleep):
+        if max_attempts < 1:
+            raise ValueError('max_attempts must be at least 1')
+
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_budget = retry_budget
+        self.max_budget = max_budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = max_budget
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get_breaker(self, url):
+        """
+        Returns the ``CircuitBreaker`` for the host (scheme and netloc) of ``url``.
+        """
+        parts = urlsplit(url)
+        host = '%s://%s' % (parts.scheme, parts.netloc) if parts.netloc else url
+
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout, clock=self.clock)
+                self._breakers[host] = breaker
+            return breaker
+
+    def get_delay(self, attempt):
+        """
+        Returns the number of seconds to wait after failed attempt number ``attempt`` (1-based).
+        """
+        delay = min(self.max_backoff, self.backoff * (self.multiplier ** (attempt - 1)))
+        fixed = delay * (1.0 - self.jitter)
+        return fixed + random.uniform(0, delay - fixed)
+
+    def record_request(self):
+        with self._lock:
+            self._tokens = min(self.max_budget, self._tokens + self.retry_budget)
+
+    def acquire_retry(self, attempt):
+        """
+        Returns whether another attempt may follow failed attempt ``attempt``,
+        spending one retry token if so.
+        """
+        if attempt >= self.max_attempts:
+            return False
+
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
 class Results(object):
     """
     Default results class for wrapping decoded (from JSON) solr responses.
@@ -294,6 +495,244 @@ class Results(object):
         return iter(self.docs)
 
 
+class CompactResults(object):
+    """
+    Memory-lean alternative to ``Results`` with the same interface.
+
+    Only the hit count, QTime and cursor mark are read up front; ``debug``,
+    ``highlighting``, ``facets``, ``spellcheck``, ``stats`` and ``grouped``
+    are looked up when first accessed. ``docs`` is the decoded list itself,
+    not a copy.
+
+    Optionally accepts ``keep_raw``. When ``False``, ``raw_response`` is
+    ``None`` and only the non-document parts of the response are kept for the
+    metadata attributes. Default is ``True``.
+
+    Optionally accepts ``release_docs``. When ``True``, iterating hands each
+    document over and drops it from ``docs``, so a page that has been read no
+    longer holds its documents and ``len()`` counts the documents left.
+    Default is ``False``.
+
+    Use with ``functools.partial`` to set the options::
+
+        solr = pysolr.Solr('http://localhost:8983/solr',
+                           results_cls=partial(CompactResults, keep_raw=False, release_docs=True))
+
+    """
+
+    __slots__ = ('_response', '_raw', 'docs', 'hits', 'qtime', 'nextCursorMark', '_release_docs')
+
+    def __init__(self, decoded, keep_raw=True, release_docs=False):
+        response_part = decoded.get('response') or {}
+        self.docs = response_part.get('docs', [])
+        self.hits = response_part.get('numFound', 0)
+        self.qtime = decoded.get('responseHeader', {}).get('QTime', None)
+        self.nextCursorMark = decoded.get('nextCursorMark', None)
+        self._release_docs = release_docs
+
+        if keep_raw:
+            self._raw = self._response = decoded
+        else:
+            # Only drops the references to the documents, the metadata dicts are shared.
+            self._raw = None
+            self._response = dict((key, value) for key, value in decoded.items() if key != 'response')
+
+    @property
+    def raw_response(self):
+        return self._raw
+
+    @property
+    def debug(self):
+        return self._response.get('debug', {})
+
+    @property
+    def highlighting(self):
+        return self._response.get('highlighting', {})
+
+    @property
+    def facets(self):
+        return self._response.get('facet_counts', {})
+
+    @property
+    def spellcheck(self):
+        return self._response.get('spellcheck', {})
+
+    @property
+    def stats(self):
+        return self._response.get('stats', {})
+
+    @property
+    def grouped(self):
+        return self._response.get('grouped', {})
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __iter__(self):
+        if self._release_docs and isinstance(self.docs, list):
+            return self._release()
+        return iter(self.docs)
+
+    def _release(self):
+        docs = self.docs
+        # Popping from the end is O(1), so reverse once instead of shifting the list for every document.
+        docs.reverse()
+        try:
+            while docs:
+                yield docs.pop()
+        finally:
+            # Put whatever is left of an abandoned iteration back in order
+            docs.reverse()
+
+
+def _parse_datetime(value):
+    match = DATETIME_REGEX.search(value)
+    if match is None:
+        return value
+
+    date_values = dict((key, int(group)) for key, group in match.groupdict().items())
+    return datetime.datetime(date_values['year'], date_values['month'], date_values['day'],
+                             date_values['hour'], date_values['minute'], date_values['second'])
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return value == 'true'
+
+
+def _pair_terms(values):
+    """
+    Pairs up the flat ``[term, count, term, count, ...]`` lists of the terms
+    component in a single pass.
+    """
+    values = iter(values)
+    return zip(values, values)
+
+
+class SchemaDecoder(object):
+    """
+    Converts Solr documents to Python values using the field types of a core's
+    schema, as an alternative to the guessing done by ``Solr._to_python``.
+
+    Requires ``schema``, the ``schema`` part of the response of the Schema API
+    (``<core>/schema``). A conversion plan is worked out once per field, so
+    decoding a document is a single pass over its values. Values of string
+    and text fields are never converted.
+
+    Usage::
+
+        decoder = SchemaDecoder(solr_schema)
+        for doc in solr.search('*:*'):
+            doc = decoder.decode(doc)
+
+    """
+
+    STRING = 'string'
+    INTEGER = 'integer'
+    FLOAT = 'float'
+    BOOLEAN = 'boolean'
+    DATETIME = 'datetime'
+
+    # Field type class names (without package) per kind
+    TYPE_CLASSES = {
+        INTEGER: ('IntPointField', 'LongPointField', 'TrieIntField', 'TrieLongField', 'IntField', 'LongField'),
+        FLOAT: ('FloatPointField', 'DoublePointField', 'TrieFloatField', 'TrieDoubleField', 'FloatField',
+                'DoubleField'),
+        BOOLEAN: ('BoolField', ),
+        DATETIME: ('DatePointField', 'TrieDateField', 'DateField'),
+    }
+
+    CONVERTERS = {
+        INTEGER: int,
+        FLOAT: float,
+        BOOLEAN: _parse_bool,
+        DATETIME: _parse_datetime,
+    }
+
+    def __init__(self, schema):
+        kind_by_class = dict((type_class, kind) for kind, type_classes in self.TYPE_CLASSES.items()
+                             for type_class in type_classes)
+        field_types = {}
+
+        for field_type in schema.get('fieldTypes', ()):
+            type_class = field_type.get('class', '').rsplit('.', 1)[-1]
+            field_types[field_type['name']] = (kind_by_class.get(type_class, self.STRING),
+                                               field_type.get('multiValued', False))
+
+        def field_info(field):
+            kind, multi_valued = field_types.get(field.get('type'), (self.STRING, False))
+            return kind, field.get('multiValued', multi_valued)
+
+        self.fields = dict((field['name'], field_info(field)) for field in schema.get('fields', ()))
+        # Solr prefers the longest matching pattern
+        self.dynamic_fields = sorted(((field['name'], field_info(field)) for field in schema.get('dynamicFields', ())),
+                                     key=lambda item: -len(item[0]))
+        self._plan = {}
+
+    def _match_dynamic_field(self, name):
+        for pattern, info in self.dynamic_fields:
+            if pattern.startswith('*') and name.endswith(pattern[1:]):
+                return info
+            if pattern.endswith('*') and name.startswith(pattern[:-1]):
+                return info
+        return self.STRING, False
+
+    def get_field_info(self, name):
+        """
+        Returns ``(kind, multi_valued)`` for a field, resolving dynamic fields.
+        ``kind`` is one of the ``SchemaDecoder`` kind constants.
+        """
+        info = self.fields.get(name)
+        if info is None:
+            info = self._match_dynamic_field(name)
+            self.fields[name] = info
+        return info
+
+    def get_converter(self, name):
+        """
+        Returns the function converting a value of field ``name``, or ``None``
+        when values are used as they are.
+        """
+        try:
+            return self._plan[name]
+        except KeyError:
+            kind, multi_valued = self.get_field_info(name)
+            convert = self.CONVERTERS.get(kind)
+
+            if convert is not None:
+                # JSON responses already hold numbers and booleans; only convert strings
+                convert = self._convert_strings(convert, kind)
+
+            self._plan[name] = convert
+            return convert
+
+    @staticmethod
+    def _convert_strings(convert, kind):
+        def converter(value):
+            if isinstance(value, list):
+                return [converter(bit) for bit in value]
+            if isinstance(value, str):
+                try:
+                    return convert(value)
+                except ValueError:
+                    return value
+            if kind == SchemaDecoder.FLOAT and isinstance(value, int) and not isinstance(value, bool):
+                return float(value)
+            return value
+        return converter
+
+    def decode(self, doc):
+        """
+        Returns a copy of ``doc`` with every value converted by its field type.
+        """
+        decoded = {}
+        for name, value in doc.items():
+            convert = self.get_converter(name)
+            decoded[name] = value if convert is None else convert(value)
+        return decoded
+
+
 class Solr(object):
     """
     The main object for working with Solr.
@@ -308,6 +747,10 @@ class Solr(object):
     returned by ``.search()`` and ``.more_like_this()`` methods.
     Default is ``pysolr.Results``.
 
+    Optionally accepts ``session``, a ``requests.Session`` to send the
+    requests with, so several instances can share one connection pool.
+    Default is a new session per instance.
+
     Usage::
 
         solr = pysolr.Solr('http://localhost:8983/solr')
@@ -320,38 +763,104 @@ class Solr(object):
     """
 
     def __init__(self, url, decoder=None, timeout=60, results_cls=Results, search_handler='select', use_qt_param=False, always_commit=False,
-                 auth=None, verify=True):
+                 auth=None, verify=True, retry_policy=None, session=None):
         self.decoder = decoder or json.JSONDecoder()
         self.url = url
         self.timeout = timeout
         self.log = self._get_log()
-        self.session = None
+        self.session = session
         self.results_cls = results_cls
         self.search_handler = search_handler
         self.use_qt_param = use_qt_param
         self.auth = auth
         self.verify = verify
         self.always_commit = always_commit
+        self.retry_policy = retry_policy
+        self._unique_key = None
+        self._owns_session = False
 
     def get_session(self):
         if self.session is None:
             self.session = requests.Session()
             self.session.stream = False
             self.session.verify = self.verify
+            self._owns_session = True
         return self.session
 
+    def close(self):
+        """
+        Closes the session if this client created it. Sessions passed in are
+        left to their owner.
+        """
+        if self._owns_session:
+            self.session.close()
+            self.session = None
+            self._owns_session = False
+
     def _get_log(self):
         return LOG
 
-    def _create_full_url(self, path=''):
+    def _create_full_url(self, path='', base_url=None):
+        if base_url is None:
+            base_url = self.url
+
         if len(path):
-            return '/'.join([self.url.rstrip('/'), path.lstrip('/')])
+            return '/'.join([base_url.rstrip('/'), path.lstrip('/')])
 
         # No path? No problem.
+        return base_url
+
+    def _choose_url(self, policy):
+        """
+        Returns the base URL for the next attempt of a request sent under ``policy``.
+        """
         return self.url
 
     def _send_request(self, method, path='', body=None, headers=None, files=None):
-        url = self._create_full_url(path)
+        policy = self.retry_policy
+
+        if policy is None:
+            return self._send_single_request(method, path, body, headers, files)
+
+        policy.record_request()
+        attempt = 0
+
+        while True:
+            attempt += 1
+            base_url = self._choose_url(policy)
+            breaker = policy.get_breaker(base_url)
+
+            if not breaker.allow_request():
+                raise SolrTransientError("Circuit breaker is open for '%s', not sending request" % base_url)
+
+            try:
+                response = self._send_single_request(method, path, body, headers, files, base_url=base_url)
+            except SolrTransientError as err:
+                breaker.record_failure()
+
+                if not policy.acquire_retry(attempt):
+                    raise
+
+                delay = policy.get_delay(attempt)
+                self.log.warning('Attempt %d of %d failed, retrying after %0.3fs: %s',
+                                 attempt, policy.max_attempts, delay, err)
+                policy.sleep(delay)
+                continue
+            except SolrError:
+                # The host answered, it just did not like the request.
+                breaker.record_success()
+                raise
+            except BaseException:
+                # Anything else still has to end the attempt, or a half-open
+                # breaker would wait for its probe forever.
+                breaker.record_failure()
+                raise
+
+            breaker.record_success()
+            return response
+
+    def _send_single_request(self, method, path='', body=None, headers=None, files=None, base_url=None):
+        url = self._create_full_url(path, base_url)
         method = method.lower()
         log_body = body
 
@@ -381,21 +890,27 @@ class Solr(object):
         if bytes_body is not None:
             bytes_body = force_bytes(body)
         try:
+            # verify is sent with every request, as the session may be shared
+            # with clients that verify differently.
             resp = requests_method(url, data=bytes_body, headers=headers, files=files,
-                                   timeout=self.timeout, auth=self.auth)
+                                   timeout=self.timeout, auth=self.auth, verify=self.verify)
         except requests.exceptions.Timeout as err:
             error_message = "Connection to server '%s' timed out: %s"
             self.log.error(error_message, url, err, exc_info=True)
-            raise SolrError(error_message % (url, err))
+            raise SolrTransientError(error_message % (url, err))
         except requests.exceptions.ConnectionError as err:
             error_message = "Failed to connect to server at '%s', are you sure that URL is correct? Checking it in a browser might help: %s"
             params = (url, err)
             self.log.error(error_message, *params, exc_info=True)
-            raise SolrError(error_message % params)
+            raise SolrTransientError(error_message % params)
         except HTTPException as err:
             error_message = "Unhandled error: %s %s: %s"
             self.log.error(error_message, method, url, err, exc_info=True)
-            raise SolrError(error_message % (method, url, err))
+            raise SolrTransientError(error_message % (method, url, err))
+        except requests.exceptions.RequestException as err:
+            error_message = "Request to '%s' failed: %s"
+            self.log.error(error_message, url, err, exc_info=True)
+            raise SolrError(error_message % (url, err))
 
         end_time = time.time()
         self.log.info("Finished '%s' (%s) with body '%s' in %0.3f seconds, with status %s",
@@ -409,6 +924,8 @@ class Solr(object):
                                            'response': resp.content,
                                            'request_body': bytes_body,
                                            'request_headers': headers}})
+            if int(resp.status_code) >= 500:
+                raise SolrTransientError(error_message % (resp.status_code, solr_message))
             raise SolrError(error_message % (resp.status_code, solr_message))
 
         return force_unicode(resp.content)
@@ -450,7 +967,7 @@ class Solr(object):
         return self._select(params, handler)
 
     def _update(self, message, clean_ctrl_chars=True, commit=None, softCommit=False, waitFlush=None, waitSearcher=None,
-                overwrite=None, handler='update'):
+                overwrite=None, handler='update', commitWithin=None, solrapi='XML'):
         """
         Posts the given xml message to http://<self.url>/update and
         returns the result.
@@ -459,6 +976,10 @@ class Solr(object):
         of control characters (default True). This is done by default because
         these characters would cause Solr to fail to parse the XML. Only pass
         False if you're positive your data is clean.
+
+        With ``solrapi='JSON'`` the message is a JSON body (a string or an
+        iterable of byte chunks, which is streamed with chunked transfer
+        encoding) and is never cleaned, since JSON escapes control characters.
         """
 
         # Per http://wiki.apache.org/solr/UpdateXmlMessages, we can append a
@@ -490,9 +1011,15 @@ class Solr(object):
         if waitSearcher is not None:
             query_vars.append('waitSearcher=%s' % str(bool(waitSearcher)).lower())
 
+        if commitWithin is not None:
+            query_vars.append('commitWithin=%d' % int(commitWithin))
+
         if query_vars:
             path = '%s?%s' % (path, '&'.join(query_vars))
 
+        if solrapi == 'JSON':
+            return self._send_request('post', path, message, {'Content-type': 'application/json; charset=utf-8'})
+
         # Clean the message of ctrl characters.
         if clean_ctrl_chars:
             message = sanitize(message)
@@ -641,6 +1168,10 @@ class Solr(object):
     def _to_python(self, value):
         """
         Converts values from Solr to native Python values.
+
+        This guesses the type of every string, which is slow and can turn
+        ID-like strings into numbers. When the schema is available use
+        ``SchemaDecoder`` instead.
         """
         if isinstance(value, (int, float, long, complex)):
             return value
@@ -749,6 +1280,55 @@ class Solr(object):
         )
         return self.results_cls(decoded)
 
+    def get_unique_key(self):
+        """
+        Returns the name of the ``uniqueKey`` field of the core, which is
+        looked up once.
+        """
+        if self._unique_key is None:
+            response = self._send_request('get', 'schema/uniquekey?wt=json')
+            self._unique_key = self.decoder.decode(response)['uniqueKey']
+        return self._unique_key
+
+    def search_cursor(self, q, sort=None, rows=500, max_pages=2, **kwargs):
+        """
+        Pages through every result of ``q`` with ``cursorMark`` and yields the
+        pages in order.
+
+        Every page costs the same, unlike deep ``start`` offsets, and no
+        document is skipped or repeated while the index changes. ``sort``
+        defaults to the unique key and must include it when given. The next
+        pages are fetched in the background while the current one is used;
+        ``max_pages`` (default: 2) is the number of fetched pages that may
+        wait to be consumed.
+
+        Usage::
+
+            for page in solr.search_cursor('*:*', rows=1000, fl='id,title'):
+                for doc in page:
+                    print(doc['id'])
+
+        """
+        if sort is None:
+            sort = '%s asc' % self.get_unique_key()
+
+        yield from _stream_pages([lambda: self._iter_cursor(q, sort, rows, **kwargs)], 1, max(1, max_pages))
+
+    def _iter_cursor(self, q, sort, rows, **kwargs):
+        """
+        Yields the pages of ``q`` that have documents, following ``cursorMark``
+        until it stops moving.
+        """
+        cursor = '*'
+
+        while True:
+            page = self.search(q, sort=sort, rows=rows, cursorMark=cursor, **kwargs)
+            if len(page):
+                yield page
+            if page.nextCursorMark in (None, cursor):
+                return
+            cursor = page.nextCursorMark
+
     def more_like_this(self, q, mltfl, handler='mlt', **kwargs):
         """
         Finds and returns results similar to the provided query.
@@ -803,19 +1383,56 @@ class Solr(object):
         # in Solr 3.x the value of terms is a dict:
         #   {"field_name": ["dance",23,"dancers",10,"dancing",8,"dancer",6]}
         if isinstance(terms, (list, tuple)):
-            terms = dict(zip(terms[0::2], terms[1::2]))
+            terms = dict(_pair_terms(terms))
 
         for field, values in terms.items():
-            tmp = list()
-
-            while values:
-                tmp.append((values.pop(0), values.pop(0)))
-
-            res[field] = tmp
+            res[field] = list(_pair_terms(values))
 
         self.log.debug("Found '%d' Term suggestions results.", sum(len(j) for i, j in res.items()))
         return res
 
+    def iter_suggest_terms(self, field, prefix='', page_size=1000, handler='terms', **kwargs):
+        """
+        Accepts a field name and an optional prefix
+
+        Returns an iterator of ``(term, count)`` pairs of the field in index
+        order. Terms are fetched ``page_size`` at a time, each page starting
+        after the last term of the previous one, so any number of terms can
+        be read (e.g. to build an autocomplete dictionary) with bounded
+        memory.
+
+        Requires Solr 1.4+.
+        """
+        lower = None
+
+        while True:
+            params = {
+                'terms.fl': field,
+                'terms.prefix': prefix,
+                'terms.limit': page_size,
+                'terms.sort': 'index',
+            }
+            params.update(kwargs)
+
+            if lower is not None:
+                params['terms.lower'] = lower
+                params['terms.lower.incl'] = 'false'
+
+            response = self._suggest_terms(params, handler=handler)
+            terms = self.decoder.decode(response).get("terms", {})
+
+            if isinstance(terms, (list, tuple)):
+                terms = dict(_pair_terms(terms))
+
+            fetched = 0
+            for term, count in _pair_terms(terms.get(field, ())):
+                fetched += 1
+                lower = term
+                yield term, count
+
+            if fetched < page_size:
+                return
+
     def _build_doc(self, doc, boost=None, fieldUpdates=None):
         doc_elem = ElementTree.Element('doc')
 
@@ -859,8 +1476,65 @@ class Solr(object):
 
         return doc_elem
 
+    def _from_python_json(self, value):
+        """
+        Converts python values to a form suitable for a JSON update message.
+        Numbers and booleans are kept as they are; control characters are left
+        for the JSON encoder to escape.
+        """
+        if hasattr(value, 'strftime'):
+            if hasattr(value, 'hour'):
+                offset = value.utcoffset()
+                if offset:
+                    value = value - offset
+                return value.replace(tzinfo=None).isoformat() + 'Z'
+            return "%sT00:00:00Z" % value.isoformat()
+
+        if isinstance(value, (bool, int, long, float)):
+            return value
+
+        if isinstance(value, bytes):
+            return force_unicode(value)
+
+        return "{0}".format(value)
+
+    def _build_json_doc(self, doc, fieldUpdates=None):
+        json_doc = {}
+
+        for key, value in doc.items():
+            if key == NESTED_DOC_KEY:
+                json_doc[key] = [self._build_json_doc(child, fieldUpdates) for child in value]
+                continue
+
+            if key == '_doc':
+                children = value if isinstance(value, (list, tuple)) else (value, )
+                json_doc.setdefault(NESTED_DOC_KEY, []).extend(self._build_json_doc(child) for child in children)
+                continue
+
+            if (value is None or value == '') and fieldUpdates and key in fieldUpdates:
+                # An atomic update to null removes the field, one to an empty
+                # string is an edit like any other.
+                json_doc[key] = {fieldUpdates[key]: value}
+                continue
+
+            if isinstance(value, (list, tuple, set)):
+                value = [self._from_python_json(bit) for bit in value if not self._is_null_value(bit)]
+                if not value:
+                    continue
+            elif self._is_null_value(value):
+                continue
+            else:
+                value = self._from_python_json(value)
+
+            if fieldUpdates and key in fieldUpdates:
+                value = {fieldUpdates[key]: value}
+
+            json_doc[key] = value
+
+        return json_doc
+
     def add(self, docs, boost=None, fieldUpdates=None, commit=None, softCommit=False, commitWithin=None, waitFlush=None,
-            waitSearcher=None, overwrite=None, handler='update'):
+            waitSearcher=None, overwrite=None, handler='update', solrapi='XML', batch_size=None, max_workers=None):
         """
         Adds or updates documents.
 
@@ -871,7 +1545,7 @@ class Solr(object):
 
         Optionally accepts ``softCommit``. Default is ``False``.
 
-        Optionally accepts ``boost``. Default is ``None``.
+        Optionally accepts ``boost``. Default is ``None``. Only supported by the XML API.
 
         Optionally accepts ``fieldUpdates``. Default is ``None``.
 
@@ -883,6 +1557,18 @@ class Solr(object):
 
         Optionally accepts ``overwrite``. Default is ``None``.
 
+        Optionally accepts ``solrapi``, ``'XML'`` or ``'JSON'``. Default is
+        ``'XML'``. JSON documents are serialized incrementally into a chunked
+        request body instead of building and cleaning one large XML string.
+
+        Optionally accepts ``batch_size``. Default is ``None`` (one request).
+        When set, ``docs`` may be any iterable; it is consumed ``batch_size``
+        documents at a time, any commit is sent once after the last batch and
+        a list of the batch responses is returned.
+
+        Optionally accepts ``max_workers``. Default is ``None``. With
+        ``batch_size``, up to this many batches are sent in parallel.
+
         Usage::
 
             solr.add([
@@ -895,13 +1581,71 @@ class Solr(object):
                     "title": "The Banana: Tasty or Dangerous?",
                 },
             ])
+
+            # Stream a large generator of documents as JSON, four requests at a time.
+            solr.add(read_documents(), solrapi='JSON', batch_size=5000, max_workers=4, commitWithin=10000)
+        """
+        if solrapi not in ('XML', 'JSON'):
+            raise ValueError('solrapi must be "XML" or "JSON", not %r' % (solrapi, ))
+
+        if boost and solrapi == 'JSON':
+            raise ValueError('Index-time boosts are only supported with solrapi="XML".')
+
+        options = dict(boost=boost, fieldUpdates=fieldUpdates, commitWithin=commitWithin, overwrite=overwrite,
+                       handler=handler, solrapi=solrapi)
+
+        if not batch_size:
+            return self._add_batch(docs, commit=commit, softCommit=softCommit, waitFlush=waitFlush,
+                                   waitSearcher=waitSearcher, **options)
+
+        if commit is None:
+            commit = self.always_commit
+
+        # Commit once at the end rather than after every batch.
+        options.update(commit=False, softCommit=False)
+        batches = _iter_batches(docs, batch_size)
+
+        if not max_workers or max_workers < 2:
+            responses = [self._add_batch(batch, **options) for batch in batches]
+        else:
+            # Create the shared session before the workers race to do it.
+            self.get_session()
+            responses = []
+            pending = deque()
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for batch in batches:
+                    # Bound the number of batches held in memory.
+                    if len(pending) >= 2 * max_workers:
+                        responses.append(pending.popleft().result())
+                    pending.append(executor.submit(self._add_batch, batch, **options))
+
+                while pending:
+                    responses.append(pending.popleft().result())
+
+        if commit or softCommit:
+            self.commit(softCommit=softCommit, waitFlush=waitFlush, waitSearcher=waitSearcher, handler=handler)
+
+        return responses
+
+    def _add_batch(self, docs, boost=None, fieldUpdates=None, commit=None, softCommit=False, commitWithin=None,
+                   waitFlush=None, waitSearcher=None, overwrite=None, handler='update', solrapi='XML'):
         """
+        Sends one update request for ``docs``. See ``add`` for the arguments.
+        """
+        if solrapi == 'JSON':
+            message = _JSONUpdateBody([self._build_json_doc(doc, fieldUpdates=fieldUpdates) for doc in docs])
+            self.log.debug("Built JSON add request of %s docs.", len(message.docs))
+            return self._update(message, commit=commit, softCommit=softCommit, waitFlush=waitFlush,
+                                waitSearcher=waitSearcher, overwrite=overwrite, handler=handler,
+                                commitWithin=commitWithin, solrapi=solrapi)
+
         start_time = time.time()
         self.log.debug("Starting to build add request...")
         message = ElementTree.Element('add')
 
         if commitWithin:
-            message.set('commitWithin', commitWithin)
+            message.set('commitWithin', force_unicode(commitWithin))
 
         for doc in docs:
             el = self._build_doc(doc, boost=boost, fieldUpdates=fieldUpdates)
@@ -1072,6 +1816,55 @@ class Solr(object):
         return data
 
 
+def _iter_batches(iterable, batch_size):
+    """
+    Yields lists of up to ``batch_size`` items from ``iterable``.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class _JSONUpdateBody(object):
+    """
+    JSON array of update documents serialized on the fly.
+
+    Iterating yields UTF-8 chunks of about ``chunk_size`` bytes, which
+    ``requests`` sends with chunked transfer encoding, so the whole body never
+    exists as one string. It can be iterated again if a request is retried.
+    """
+
+    def __init__(self, docs, chunk_size=65536):
+        self.docs = docs
+        self.chunk_size = chunk_size
+
+    def __repr__(self):
+        return '<JSON update of %d docs>' % len(self.docs)
+
+    def __iter__(self):
+        encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        parts = ['[']
+        size = 1
+
+        for index, doc in enumerate(self.docs):
+            part = encoder.encode(doc)
+            if index:
+                part = ',' + part
+            parts.append(part)
+            size += len(part)
+
+            if size >= self.chunk_size:
+                yield ''.join(parts).encode('utf-8')
+                parts = []
+                size = 0
+
+        parts.append(']')
+        yield ''.join(parts).encode('utf-8')
+
+
 class SolrCoreAdmin(object):
     """
     Handles core admin operations: see http://wiki.apache.org/solr/CoreAdmin
@@ -1199,52 +1992,290 @@ REPLACEMENTS = (
 )
 
 
-def sanitize(data):
-    fixed_string = force_bytes(data)
+# All REPLACEMENTS delete a single byte, so they can be applied in one
+# bytes.translate pass. These bytes never occur inside a multi-byte UTF-8
+# sequence, so deleting them from the encoded message is safe.
+SANITIZE_DELETE_BYTES = b''.join(bad for bad, good in REPLACEMENTS)
 
-    for bad, good in REPLACEMENTS:
-        fixed_string = fixed_string.replace(bad, good)
+
+def sanitize(data):
+    fixed_string = force_bytes(data).translate(None, SANITIZE_DELETE_BYTES)
 
     return force_unicode(fixed_string)
 
 
 class SolrCloud(Solr):
+    """
+    ``Solr`` client that routes requests through the cluster state kept by
+    ``ZooKeeper``.
+
+    Failed requests are retried on another active replica according to
+    ``retry_policy``. When no policy is given a default ``RetryPolicy`` is
+    built whose initial backoff is ``retry_timeout`` seconds.
+    """
 
     def __init__(self, zookeeper, collection, decoder=None, timeout=60, retry_timeout=0.2, auth=None, verify=True,
-                 *args, **kwargs):
+                 *args, retry_policy=None, **kwargs):
         url = zookeeper.getRandomURL(collection)
         self.auth = auth
         self.verify = verify
 
+        if retry_policy is None:
+            retry_policy = RetryPolicy(backoff=retry_timeout)
+
         super(SolrCloud, self).__init__(url, decoder=decoder, timeout=timeout, auth=self.auth, verify = self.verify,
-                                        *args, **kwargs)
+                                        retry_policy=retry_policy, *args, **kwargs)
 
         self.zookeeper = zookeeper
         self.collection = collection
         self.retry_timeout = retry_timeout
+        self._routing = threading.local()
 
-    def _randomized_request(self, method, path, body, headers, files):
-        self.url = self.zookeeper.getRandomURL(self.collection)
+    def _choose_url(self, policy):
+        only_leader = getattr(self._routing, 'only_leader', False)
+        hosts = self.zookeeper.getHosts(self.collection, only_leader=only_leader)
+        if not hosts:
+            raise SolrError('ZooKeeper returned no active shards!')
+
+        # Skip nodes whose circuit breaker is open; if all of them are, let the
+        # breaker of a random one refuse the request.
+        available = [host for host in hosts if policy.get_breaker(host).is_available()]
+        self.url = '%s/%s' % (random.choice(available or hosts), self.collection)
         LOG.debug('Using random URL: %s', self.url)
-        return Solr._send_request(self, method, path, body, headers, files)
+        return self.url
 
-    def _send_request(self, method, path='', body=None, headers=None, files=None):
-        # FIXME: this needs to have a maximum retry counter rather than waiting endlessly
+    def _update(self, *args, **kwargs):
+        self._routing.only_leader = True
         try:
-            return self._randomized_request(method, path, body, headers, files)
-        except requests.exceptions.RequestException:
-            LOG.warning('RequestException, retrying after %fs', self.retry_timeout, exc_info=True)
-            time.sleep(self.retry_timeout)  # give zookeeper time to notice
-            return self._randomized_request(method, path, body, headers, files)
-        except SolrError:
-            LOG.warning('SolrException, retrying after %fs', self.retry_timeout, exc_info=True)
-            time.sleep(self.retry_timeout)  # give zookeeper time to notice
-            return self._randomized_request(method, path, body, headers, files)
+            return Solr._update(self, *args, **kwargs)
+        finally:
+            self._routing.only_leader = False
 
-    def _update(self, *args, **kwargs):
-        self.url = self.zookeeper.getLeaderURL(self.collection)
-        LOG.debug('Using random leader URL: %s', self.url)
-        return Solr._update(self, *args, **kwargs)
+    def search_shards(self, q, sort=None, rows=500, max_workers=None, max_pages=None, **kwargs):
+        """
+        Runs ``q`` against every shard of the collection directly and yields
+        the pages as they arrive.
+
+        One replica of each shard is sent non-distributed (``distrib=false``)
+        cursor queries in parallel, so no node has to coordinate the query and
+        throughput scales with the number of shards. Pages from different
+        shards are interleaved in arrival order; within a shard they follow
+        ``sort``, which defaults to the collection's unique key and must
+        include it when given.
+
+        Optionally accepts ``max_workers`` (default: one per shard) and
+        ``max_pages``, the number of fetched pages that may wait to be consumed
+        (default: two per worker).
+
+        Usage::
+
+            for page in solr.search_shards('*:*', rows=1000, fl='id,title'):
+                for doc in page:
+                    print(doc['id'])
+
+        """
+        shards = [shard for shard in self.zookeeper.getRoute(self.collection).shards if shard.replicas]
+        if not shards:
+            raise SolrError('ZooKeeper returned no active shards!')
+
+        if sort is None:
+            sort = '%s asc' % self.get_unique_key()
+
+        # The shards share the session of the collection, and with it its pooled connections
+        session = self.get_session()
+
+        def fetch_shard(shard):
+            solr = _ShardReplicas(shard.replicas, decoder=self.decoder, timeout=self.timeout,
+                                  results_cls=self.results_cls, search_handler=self.search_handler,
+                                  use_qt_param=self.use_qt_param, auth=self.auth, verify=self.verify,
+                                  retry_policy=self.retry_policy, session=session)
+            return solr._iter_cursor(q, sort, rows, distrib='false', **kwargs)
+
+        workers = max_workers or len(shards)
+        yield from _stream_pages([partial(fetch_shard, shard) for shard in shards], workers,
+                                 max_pages or 2 * workers)
+
+
+def _stream_pages(sources, max_workers, max_pages):
+    """
+    Calls every function of ``sources`` in a pool of ``max_workers`` threads
+    and yields the pages of the iterables they return as they arrive. Pages
+    of one source keep their order.
+
+    At most ``max_pages`` fetched pages wait to be consumed. The first error
+    of a source is raised, and once the consumer stops the sources stop after
+    the page they are fetching.
+    """
+    pages = queue.Queue(maxsize=max_pages)
+    stopped = threading.Event()
+    finished = object()
+
+    def put(item):
+        # Blocks while the consumer is behind, but gives up once it has gone away.
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def fetch(source):
+        try:
+            for page in source():
+                if stopped.is_set():
+                    break
+                put(page)
+        except Exception as err:
+            put(err)
+        finally:
+            put(finished)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for source in sources:
+            executor.submit(fetch, source)
+
+        remaining = len(sources)
+        while remaining:
+            item = pages.get()
+            if item is finished:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stopped.set()
+        executor.shutdown(wait=False)
+
+
+class _ShardReplicas(Solr):
+    """
+    ``Solr`` client bound to the replicas of a single shard, failing over
+    between them under its retry policy.
+    """
+
+    def __init__(self, replicas, **kwargs):
+        super(_ShardReplicas, self).__init__(replicas[0], **kwargs)
+        self.replicas = replicas
+
+    def _choose_url(self, policy):
+        available = [url for url in self.replicas if policy.get_breaker(url).is_available()]
+        self.url = random.choice(available or self.replicas)
+        return self.url
+
+
+# Routing information for one shard: ``replicas`` holds the core URLs of its
+# active replicas on live nodes and ``leader`` the core URL of its leader (or None).
+ShardRoute = namedtuple('ShardRoute', 'name replicas leader')
+
+# Routing information for a collection or alias: the distinct base URLs of all
+# active replicas (``hosts``) and of the shard leaders (``leaders``), plus the
+# per-shard routes.
+CollectionRoute = namedtuple('CollectionRoute', 'hosts leaders shards')
+
+
+def _unique(values):
+    """
+    Returns the distinct ``values`` as a tuple, keeping their first-seen order.
+    """
+    seen = set()
+    return tuple(value for value in values if not (value in seen or seen.add(value)))
+
+
+def _merge_routes(routes):
+    routes = list(routes)
+    return CollectionRoute(_unique(host for route in routes for host in route.hosts),
+                           _unique(leader for route in routes for leader in route.leaders),
+                           _unique(shard for route in routes for shard in route.shards))
+
+
+def build_routing_table(collections, live_nodes=None, aliases=None):
+    """
+    Builds an immutable mapping of collection and alias names to ``CollectionRoute``.
+
+    ``collections`` is the decoded ``clusterstate.json``, ``live_nodes`` the
+    children of ``/live_nodes`` (``None`` when not known yet, which disables
+    the filter) and ``aliases`` the collection aliases from ``aliases.json``.
+    """
+    if live_nodes is not None:
+        live_nodes = frozenset(live_nodes)
+
+    routes = {}
+
+    for collname, collection in (collections or {}).items():
+        hosts = []
+        leaders = []
+        shards = []
+
+        for shardname, shard in collection.get(ZooKeeper.SHARDS, {}).items():
+            if shard.get(ZooKeeper.STATE) != ZooKeeper.ACTIVE:
+                continue
+
+            replicas = []
+            leader = None
+
+            for replica in shard.get(ZooKeeper.REPLICAS, {}).values():
+                if replica.get(ZooKeeper.STATE) != ZooKeeper.ACTIVE:
+                    continue
+
+                node_name = replica.get(ZooKeeper.NODE_NAME)
+                if live_nodes is not None and node_name is not None and node_name not in live_nodes:
+                    continue
+
+                base_url = replica[ZooKeeper.BASE_URL]
+                core_url = '%s/%s' % (base_url, replica.get(ZooKeeper.CORE, collname))
+                hosts.append(base_url)
+                replicas.append(core_url)
+
+                if replica.get(ZooKeeper.LEADER, None) == ZooKeeper.TRUE:
+                    leaders.append(base_url)
+                    leader = core_url
+
+            shards.append(ShardRoute(shardname, tuple(replicas), leader))
+
+        routes[collname] = CollectionRoute(_unique(hosts), _unique(leaders), tuple(shards))
+
+    resolved = {}
+
+    def resolve_alias(name, seen):
+        # Returns the route and the position in ``seen`` of the earliest alias
+        # a cycle led back to, or len(seen) when none did. A route that went
+        # back to an alias still being resolved is missing that alias' other
+        # targets, so it is only kept once the cycle is closed.
+        if name in resolved:
+            return resolved[name], len(seen)
+        if name in seen:
+            LOG.warning("%s in circular alias definition - ignored", name)
+            return None, seen.index(name)
+
+        position = len(seen)
+        earliest = position
+        seen = seen + (name, )
+        targets = []
+
+        for target in aliases[name].split(","):
+            if target in aliases:
+                route, cycle = resolve_alias(target, seen)
+                earliest = min(earliest, cycle)
+            else:
+                route = routes.get(target)
+                if route is None:
+                    LOG.warning("Alias %s refers to unknown collection %s", name, target)
+            if route is not None:
+                targets.append(route)
+
+        route = _merge_routes(targets)
+        if earliest >= position:
+            resolved[name] = route
+        return route, earliest
+
+    for alias in (aliases or {}):
+        resolve_alias(alias, ())
+
+    # Aliases shadow collections of the same name, as they do in Solr
+    routes.update(resolved)
+    return MappingProxyType(routes)
 
 
 class ZooKeeper(object):
@@ -1258,6 +2289,8 @@ class ZooKeeper(object):
     ACTIVE = 'active'
     LEADER = 'leader'
     BASE_URL = 'base_url'
+    CORE = 'core'
+    NODE_NAME = 'node_name'
     TRUE = 'true'
     FALSE = 'false'
     COLLECTION = 'collection'
@@ -1268,10 +2301,15 @@ class ZooKeeper(object):
             raise RuntimeError
 
         self.collections = {}
-        self.liveNodes = {}
+        self.liveNodes = None
         self.aliases = {}
         self.state = None
 
+        # Rebuilt by the watchers below whenever the cluster changes, so
+        # routing a request is a single dictionary lookup.
+        self.routes = MappingProxyType({})
+        self._routesLock = threading.Lock()
+
         if kazoo_client is None:
             self.zk = KazooClient(zkServerAddress, read_only=True, timeout=timeout,
                                   command_retry={'max_tries': max_retries},
@@ -1295,11 +2333,13 @@ class ZooKeeper(object):
             else:
                 self.collections = json.loads(data.decode('utf-8'))
                 LOG.info('Updated collections: %s', self.collections)
+                self._rebuildRoutes()
 
         @self.zk.ChildrenWatch(ZooKeeper.LIVE_NODES_ZKNODE)
         def watchLiveNodes(children):
             self.liveNodes = children
             LOG.info("Updated live nodes: %s", children)
+            self._rebuildRoutes()
 
         @self.zk.DataWatch(ZooKeeper.ALIASES)
         def watchAliases(data, stat):
@@ -1313,45 +2353,35 @@ class ZooKeeper(object):
             else:
                 self.aliases = None
             LOG.info("Updated aliases: %s", self.aliases)
+            self._rebuildRoutes()
 
-    def getHosts(self, collname, only_leader=False, seen_aliases=None):
-        if self.aliases and collname in self.aliases:
-            return self.getAliasHosts(collname, only_leader, seen_aliases)
+    def close(self):
+        """
+        Stops the watches and closes the connection to ZooKeeper.
+        """
+        self.zk.stop()
+        self.zk.close()
 
-        hosts = []
-        if collname not in self.collections:
+    def _rebuildRoutes(self):
+        with self._routesLock:
+            self.routes = build_routing_table(self.collections, self.liveNodes, self.aliases)
+
+    def getRoute(self, collname):
+        """
+        Returns the ``CollectionRoute`` of a collection or alias.
+        """
+        route = self.routes.get(collname)
+        if route is None:
             raise SolrError("Unknown collection: %s" % collname)
-        collection = self.collections[collname]
-        shards = collection[ZooKeeper.SHARDS]
-        for shardname in shards.keys():
-            shard = shards[shardname]
-            if shard[ZooKeeper.STATE] == ZooKeeper.ACTIVE:
-                replicas = shard[ZooKeeper.REPLICAS]
-                for replicaname in replicas.keys():
-                    replica = replicas[replicaname]
-
-                    if replica[ZooKeeper.STATE] == ZooKeeper.ACTIVE:
-                        if not only_leader or (replica.get(ZooKeeper.LEADER, None) == ZooKeeper.TRUE):
-                            base_url = replica[ZooKeeper.BASE_URL]
-                            if base_url not in hosts:
-                                hosts.append(base_url)
-        return hosts
+        return route
+
+    def getHosts(self, collname, only_leader=False, seen_aliases=None):
+        route = self.getRoute(collname)
+        return route.leaders if only_leader else route.hosts
 
     def getAliasHosts(self, collname, only_leader, seen_aliases):
-        if seen_aliases:
-            if collname in seen_aliases:
-                LOG.warn("%s in circular alias definition - ignored", collname)
-                return []
-        else:
-            seen_aliases = []
-        seen_aliases.append(collname)
-        collections = self.aliases[collname].split(",")
-        hosts = []
-        for collection in collections:
-            for host in self.getHosts(collection, only_leader, seen_aliases):
-                if host not in hosts:
-                    hosts.append(host)
-        return hosts
+        # Aliases are resolved when the routing table is built
+        return self.getHosts(collname, only_leader)
 
     def getRandomURL(self, collname, only_leader=False):
         hosts = self.getHosts(collname, only_leader=only_leader)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ QGISSolr
+                                 A QGIS plugin
+ This plugin allows the user to run and load SOLR queries into QGIS
+                              -------------------
+        begin                : 2018-04-02
+        git sha              : $Format:%H$
+        copyright            : (C) 2018 by Brian Maddox
+        email                : brian.maddox@gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+
+The Processing provider of the plugin, so SOLR extractions can run from the Processing toolbox, models and
+qgis_process without the plugin dialog.
+"""
+
+import os.path
+from qgis.core import (QgsCoordinateReferenceSystem, QgsProcessingAlgorithm, QgsProcessingException,
+                       QgsProcessingOutputMultipleLayers, QgsProcessingParameterExtent,
+                       QgsProcessingParameterFileDestination, QgsProcessingParameterNumber,
+                       QgsProcessingParameterString, QgsProcessingProvider)
+
+
+class SolrProvider(QgsProcessingProvider):
+    """
+    Provider holding the algorithms of the plugin
+    """
+
+    # ******************************************************************************************************************
+    def loadAlgorithms(self):
+        self.addAlgorithm(SolrExtractAlgorithm())
+
+    # ******************************************************************************************************************
+    def id(self):
+        return "qgissolr"
+
+    # ******************************************************************************************************************
+    def name(self):
+        return "SOLR"
+
+    # ******************************************************************************************************************
+    def longName(self):
+        return "QGIS SOLR Plugin"
+
+
+class SolrExtractAlgorithm(QgsProcessingAlgorithm):
+    """
+    Algorithm that streams the results of a search to a file through the ExtractionManager
+    """
+
+    QUERY = "QUERY"
+    TABLES = "TABLES"
+    COUNTRY = "COUNTRY"
+    EXTENT = "EXTENT"
+    WORKERS = "WORKERS"
+    OUTPUT = "OUTPUT"
+    OUTPUTS = "OUTPUTS"
+
+    # ******************************************************************************************************************
+    def createInstance(self):
+        return SolrExtractAlgorithm()
+
+    # ******************************************************************************************************************
+    def name(self):
+        return "extract"
+
+    # ******************************************************************************************************************
+    def displayName(self):
+        return "Extract search results to a file"
+
+    # ******************************************************************************************************************
+    def shortHelpString(self):
+        return ("Searches the configured SOLR tables and writes the results straight to a FlatGeobuf, GeoPackage or "
+                "GeoParquet file without loading a layer. With several tables each table gets its own file, named "
+                "after the output with the table appended. The files written are returned in OUTPUTS, OUTPUT only "
+                "holds the file when a single table was written.")
+
+    # ******************************************************************************************************************
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterString(self.QUERY, "Search terms"))
+        self.addParameter(QgsProcessingParameterString(self.TABLES, "Tables, comma separated (all when empty)",
+                                                       optional=True))
+        self.addParameter(QgsProcessingParameterString(self.COUNTRY, "Country code", optional=True))
+        self.addParameter(QgsProcessingParameterExtent(self.EXTENT, "Extent", optional=True))
+        self.addParameter(QgsProcessingParameterNumber(self.WORKERS, "Pages fetched at the same time", minValue=1,
+                                                       defaultValue=4))
+        self.addParameter(QgsProcessingParameterFileDestination(self.OUTPUT, "Output file",
+                                                                "FlatGeobuf (*.fgb);;GeoPackage (*.gpkg);;"
+                                                                "GeoParquet (*.parquet)"))
+        self.addOutput(QgsProcessingOutputMultipleLayers(self.OUTPUTS, "Files written"))
+
+    # ******************************************************************************************************************
+    def processAlgorithm(self, parameters, context, feedback):
+        from . import iso3166
+        from .managers import ExtractionManager, QueryError
+
+        query = self.parameterAsString(parameters, self.QUERY, context)
+        tables = [tTable.strip() for tTable in self.parameterAsString(parameters, self.TABLES, context).split(",")
+                  if tTable.strip()]
+        country = self.parameterAsString(parameters, self.COUNTRY, context).strip()
+        workers = self.parameterAsInt(parameters, self.WORKERS, context)
+        output = self.parameterAsFileOutput(parameters, self.OUTPUT, context)
+
+        if country:
+            if country not in iso3166.countries:
+                raise QgsProcessingException("Unknown country {}".format(country))
+            country = iso3166.countries.get(country).alpha3
+
+        bounds = None
+        if parameters.get(self.EXTENT) is not None:
+            extent = self.parameterAsExtent(parameters, self.EXTENT, context,
+                                            QgsCoordinateReferenceSystem("EPSG:4326"))
+            if not extent.isNull():
+                bounds = extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum()
+
+        def Progress(inTable, inWritten, inHits):
+            feedback.setProgressText("{}: {} of {}".format(inTable, inWritten, inHits))
+            feedback.setProgress(100.0 * inWritten / max(inHits, 1))
+            return not feedback.isCanceled()
+
+        configPath = os.path.join(os.path.dirname(os.path.realpath(__file__)), "config.ini")
+
+        try:
+            outcome = ExtractionManager(configPath).Extract(query, output, tables, country, bounds, workers,
+                                                            Progress)
+        except (QueryError, ValueError) as e:
+            raise QgsProcessingException(str(e))
+
+        for tTable, (path, written, seconds) in outcome.items():
+            feedback.pushInfo("{}: {} documents written to {} in {:.1f} s, {:.0f} per second"
+                              .format(tTable, written, path, seconds, written / seconds if seconds else 0.0))
+
+        # With several tables the output itself is never written, only the files named after it
+        paths = [tPath for tPath, _, _ in outcome.values()]
+
+        return {self.OUTPUT: paths[0] if len(paths) == 1 else None, self.OUTPUTS: paths}
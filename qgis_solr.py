@@ -21,23 +21,19 @@
  ***************************************************************************/
 """
 
-import configparser
 import os.path
-from osgeo import ogr
-from osgeo import osr
 # Initialize Qt resources from file resources.py
 from . import resources
-# Import the code for the dialog
-from qgis.core import QgsMessageLog, QgsVectorLayer, QgsProject, QgsField, QgsFeature, QgsGeometry, QgsPointXY
+from qgis.core import (Qgis, QgsMapLayer, QgsMessageLog, QgsVectorLayer, QgsProject, QgsField, QgsFeature, QgsGeometry,
+                       QgsPointXY)
 from qgis.PyQt.QtCore import QVariant
 from qgis.gui import QgsMessageBar
-from . import iso3166
-from PyQt5.QtCore import QSettings, QTranslator, qVersion, QCoreApplication, Qt
+from PyQt5.QtCore import QSettings, QTranslator, qVersion, QCoreApplication, Qt, QTimer
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QAction, QMessageBox, QProgressBar, QPushButton
-from .ConfigurationDialog import ConfigurationDialog
-from .managers import *
-from .qgis_solr_dialog import QGISSOLRDialog
+from PyQt5.QtWidgets import QAction, QDialogButtonBox, QMessageBox, QProgressBar, QPushButton
+
+# The dialogs, iso3166 and the managers (with pysolr and requests) are imported when the plugin is
+# first used so they do not slow down QGIS startup.
 
 
 class QGISSolr(object):
@@ -84,27 +80,28 @@ class QGISSolr(object):
         # Instantiate so we pull the data in at creation
         self.myTableManager = None
         self.myQueryManager = None
+        self.myEditManager = None
+        self.myConfigManager = None
+        self.myWarmUpManager = None
+        self.startupWarmUp = None  # WarmUpManager building the managers at startup, until its task finishes
+        self.mySuggestionManager = None
+        self.myRefreshManager = None
+        self.solrConfiguration = None  # Configuration the managers were built with
+        self.exportPath = ""  # File the results go to instead of a layer, chosen with the export button
+        self.spoolPages = False  # Fetch all tables at once into PageSpools instead of page by page
+        self.processingProvider = None
+        self.refreshAction = None  # Layer tree action refreshing a loaded layer
 
         self.tableDict = dict()
 
-        # Create the dialog (after translation) and keep reference
-        self.dlg = QGISSOLRDialog()
-
-        # Set and keep our spatial reference
-        self.spatialRef = osr.SpatialReference()
-        self.spatialRef.SetFromUserInput("WGS84")
+        # The dialogs are created on first use
+        self.dlg = None
+        self.configurationDialog = None
 
         # Progress bar
         self.progressDialog = None
         self.progressBar = None
 
-        # ConfigurationDialog
-        self.configurationDialog = ConfigurationDialog()
-        self.configurationDialog.hide()
-
-        # Connect the signal/slot
-        self.dlg.configureButton.clicked.connect(self.__HandleConfigurationDialog)
-
     # ******************************************************************************************************************
     # noinspection PyMethodMayBeStatic
     def tr(self, message):
@@ -186,10 +183,22 @@ class QGISSolr(object):
 
         return action
 
+    # ******************************************************************************************************************
+    def initProcessing(self):
+        """Add the algorithms of the plugin to the Processing toolbox."""
+
+        from qgis.core import QgsApplication
+        from .processing_provider import SolrProvider
+
+        self.processingProvider = SolrProvider()
+        QgsApplication.processingRegistry().addProvider(self.processingProvider)
+
     # ******************************************************************************************************************
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
 
+        self.initProcessing()
+
         icon_path = ':/plugins/QGISSolr/icon.png'
         self.add_action(
                 icon_path,
@@ -197,9 +206,17 @@ class QGISSolr(object):
                 callback=self.run,
                 parent=self.iface.mainWindow())
 
+        # Offered in the layer tree for the layers that can be refreshed
+        self.refreshAction = QAction(self.tr(u'Refresh from SOLR'), self.iface.mainWindow())
+        self.refreshAction.triggered.connect(self.__HandleRefreshAction)
+        self.iface.addCustomActionForLayerType(self.refreshAction, "", QgsMapLayer.VectorLayer, False)
+
         # will be set False in run()
         self.first_start = True
 
+        # Warm up once QGIS has finished loading so startup is not held up
+        QTimer.singleShot(0, self.__WarmUp)
+
     # ******************************************************************************************************************
     def unload(self):
         """Removes the plugin menu item and icon from QGIS GUI."""
@@ -211,14 +228,31 @@ class QGISSolr(object):
         # remove the toolbar
         del self.toolbar
 
+        if self.refreshAction is not None:
+            self.iface.removeCustomActionForLayerType(self.refreshAction)
+            self.refreshAction = None
+
+        if self.processingProvider is not None:
+            from qgis.core import QgsApplication
+            QgsApplication.processingRegistry().removeProvider(self.processingProvider)
+            self.processingProvider = None
+
+        if self.myQueryManager is not None:
+            self.myQueryManager.Close()
+            self.myQueryManager = None
+
     # ******************************************************************************************************************
     def run(self):
         """Run method that performs all the real work"""
 
-        # Populate the dialog
+        from .managers import LayerStatistics, PageSpool, QueryError
+
+        # Create and populate the dialog
+        self.__CreateDialog()
         self.__InitSOLR()
 
         # show the dialog
+        self.exportPath = ""
         self.dlg.show()
 
         # Run the dialog event loop
@@ -230,6 +264,12 @@ class QGISSolr(object):
         # To hold what layers had nothing
         noresultList = list()
 
+        # To hold the statistics of the layers that were loaded
+        layerStatistics = list()
+
+        # Pages of the tables fetched ahead of time, when spooling is on
+        spools = dict()
+
         # See if OK was pressed
         if result:
             try:
@@ -240,8 +280,11 @@ class QGISSolr(object):
                     self.__ShowError("You must specify at least three characters as a search term!")
                     return
 
-                cc3QueryIndex = self.dlg.whereComboBox.currentIndex()
-                cc3Query = self.dlg.whereComboBox.itemData(cc3QueryIndex)
+                cc3Query = self.__GetWhereCode()
+
+                # Show the country right away instead of after every layer is loaded
+                if cc3Query and cc3Query != "QGIS":
+                    self.__ZoomToCountry(cc3Query)
 
                 tableQueryIndex = self.dlg.tableComboBox.currentIndex()
                 tableQuery = self.dlg.tableComboBox.itemData(tableQueryIndex)
@@ -251,20 +294,43 @@ class QGISSolr(object):
                 else:
                     tableList = list(self.tableDict.keys())
 
+                # Each table may use its own query parser
+                try:
+                    queryPlans = {tTable: self.myQueryManager.CreatePlan(searchQuery, cc3Query, tTable)
+                                  for tTable in tableList}
+                except QueryError as e:
+                    self.__ShowError(str(e))
+                    return
+
+                # Write the results to a file instead of loading them
+                if self.exportPath:
+                    self.__ExportResults(tableList, queryPlans)
+                    self.__ResetFields()
+                    return
+
+                # Fetch every table at once into files while the layers are built one after the other
+                if self.spoolPages:
+                    for tTable in tableList:
+                        spools[tTable] = PageSpool()
+                        spools[tTable].Start(self.myQueryManager.GetPages(queryPlans[tTable], tTable))
+
                 # Start the progressbar
                 tablesDone = 0
                 self.__ShowProgressBar(len(tableList))
 
                 # Now iterate through the results
                 for tempTable in tableList:
-                    pageNumber = 0
-
                     # Update progress
                     self.__UpdateProgressBar(tablesDone)
                     tablesDone += 1
 
                     # Prime the search pump
-                    results = self.myQueryManager.Search(inQuery=searchQuery, inCC3=cc3Query, inTable=tempTable)
+                    if tempTable in spools:
+                        pages = spools[tempTable].Pages()
+                    else:
+                        pages = self.__SearchPages(queryPlans[tempTable], tempTable)
+
+                    results = next(pages, None)
 
                     # Get the human readable layer name
                     tableHumanName = ""
@@ -272,51 +338,57 @@ class QGISSolr(object):
                         if key == tempTable:
                             tableHumanName = self.tableDict[key]
 
-                    if len(results) == 0:
+                    if results is None or len(results) == 0:
                         noresultList.append("{}\n".format(tableHumanName))
                         continue
 
                     foundResults = True
 
-                    # Get the fields list
+                    # Get the fields list and how to convert their values
                     layerFields = self.myTableManager.GetTableColumns(tempTable)
+                    fieldDecoder = self.myTableManager.GetFieldDecoder(tempTable)
 
                     # Create our layer
-                    tableLayer = self.__CreateLayer("{}_{}".format(tableHumanName, searchQuery), layerFields)
+                    tableLayer = self.__CreateLayer("{}_{}".format(tableHumanName, searchQuery), layerFields,
+                                                    fieldDecoder)
                     dataProvider = tableLayer.dataProvider()
 
-                    while len(results) > 0:
-                        for result in results:
-                            tempFeature = QgsFeature(tableLayer.fields())
-
-                            # Go through the fields
-                            for tField in result:
-                                try:
-                                    tempFeature[tField] = str(result[tField])
-                                except:
-                                    # Solr will return some internal fields that we just ignore here.
-                                    pass
-
-                            # Set the geometry
-                            # Some tables may not have location data.  Catch
-                            # exceptions here and just continue without adding the feature.
-                            try:
-                                tempFeature.setGeometry(self.GetLocation(result))
-                            except Exception as nogeom:
-                                QgsMessageLog.logMessage("System ID {} has a NULL shape field".format(result["system_id"]))
-                                continue
-
-                            # Now add the features
-                            dataProvider.addFeature(tempFeature)
+                    # Remember the search so the layer can be refreshed with what changed since
+                    refreshable = self.myRefreshManager.IsRefreshable(tempTable)
+                    if refreshable:
+                        self.myRefreshManager.TrackLayer(tableLayer, tempTable, queryPlans[tempTable])
 
-                        tableLayer.updateExtents()
+                    # Keep the extent and statistics while loading instead of rescanning the layer
+                    statistics = LayerStatistics(tableLayer.name(),
+                                                 [tField.name() for tField in tableLayer.fields() if tField.isNumeric()])
 
-                        pageNumber += 1
+                    while results is not None and len(results) > 0:
+                        features = self.__CreateFeatures(tableLayer, results.Decode(fieldDecoder))
+                        _, features = dataProvider.addFeatures(features)
+                        statistics.AddPage(results, len(features))
 
-                        results = self.myQueryManager.GetPage(tempTable, pageNumber)
+                        if refreshable:
+                            self.myRefreshManager.AddPage(tableLayer, results, features)
+
+                        results = next(pages, None)
+
+                    layerExtent = statistics.GetExtent()
+                    if layerExtent is not None:
+                        tableLayer.setExtent(layerExtent)
+                    else:
+                        tableLayer.updateExtents()
+
+                    layerStatistics.append(statistics)
 
                     QgsProject().instance().addMapLayer(tableLayer)
 
+                    if refreshable:
+                        self.iface.addCustomActionForLayer(self.refreshAction, tableLayer)
+
+                    # Send edits of the layer back to SOLR if configured
+                    if self.myEditManager:
+                        self.myEditManager.TrackLayer(tableLayer, tempTable)
+
             except Exception as e:
                 self.__ShowError("A problem occurred while running the plugin. Please consult the QGIS log!")
                 QgsMessageLog.logMessage("QGISSolr::run: Exception: {}".format(e))
@@ -324,9 +396,13 @@ class QGISSolr(object):
                 self.__RemoveProgressBar()
                 return
 
+            finally:
+                for tSpool in spools.values():
+                    tSpool.Close()
+
             QgsMessageLog.logMessage("finished!")
             self.__RemoveProgressBar()
-            self.__CreateFinishedMessage(noresultList)
+            self.__CreateFinishedMessage(noresultList, layerStatistics)
 
             if not foundResults:
                 self.__ShowError("Your query returned no results!")
@@ -336,6 +412,52 @@ class QGISSolr(object):
             # And clean up
             self.__ResetFields()
 
+    # ******************************************************************************************************************
+    def __SearchPages(self, inQueryPlan, inTable: str):
+        """
+        Yield the pages of a search one after the other as they are fetched
+        :param inQueryPlan: QueryPlan of the search
+        :param inTable: string with the table
+        :return: iterator of ColumnarPage
+        """
+
+        results = self.myQueryManager.Search(inQuery=inQueryPlan, inTable=inTable)
+        pageNumber = 0
+
+        while results is not None and len(results) > 0:
+            yield results
+
+            pageNumber += 1
+            results = self.myQueryManager.GetPage(inTable, pageNumber)
+
+    # ******************************************************************************************************************
+    def __CreateFeatures(self, inLayer, inPage) -> list:
+        """
+        Build the features of a page of results. Attributes are filled by column in the order of the layer fields, so
+        internal Solr fields that are not in the layer are skipped.
+        :param inLayer: QgsVectorLayer the features are for
+        :param inPage: decoded ColumnarPage
+        :return: list of QgsFeature
+        """
+
+        fields = inLayer.fields()
+        features = list()
+        systemIds = inPage.columns.get("system_id", [None] * len(inPage))
+
+        for attributes, geometry, systemId in zip(inPage.GetAttributes(fields.names()), inPage.GetGeometries(),
+                                                  systemIds):
+            # Some tables may not have location data. Skip those features.
+            if geometry is None:
+                QgsMessageLog.logMessage("System ID {} has a NULL shape field".format(systemId))
+                continue
+
+            tempFeature = QgsFeature(fields)
+            tempFeature.setAttributes(attributes)
+            tempFeature.setGeometry(geometry)
+            features.append(tempFeature)
+
+        return features
+
     # ******************************************************************************************************************
     def GetLocation(self, inResult):
         """
@@ -353,9 +475,18 @@ class QGISSolr(object):
         :return: None
         """
 
+        from . import iso3166
+        from qgis.PyQt.QtWidgets import QComboBox, QCompleter
+
         # Clear out any existing entries
         self.dlg.whereComboBox.clear()
 
+        # Let the user type part of a country name and pick from the matching entries
+        self.dlg.whereComboBox.setEditable(True)
+        self.dlg.whereComboBox.setInsertPolicy(QComboBox.NoInsert)
+        self.dlg.whereComboBox.completer().setCompletionMode(QCompleter.PopupCompletion)
+        self.dlg.whereComboBox.completer().setFilterMode(Qt.MatchContains)
+
         # Add an empty entry
         self.dlg.whereComboBox.addItem("--Select an Optional Country--", "")
 
@@ -366,6 +497,60 @@ class QGISSolr(object):
         for tCountry in iso3166.countries:
             self.dlg.whereComboBox.addItem(tCountry.name, tCountry.alpha3)
 
+    # ******************************************************************************************************************
+    def __GetWhereCode(self) -> str:
+        """
+        Returns the code of the where box entry. Text that is not an entry is resolved to the best matching country.
+        :return: string of the alpha3 code of the country, "QGIS" for the current view or "" for anywhere
+        """
+
+        from . import iso3166
+
+        whereText = self.dlg.whereComboBox.currentText().strip()
+
+        whereIndex = self.dlg.whereComboBox.findText(whereText, Qt.MatchFixedString)
+        if whereIndex >= 0:
+            return self.dlg.whereComboBox.itemData(whereIndex)
+
+        matches = iso3166.countries.search(whereText, 1)
+        if matches:
+            self.dlg.whereComboBox.setCurrentIndex(self.dlg.whereComboBox.findData(matches[0].alpha3))
+            return matches[0].alpha3
+
+        return ""
+
+    # ******************************************************************************************************************
+    def __ZoomToCountry(self, inCC3: str):
+        """
+        Zooms the map canvas to the bounding box of a country
+        :param inCC3: string of the alpha3 code of the country
+        :return: None
+        """
+
+        from . import iso3166
+        from qgis.core import QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsRectangle
+
+        try:
+            country = iso3166.countries.get(inCC3, None)
+            if country is None or country.bbox is None:
+                return
+
+            xMin, yMin, xMax, yMax = country.bbox
+
+            # A rectangle cannot cross the antimeridian, so show all longitudes instead
+            if xMin > xMax:
+                xMin, xMax = -180.0, 180.0
+
+            transform = QgsCoordinateTransform(QgsCoordinateReferenceSystem("EPSG:4326"),
+                                               QgsProject.instance().crs(), QgsProject.instance())
+
+            canvas = self.iface.mapCanvas()
+            canvas.setExtent(transform.transformBoundingBox(QgsRectangle(xMin, yMin, xMax, yMax)))
+            canvas.refresh()
+
+        except Exception as e:
+            QgsMessageLog.logMessage("QGISSolr::__ZoomToCountry: Exception: {}".format(e))
+
     # ******************************************************************************************************************
     def __PopulateTableBox(self):
         """
@@ -389,6 +574,36 @@ class QGISSolr(object):
         for tTable in self.tableDict:
             self.dlg.tableComboBox.addItem(self.tableDict[tTable], tTable)
 
+        if self.myWarmUpManager is not None:
+            self.__ShowTableStatus(self.myWarmUpManager.GetStatus())
+
+    # ******************************************************************************************************************
+    def __ShowTableStatus(self, inStatus: dict):
+        """
+        Show the availability and latency of the tables found by the warm up in the table box
+        :param inStatus: dictionary of table -> (available, latency in milliseconds, error message)
+        :return: None
+        """
+
+        if self.dlg is None:
+            return
+
+        for index in range(self.dlg.tableComboBox.count()):
+            tTable = self.dlg.tableComboBox.itemData(index)
+            if tTable not in inStatus:
+                continue
+
+            available, latency, error = inStatus[tTable]
+            if available:
+                status = "{:.0f} ms".format(latency)
+                toolTip = "SOLR answered in {:.0f} ms".format(latency)
+            else:
+                status = "unavailable"
+                toolTip = "SOLR did not answer: {}".format(error)
+
+            self.dlg.tableComboBox.setItemText(index, "{} ({})".format(self.tableDict[tTable], status))
+            self.dlg.tableComboBox.setItemData(index, toolTip, Qt.ToolTipRole)
+
     # ******************************************************************************************************************
     def __ShowError(self, inText: str):
         """
@@ -412,12 +627,13 @@ class QGISSolr(object):
         QMessageBox.warning(None, "Warning", inText)
 
     # ******************************************************************************************************************
-    def __CreateLayer(self, inLayerName: str, inLayerFields):
+    def __CreateLayer(self, inLayerName: str, inLayerFields, inFieldDecoder=None):
         """
-        Creates a layer in the Geopackage with the specified fields.  Note all fields will be strings to mostly match
-        what SOLR returns
+        Creates a layer in the Geopackage with the specified fields.  Fields are typed from the table schema when a
+        decoder is given, otherwise all fields will be strings to mostly match what SOLR returns
         :param inLayerName: string of the layer name
         :param inLayerFields: dictionary of fields
+        :param inFieldDecoder: optional pysolr.SchemaDecoder for the table
         :return: True if successful
         """
 
@@ -427,8 +643,8 @@ class QGISSolr(object):
             dataProvider = layer.dataProvider()
 
             # Create the fields in the layer
-            for tField in inLayerFields:
-                dataProvider.addAttributes([QgsField(tField, QVariant.String)])
+            dataProvider.addAttributes([QgsField(tField, self.__GetFieldType(tField, inFieldDecoder))
+                                        for tField in inLayerFields])
 
             layer.updateFields()
 
@@ -438,6 +654,31 @@ class QGISSolr(object):
             QgsMessageLog.logMessage("QGISSOLR::__CreateLayer: Exception: {}".format(e))
             raise e
 
+    # ******************************************************************************************************************
+    def __GetFieldType(self, inField: str, inFieldDecoder=None):
+        """
+        Get the QGIS field type for a Solr field
+        :param inField: string of the field name
+        :param inFieldDecoder: optional pysolr.SchemaDecoder for the table
+        :return: QVariant type
+        """
+
+        if inFieldDecoder is None:
+            return QVariant.String
+
+        from .managers.pysolr import SchemaDecoder
+
+        kind, multiValued = inFieldDecoder.get_field_info(inField)
+        if multiValued:
+            return QVariant.String
+
+        return {
+            SchemaDecoder.INTEGER: QVariant.LongLong,
+            SchemaDecoder.FLOAT: QVariant.Double,
+            SchemaDecoder.BOOLEAN: QVariant.Bool,
+            SchemaDecoder.DATETIME: QVariant.DateTime,
+        }.get(kind, QVariant.String)
+
     # ******************************************************************************************************************
     def __ShowProgressBar(self, inMaximum: int):
         """
@@ -487,24 +728,135 @@ class QGISSolr(object):
         self.dlg.whereComboBox.setCurrentIndex(0)
         self.dlg.tableComboBox.setCurrentIndex(0)
 
+    # ******************************************************************************************************************
+    def __GetSuggestionSource(self):
+        """
+        Returns where query suggestions come from: the QueryManager and the tables a search would run against
+        :return: tuple of the QueryManager and a list of tables
+        """
+
+        tableQuery = self.dlg.tableComboBox.itemData(self.dlg.tableComboBox.currentIndex())
+        if tableQuery:
+            return self.myQueryManager, [tableQuery]
+
+        return self.myQueryManager, list(self.tableDict.keys())
+
+    # ******************************************************************************************************************
+    def __WarmUp(self):
+        """
+        Build the managers and warm up the configured cores in a background task if the configuration asks for it.
+        QGIS is still starting up, so nothing here may block or open a dialog and problems are only logged.
+        :return: None
+        """
+
+        try:
+            # Only the flag is read at first, so nothing of the managers is imported unless the cores are warmed up
+            import configparser
+
+            config = configparser.ConfigParser()
+            config.read(self.__GetConfigPath())
+            if not config.getboolean("QGISSOLR", "SOLR_WARMUP", fallback=False):
+                return
+
+            from .managers import WarmUpManager
+
+            configuration = self.__GetConfiguration()
+            tableSettings = self.myConfigManager.GetTableSettings(configuration.tables)
+
+            warmUpManager = WarmUpManager(inCreateManagers=lambda: self.__CreateManagers(configuration, tableSettings))
+            warmUpManager.Start(lambda inStatus: self.__WarmUpFinished(warmUpManager, configuration, tableSettings))
+            self.startupWarmUp = warmUpManager
+
+        except Exception as e:
+            QgsMessageLog.logMessage("QGISSOLR::__WarmUp: Exception {}".format(e))
+
+    # ******************************************************************************************************************
+    def __WarmUpFinished(self, inWarmUpManager, inConfiguration, inTableSettings: dict):
+        """
+        Use the managers built by the warm up at startup, unless the plugin built its own in the meantime. Runs in the
+        main thread.
+        :param inWarmUpManager: WarmUpManager that built the managers
+        :param inConfiguration: Configuration they were built with
+        :param inTableSettings: dictionary of table -> settings they were built with
+        :return: None
+        """
+
+        self.startupWarmUp = None
+
+        if self.solrConfiguration is not None:
+            if inWarmUpManager.queryManager is not None:
+                inWarmUpManager.queryManager.Close()
+            return
+
+        try:
+            self.__InstallManagers(inConfiguration, inTableSettings, inWarmUpManager.tableManager,
+                                   inWarmUpManager.queryManager)
+            self.myWarmUpManager = inWarmUpManager
+            self.__ShowTableStatus(inWarmUpManager.GetStatus())
+
+        except Exception as e:
+            QgsMessageLog.logMessage("QGISSOLR::__WarmUpFinished: Exception {}".format(e))
+
+    # ******************************************************************************************************************
+    def __CreateDialog(self):
+        """
+        Create the main dialog the first time the plugin is run instead of at QGIS startup
+        :return: None
+        """
+
+        if self.dlg is not None:
+            return
+
+        from .managers import SuggestionManager
+        from .qgis_solr_dialog import QGISSOLRDialog
+
+        self.dlg = QGISSOLRDialog()
+
+        # Connect the signal/slot
+        self.dlg.configureButton.clicked.connect(self.__HandleConfigurationDialog)
+
+        # Only allow searching once there are enough characters, and complete the words as they are typed
+        okButton = self.dlg.button_box.button(QDialogButtonBox.Ok)
+        okButton.setEnabled(False)
+        self.dlg.queryLineEdit.textChanged.connect(lambda inText: okButton.setEnabled(len(inText.strip()) >= 3))
+        self.mySuggestionManager = SuggestionManager(self.dlg.queryLineEdit, self.__GetSuggestionSource)
+
+        # Exporting searches like OK does, so it needs as many characters
+        exportButton = self.dlg.button_box.addButton("Export...", QDialogButtonBox.ActionRole)
+        exportButton.setEnabled(False)
+        exportButton.clicked.connect(self.__HandleExportButton)
+        self.dlg.queryLineEdit.textChanged.connect(lambda inText: exportButton.setEnabled(len(inText.strip()) >= 3))
+
+        # The countries never change, so only fill them in once
+        self.__PopulateWhereBox()
+
+        # The managers may already be there from the warm up
+        if self.myTableManager is not None:
+            self.__PopulateTableBox()
+
     # ******************************************************************************************************************
     def __InitSOLR(self):
         """
-        Initialize SOLR and fill the combo boxes when someone actually runs the plugin instead of at object
-        instantiation.
+        Initialize SOLR and fill the table combo box when someone actually runs the plugin instead of at object
+        instantiation. The managers and their connections are kept until the configuration changes.
         :return:
         """
 
+        from .managers import WarmUpManager
+
         try:
             # Get our configuration values
-            SOLREndPoint, SOLRTables = self.__GetConfiguration()
+            configuration = self.__GetConfiguration()
+            tableSettings = self.myConfigManager.GetTableSettings(configuration.tables)
+            if (configuration, tableSettings) == self.solrConfiguration:
+                return
 
-            # Instantiate
-            self.myTableManager = TableManager(SOLREndPoint, SOLRTables)
-            self.myQueryManager = QueryManager(SOLREndPoint, self.iface, SOLRTables)
+            tableManager, queryManager = self.__CreateManagers(configuration, tableSettings)
+            self.__InstallManagers(configuration, tableSettings, tableManager, queryManager)
 
-            self.__PopulateWhereBox()
-            self.__PopulateTableBox()
+            if configuration.warmup:
+                self.myWarmUpManager = WarmUpManager(self.myTableManager, self.myQueryManager)
+                self.myWarmUpManager.Start(self.__ShowTableStatus)
 
         except Exception as e:
             self.__ShowError("An error has occurred while pulling table names from SOLR!")
@@ -512,36 +864,184 @@ class QGISSolr(object):
             raise e
 
     # ******************************************************************************************************************
-    def __CreateFinishedMessage(self, inStringList: list):
+    def __CreateManagers(self, inConfiguration, inTableSettings: dict) -> tuple:
+        """
+        Create the managers that connect to SOLR. Tables on the same host share their connections. Connecting to
+        ZooKeeper can take a while, so at startup this runs in the warm up task.
+        :param inConfiguration: Configuration
+        :param inTableSettings: dictionary of table -> settings
+        :return: tuple of the TableManager and QueryManager
+        """
+
+        from .managers import ConnectionPool, QueryManager, TableManager
+
+        connectionPool = ConnectionPool()
+        tableManager = TableManager(inConfiguration.endpoint, inConfiguration.tables, inTableSettings, connectionPool)
+        queryManager = QueryManager(inConfiguration.endpoint, self.iface, inConfiguration.tables,
+                                    inConfiguration.zookeeper, inColumnar=True, inTableSettings=inTableSettings,
+                                    inConnectionPool=connectionPool)
+
+        return tableManager, queryManager
+
+    # ******************************************************************************************************************
+    def __InstallManagers(self, inConfiguration, inTableSettings: dict, inTableManager, inQueryManager):
+        """
+        Use the managers of a configuration from now on and fill the table box with their tables
+        :param inConfiguration: Configuration
+        :param inTableSettings: dictionary of table -> settings
+        :param inTableManager: TableManager from __CreateManagers
+        :param inQueryManager: QueryManager from __CreateManagers
+        :return: None
+        """
+
+        from .managers import EditManager, RefreshManager
+
+        self.spoolPages = inConfiguration.spool
+
+        # The TableManager shares the connection pool of the QueryManager, so this closes its connections too
+        if self.myQueryManager is not None and self.myQueryManager is not inQueryManager:
+            self.myQueryManager.Close()
+
+        self.myTableManager = inTableManager
+        self.myQueryManager = inQueryManager
+        self.myEditManager = None
+        if inConfiguration.writeback:
+            self.myEditManager = EditManager(self.myQueryManager, self.iface, inTableManager=self.myTableManager)
+        self.myRefreshManager = RefreshManager(self.myQueryManager, self.myTableManager, inTableSettings)
+        self.myWarmUpManager = None
+
+        if self.dlg is not None:
+            self.__PopulateTableBox()
+
+        self.solrConfiguration = inConfiguration, inTableSettings
+
+    # ******************************************************************************************************************
+    def __HandleRefreshAction(self):
+        """
+        Refresh the current layer with the documents changed in SOLR since it was loaded
+        :return: None
+        """
+
+        layer = self.iface.activeLayer()
+        if layer is None:
+            return
+
+        try:
+            self.__InitSOLR()
+            added, updated, removed = self.myRefreshManager.Refresh(layer, self.__CreateFeatures)
+
+        except ValueError as e:
+            self.__ShowError(str(e))
+            return
+
+        except Exception as e:
+            self.__ShowError("A problem occurred while refreshing the layer. Please consult the QGIS log!")
+            QgsMessageLog.logMessage("QGISSolr::__HandleRefreshAction: Exception: {}".format(e))
+            return
+
+        self.iface.messageBar().pushMessage("QGIS SOLR", "{}: {} added, {} updated and {} removed"
+                                            .format(layer.name(), added, updated, removed), level=Qgis.Info)
+
+    # ******************************************************************************************************************
+    def __HandleExportButton(self):
+        """
+        Ask for the file to export to and close the dialog like OK does
+        :return: None
+        """
+
+        from qgis.PyQt.QtWidgets import QFileDialog
+
+        path, _ = QFileDialog.getSaveFileName(self.dlg, "Export the results to",
+                                              "", "FlatGeobuf (*.fgb);;GeoPackage (*.gpkg);;GeoParquet (*.parquet)")
+        if path:
+            self.exportPath = path
+            self.dlg.accept()
+
+    # ******************************************************************************************************************
+    def __ExportResults(self, inTableList: list, inQueryPlans: dict):
+        """
+        Write the results of every table to a file without creating layers. With more than one table each table gets
+        its own file.
+        :param inTableList: list of tables to search
+        :param inQueryPlans: dictionary of table -> QueryPlan
+        :return: None
+        """
+
+        from .managers import ExportManager
+
+        exportManager = ExportManager(self.myQueryManager, self.myTableManager)
+        messages = list()
+
+        self.__ShowProgressBar(100)
+
+        try:
+            ExportManager.GetFormat(self.exportPath)
+
+            for tTable in inTableList:
+                path = ExportManager.GetTablePath(self.exportPath, tTable, len(inTableList))
+
+                written = exportManager.Export(inQueryPlans[tTable], tTable, path, self.tableDict.get(tTable, tTable),
+                                               lambda inWritten, inHits:
+                                               self.__UpdateProgressBar(int(100 * inWritten / max(inHits, 1))))
+
+                messages.append("{}: {} results written to {}".format(self.tableDict.get(tTable, tTable), written,
+                                                                      path))
+
+        except Exception as e:
+            self.__ShowError("A problem occurred while exporting the results: {}".format(e))
+            QgsMessageLog.logMessage("QGISSolr::__ExportResults: Exception: {}".format(e))
+            return
+
+        finally:
+            self.__RemoveProgressBar()
+
+        QMessageBox.information(None, "Finished!", "\n".join(messages))
+
+    # ******************************************************************************************************************
+    def __CreateFinishedMessage(self, inStringList: list, inLayerStatistics: list = ()):
         """
         Creates the finished dialog box
         :param inStringList: list of strings to display
+        :param inLayerStatistics: list of LayerStatistics of the loaded layers
         :return:
         """
+
+        messages = list()
+
+        if inLayerStatistics:
+            statisticsToString = "".join(tStatistics.GetSummary() for tStatistics in inLayerStatistics)
+            messages.append("Loaded the following layers:\n{}".format(statisticsToString))
+
         if inStringList:
             listToString = "".join(inStringList)
-            QMessageBox.information(None,
-                                    "Finished!",
-                                    "The query found no results in the following tables:\n{}".format(listToString))
+            messages.append("The query found no results in the following tables:\n{}".format(listToString))
+
+        if messages:
+            QMessageBox.information(None, "Finished!", "\n".join(messages))
 
     # ******************************************************************************************************************
     def __GetConfiguration(self):
         """
         Get the configuration values
-        :return: tuple with configuration values
+        :return: Configuration
         """
 
-        # Get the base directory for the plugin
-        plugin_path = os.path.dirname(os.path.realpath(__file__))
+        from .managers import ConfigManager
 
-        # Read in the configuration
-        config = configparser.ConfigParser()
-        config.read(plugin_path + "/config.ini")
+        if self.myConfigManager is None:
+            self.myConfigManager = ConfigManager(self.__GetConfigPath())
 
-        endPoint = config.get("QGISSOLR", "SOLR_ENDPOINT")
-        tableList = config.get("QGISSOLR", "SOLR_TABLES").split(",")
+        return self.myConfigManager.GetConfiguration()
+
+    # ******************************************************************************************************************
+    @staticmethod
+    def __GetConfigPath() -> str:
+        """
+        Returns the path of the configuration file, which is kept in the base directory of the plugin
+        :return: string with the path
+        """
 
-        return endPoint, tableList
+        return os.path.dirname(os.path.realpath(__file__)) + "/config.ini"
 
     # ******************************************************************************************************************
     def __HandleConfigurationDialog(self):
@@ -550,28 +1050,23 @@ class QGISSolr(object):
         :return: None
         """
 
+        from .ConfigurationDialog import ConfigurationDialog
+
+        if self.configurationDialog is None:
+            self.configurationDialog = ConfigurationDialog()
+
         # Get our configuration values
-        SOLREndPoint, tableList = self.__GetConfiguration()
+        configuration = self.__GetConfiguration()
 
         # Set the values for the dialog
-        self.configurationDialog.SOLRLineEdit.setText(SOLREndPoint)
-        self.configurationDialog.TableLineEdit.setText(",".join(str(x) for x in tableList))
+        self.configurationDialog.SOLRLineEdit.setText(configuration.endpoint)
+        self.configurationDialog.TableLineEdit.setText(",".join(str(x) for x in configuration.tables))
 
         result = self.configurationDialog.exec_()
 
         if result:
-            # Get the base directory for the plugin
-            plugin_path = os.path.dirname(os.path.realpath(__file__))
-
-            # Read in the configuration
-            config = configparser.ConfigParser()
-            config.read(plugin_path + "/config.ini")
-
-            config.set("QGISSOLR", "SOLR_ENDPOINT", self.configurationDialog.SOLRLineEdit.text())
-            config.set("QGISSOLR", "SOLR_TABLES", self.configurationDialog.TableLineEdit.text())
-
-            with open(plugin_path + "/config.ini", "w") as configfile:
-                config.write(configfile)
+            self.myConfigManager.SetConfiguration(self.configurationDialog.SOLRLineEdit.text(),
+                                                  self.configurationDialog.TableLineEdit.text())
 
             # And now reinit
             self.__InitSOLR()
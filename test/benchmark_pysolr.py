@@ -0,0 +1,67 @@
+# coding=utf-8
+"""Micro-benchmarks for the bundled pysolr module.
+
+Run from the plugin directory inside a QGIS Python environment::
+
+    python -m test.benchmark_pysolr
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import timeit
+
+from managers import pysolr
+
+from .test_pysolr import reference_clean_xml_string, reference_pair_terms, reference_sanitize
+
+
+def make_payload(size):
+    """An update-sized XML message with a sprinkling of control and non-ASCII characters."""
+    doc = ('<doc><field name="system_id">12345</field><field name="name">Café €\x07</field>'
+           '<field name="the_geom">POINT(12.5 41.9)</field><field name="notes">line\x0bbreak \U0001f600</field></doc>')
+    return '<add>' + doc * (size // len(doc)) + '</add>'
+
+
+def compare(label, reference, current, payload, number=3):
+    """Time both implementations on the same payload and print the speedup."""
+    assert reference(payload) == current(payload)
+    before = min(timeit.repeat(lambda: reference(payload), number=number, repeat=3)) / number
+    after = min(timeit.repeat(lambda: current(payload), number=number, repeat=3)) / number
+    print("{:<20} {:>8.1f} ms -> {:>8.1f} ms  ({:.1f}x)".format(label, before * 1000, after * 1000, before / after))
+
+
+def compare_pairing(count):
+    """Time pairing a flat terms component list of count terms."""
+    values = list()
+    for i in range(count):
+        values.extend(['term%d' % i, i])
+
+    assert list(pysolr._pair_terms(values)) == reference_pair_terms(values)
+    before = min(timeit.repeat(lambda: reference_pair_terms(values), number=1, repeat=3))
+    after = min(timeit.repeat(lambda: list(pysolr._pair_terms(values)), number=1, repeat=3))
+    print("{:<20} {:>8.1f} ms -> {:>8.1f} ms  ({:.1f}x)".format("{} terms".format(count), before * 1000, after * 1000,
+                                                              before / after))
+
+
+def main():
+    print("Pairing suggest_terms results")
+    for count in (1000, 10000, 50000, 100000):
+        compare_pairing(count)
+
+    for size in (64 * 1024, 1024 * 1024, 8 * 1024 * 1024):
+        payload = make_payload(size)
+        print("Payload of {:.1f} MB".format(len(payload) / 1048576.0))
+        compare("sanitize", reference_sanitize, pysolr.sanitize, payload)
+        compare("clean_xml_string", reference_clean_xml_string, pysolr.clean_xml_string, payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# coding=utf-8
+"""Measures how long QGIS takes to import the plugin at startup.
+
+Run from the plugin directory inside a QGIS Python environment::
+
+    python -m test.benchmark_startup
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+from .utilities import DEFERRED_MODULES, DEFERRED_PLUGIN_MODULES, measure_plugin_import
+
+
+def main(repeat=5):
+    timings = list()
+    modules = list()
+
+    for _ in range(repeat):
+        seconds, modules = measure_plugin_import()
+        timings.append(seconds)
+
+    print("Plugin import: best {:.1f} ms, worst {:.1f} ms over {} runs".format(
+        min(timings) * 1000, max(timings) * 1000, repeat))
+    print("{} modules imported".format(len(modules)))
+
+    deferred = [name for name in modules
+                if name in DEFERRED_PLUGIN_MODULES or name.split('.')[0] in DEFERRED_MODULES]
+    print("Deferred modules imported at startup: {}".format(", ".join(deferred) or "none"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# coding=utf-8
+"""Tests for the columnar page representation.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import unittest
+
+from managers import pysolr
+from managers.ColumnarPage import ColumnarPage
+from managers.LayerStatistics import LayerStatistics
+
+SCHEMA = {
+    'fieldTypes': [
+        {'name': 'string', 'class': 'solr.StrField'},
+        {'name': 'plong', 'class': 'solr.LongPointField'},
+        {'name': 'pdates', 'class': 'solr.DatePointField', 'multiValued': True},
+    ],
+    'fields': [
+        {'name': 'system_id', 'type': 'string'},
+        {'name': 'population', 'type': 'plong'},
+        {'name': 'the_geom', 'type': 'string'},
+        {'name': 'aliases', 'type': 'string', 'multiValued': True},
+        {'name': 'visits', 'type': 'pdates'},
+    ],
+}
+
+
+class ColumnarPageTest(unittest.TestCase):
+    """Test turning pages of documents into columns."""
+
+    def setUp(self):
+        self.page = ColumnarPage(pysolr.Results({'response': {'numFound': 3, 'docs': [
+            {'system_id': 'a', 'population': '10', 'the_geom': 'POINT(12.5 41.9)', '_version_': 1},
+            {'system_id': 'b', 'aliases': ['x', 'y'], 'the_geom': 'POINT (-3.7 40.4)'},
+            {'system_id': 'c', 'population': 7},
+        ]}}))
+
+    def test_columns(self):
+        """Every column has a value per document, None where the field is missing."""
+        self.assertEqual(len(self.page), 3)
+        self.assertEqual(self.page.hits, 3)
+        self.assertEqual(self.page.columns['population'], ['10', None, 7])
+        self.assertEqual(self.page.columns['aliases'], [None, ['x', 'y'], None])
+
+    def test_coordinates_and_bounds(self):
+        """Point coordinates are parsed once and missing ones are NaN."""
+        self.assertEqual(list(self.page.x[:2]), [12.5, -3.7])
+        self.assertNotEqual(self.page.x[2], self.page.x[2])
+        self.assertEqual(self.page.GetBounds(), (-3.7, 40.4, 12.5, 41.9))
+
+    def test_point_forms(self):
+        """Points are parsed whatever their spacing or case, anything else has no coordinates."""
+        page = ColumnarPage([{'the_geom': 'POINT(1 2)'}, {'the_geom': ' point ( -3.5e1\t4 ) '}])
+        self.assertEqual(page.GetPoints(), [(1.0, 2.0), (-35.0, 4.0)])
+
+        page = ColumnarPage([{'the_geom': tWkt} for tWkt in
+                             ['point( 1.5  -2 )', 'POINT EMPTY', 'POINT(a b)', 'LINESTRING(0 0, 1 1)', None]])
+        self.assertEqual(page.GetPoints(), [(1.5, -2.0), None, None, None, None])
+
+        # Points only the regular expression reads are still parsed
+        page = ColumnarPage([{'the_geom': 'POINT(3 4)'}, {'the_geom': 'POINT(5\t6)'}, {'the_geom': 'POINT Z (1 2 3)'}])
+        self.assertEqual(page.GetPoints(), [(3.0, 4.0), (5.0, 6.0), None])
+
+    def test_no_points(self):
+        """A page without points has no bounds."""
+        self.assertIsNone(ColumnarPage([{'system_id': 'a', 'the_geom': 'LINESTRING(0 0, 1 1)'}]).GetBounds())
+        self.assertIsNone(ColumnarPage([]).GetBounds())
+
+    def test_attributes_without_decoder(self):
+        """Without a schema every value becomes a string, in the order of the layer fields."""
+        rows = list(self.page.Decode().GetAttributes(['population', 'system_id', 'missing']))
+        self.assertEqual(rows, [['10', 'a', None], [None, 'b', None], ['7', 'c', None]])
+
+    def test_attributes_with_decoder(self):
+        """Typed columns are converted and multi-valued ones become strings."""
+        self.page.Decode(pysolr.SchemaDecoder(SCHEMA))
+        self.assertEqual(list(self.page.GetAttributes(['population', 'aliases'])),
+                         [[10, None], [None, 'x, y'], [7, None]])
+
+    def test_multi_valued_typed(self):
+        """Multi-valued typed fields keep the values Solr returned instead of converting them."""
+        page = ColumnarPage([{'visits': ['2018-04-02T10:20:30Z', '2018-04-03T08:00:00Z']},
+                             {'visits': '2018-04-04T00:00:00Z'}, {}])
+        page.Decode(pysolr.SchemaDecoder(SCHEMA))
+        self.assertEqual(page.columns['visits'], ['2018-04-02T10:20:30Z, 2018-04-03T08:00:00Z',
+                                                  '2018-04-04T00:00:00Z', None])
+
+    def test_attributes_without_fields(self):
+        """Without layer fields every document still gets a row, so geometry-only features are kept."""
+        self.assertEqual(list(self.page.GetAttributes([])), [[], [], []])
+
+
+class LayerStatisticsTest(unittest.TestCase):
+    """Test the running statistics of a loading layer."""
+
+    def test_numeric_range(self):
+        """Ranges skip missing and unparseable values and keep their types."""
+        page = ColumnarPage([{'population': 10}, {'population': None}, {'population': 'n/a'}, {'population': -4}])
+        self.assertEqual(page.GetRange('population'), (-4, 10))
+        self.assertIsNone(page.GetRange('missing'))
+
+    def test_pages_are_merged(self):
+        """Counts, bounds and ranges accumulate over the pages."""
+        decoder = pysolr.SchemaDecoder(SCHEMA)
+        statistics = LayerStatistics('Places', ['population'])
+
+        first = ColumnarPage([{'population': '10', 'the_geom': 'POINT(1 2)'}, {'population': '3'}]).Decode(decoder)
+        statistics.AddPage(first, 1)
+        second = ColumnarPage([{'population': '25', 'the_geom': 'POINT(-5 8)'}]).Decode(decoder)
+        statistics.AddPage(second, 1)
+
+        self.assertEqual(statistics.featureCount, 2)
+        self.assertEqual(statistics.nullGeometryCount, 1)
+        self.assertEqual(statistics.bounds, (-5.0, 2.0, 1.0, 8.0))
+        self.assertEqual(statistics.fieldRanges, {'population': (3, 25)})
+        self.assertIn('population: 3 to 25', statistics.GetSummary())
+
+
+if __name__ == "__main__":
+    suite = unittest.TestSuite([unittest.makeSuite(ColumnarPageTest), unittest.makeSuite(LayerStatisticsTest)])
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
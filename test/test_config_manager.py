@@ -0,0 +1,122 @@
+# coding=utf-8
+"""Tests for the configuration file handling.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from managers.ConfigManager import ConfigManager
+
+CONFIG = """[QGISSOLR]
+solr_endpoint = http://localhost:8983/solr
+solr_tables = places,roads
+solr_zookeeper =
+solr_writeback = true
+solr_warmup = true
+solr_spool = true
+
+[table:places]
+query_parser = edismax
+qf = name^3 _text_
+mm = 100%
+timestamp_field = last_modified
+cc3_bbox = yes
+
+[table:rivers]
+endpoint = https://other:8983/solr/
+core = rivers_v2
+username = reader
+password = 100%secret
+timeout = 5
+rows = 1000
+fields = id, name ,the_geom
+max_connections = 4
+"""
+
+
+class ConfigManagerTest(unittest.TestCase):
+    """Test reading and writing config.ini."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'config.ini')
+        with open(self.path, 'w') as configfile:
+            configfile.write(CONFIG)
+        self.manager = ConfigManager(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_configuration(self):
+        """The values are parsed from the file."""
+        self.assertEqual(self.manager.GetConfiguration(),
+                         ('http://localhost:8983/solr', ['places', 'roads', 'rivers'], '', True, True, True))
+        configuration = self.manager.GetConfiguration()
+        self.assertEqual(configuration.tables, ['places', 'roads', 'rivers'])
+        self.assertTrue(configuration.warmup)
+
+    def test_get_table_settings(self):
+        """Tables without a section get the defaults."""
+        settings = self.manager.GetTableSettings(['places', 'roads', 'rivers'])
+        self.assertEqual(settings['roads'], {'endpoint': 'http://localhost:8983/solr', 'core': 'roads', 'auth': None,
+                                             'timeout': 60.0, 'rows': 500, 'max_connections': 10, 'fields': []})
+        self.assertEqual(settings['places']['query_parser'], 'edismax')
+        self.assertEqual(settings['places']['mm'], '100%')
+        self.assertEqual(settings['places']['timestamp_field'], 'last_modified')
+        self.assertIs(settings['places']['cc3_bbox'], True)
+        self.assertEqual(settings['places']['fields'], [])
+        self.assertEqual(settings['rivers'], {'endpoint': 'https://other:8983/solr', 'core': 'rivers_v2',
+                                              'auth': ('reader', '100%secret'), 'timeout': 5.0, 'rows': 1000,
+                                              'max_connections': 4, 'fields': ['id', 'name', 'the_geom']})
+
+    def test_refresh_fields(self):
+        """Tables whose layers can be refreshed always return the id and timestamp fields."""
+        with open(self.path, 'a') as configfile:
+            configfile.write('\n[table:roads]\nfields = name, system_id\ntimestamp_field = updated\n')
+        self.manager.config = None
+
+        settings = self.manager.GetTableSettings(['roads'])
+        self.assertEqual(settings['roads']['fields'], ['name', 'system_id', 'updated'])
+
+    def test_file_is_parsed_once(self):
+        """The file is only parsed again once it changes."""
+        with mock.patch('configparser.ConfigParser.read', autospec=True,
+                        side_effect=lambda parser, path: parser.read_string(CONFIG)) as read:
+            self.manager.GetConfiguration()
+            self.manager.GetConfiguration()
+            self.assertEqual(read.call_count, 1)
+
+            stat = os.stat(self.path)
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+            self.manager.GetConfiguration()
+            self.assertEqual(read.call_count, 2)
+
+    def test_set_configuration(self):
+        """Saved values are read back and the other settings are kept."""
+        self.manager.SetConfiguration('http://solr:8983/solr', 'places')
+        self.assertEqual(ConfigManager(self.path).GetConfiguration(),
+                         ('http://solr:8983/solr', ['places', 'rivers'], '', True, True, True))
+        self.assertEqual(self.manager.GetConfiguration().endpoint, 'http://solr:8983/solr')
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ConfigManagerTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
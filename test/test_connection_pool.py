@@ -0,0 +1,69 @@
+# coding=utf-8
+"""Tests for sharing connections between tables.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from managers.ConnectionPool import ConnectionPool
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    """Test the connection pool."""
+
+    def setUp(self):
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.Close()
+
+    def test_one_session_per_host(self):
+        """Tables on the same host share a session."""
+        places = self.pool.GetSession('http://solr1:8983/solr', 4)
+        roads = self.pool.GetSession('http://solr1:8983/solr/roads', 2)
+        rivers = self.pool.GetSession('http://solr2:8983/solr', 2)
+        secure = self.pool.GetSession('https://solr1:8983/solr', 2)
+
+        self.assertIs(places, roads)
+        self.assertIsNot(places, rivers)
+        self.assertIsNot(places, secure)
+
+    def test_pool_grows_to_largest_table(self):
+        """The pool of a host holds as many connections as its most demanding table."""
+        session = self.pool.GetSession('http://solr1:8983/solr', 4)
+        self.pool.GetSession('http://solr1:8983/solr', 8)
+        self.pool.GetSession('http://solr1:8983/solr', 2)
+
+        adapter = session.get_adapter('http://solr1:8983/solr/places/select')
+        self.assertEqual(adapter._pool_maxsize, 8)
+        self.assertTrue(adapter._pool_block)
+
+    def test_replaced_pool_closed(self):
+        """The connections of a pool that was replaced by a larger one are closed."""
+        session = self.pool.GetSession('http://solr1:8983/solr', 4)
+        adapter = session.get_adapter('http://solr1:8983/solr/places/select')
+
+        with mock.patch.object(adapter, 'close') as close:
+            self.pool.GetSession('http://solr1:8983/solr', 8)
+
+        close.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ConnectionPoolTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,256 @@
+# coding=utf-8
+"""Tests for sending layer edits back to Solr.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import datetime
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from managers import pysolr
+from managers.EditManager import EditManager
+
+SCHEMA = {
+    'fieldTypes': [
+        {'name': 'string', 'class': 'solr.StrField'},
+        {'name': 'pdate', 'class': 'solr.DatePointField'},
+    ],
+    'fields': [
+        {'name': 'system_id', 'type': 'string'},
+        {'name': 'name', 'type': 'string'},
+        {'name': 'updated', 'type': 'pdate'},
+        {'name': 'aliases', 'type': 'string', 'multiValued': True},
+    ],
+}
+
+FIELDS = ['system_id', 'name', 'updated', 'aliases']
+
+
+class QDateTime(object):
+    """Stands in for the QDateTime of a DateTime attribute, 12:00 at UTC+2."""
+
+    def __init__(self, inUTC=False):
+        self.utc = inUTC
+
+    def toUTC(self):
+        return QDateTime(True)
+
+    def toPyDateTime(self):
+        return datetime.datetime(2018, 4, 2, 10 if self.utc else 12, 0, 0)
+
+
+class Geometry(object):
+    def asWkt(self):
+        return 'POINT(1 2)'
+
+
+class QDate(object):
+    def toPyDate(self):
+        return datetime.date(2018, 4, 2)
+
+
+class Field(object):
+    def __init__(self, inName):
+        self.fieldName = inName
+
+    def name(self):
+        return self.fieldName
+
+
+class Fields(object):
+    def __iter__(self):
+        return iter([Field(tName) for tName in FIELDS])
+
+    def indexOf(self, inName):
+        return FIELDS.index(inName) if inName in FIELDS else -1
+
+    def at(self, inIndex):
+        return Field(FIELDS[inIndex])
+
+
+class Signal(object):
+    def __init__(self):
+        self.slots = list()
+
+    def connect(self, inSlot):
+        self.slots.append(inSlot)
+
+    def emit(self, *args):
+        for tSlot in self.slots:
+            tSlot(*args)
+
+
+class EditBuffer(object):
+    def __init__(self, inAttributes, inGeometries):
+        self.attributes = inAttributes
+        self.geometries = inGeometries
+
+    def changedAttributeValues(self):
+        return self.attributes
+
+    def changedGeometries(self):
+        return self.geometries
+
+
+class Layer(object):
+    """Holds features 1 and 2, for documents a and b, and the edits made to them."""
+
+    def __init__(self, inAttributes, inGeometries=None):
+        self.buffer = EditBuffer(inAttributes, inGeometries or {})
+        self.beforeCommitChanges = Signal()
+        self.afterCommitChanges = Signal()
+        self.afterRollBack = Signal()
+        self.willBeDeleted = Signal()
+
+    def Commit(self, inSucceeds=True):
+        """Emit the signals of commitChanges, whose edit buffer is gone once it succeeded."""
+        self.beforeCommitChanges.emit(False)
+        if inSucceeds:
+            self.buffer = None
+            self.afterCommitChanges.emit()
+
+    def id(self):
+        return 'layer1'
+
+    def name(self):
+        return 'places_port'
+
+    def editBuffer(self):
+        return self.buffer
+
+    def fields(self):
+        return Fields()
+
+    def getFeature(self, inFeatureId):
+        return {0: {1: 'a', 2: 'b'}[inFeatureId]}
+
+
+class TableManager(object):
+    def GetFieldDecoder(self, inTableName):
+        return pysolr.SchemaDecoder(SCHEMA)
+
+
+class QueryManager(object):
+    def GetSolr(self, inTable):
+        return 'solr of {}'.format(inTable)
+
+
+class Solr(object):
+    def __init__(self):
+        self.calls = list()
+
+    def add(self, inDocs, **kwargs):
+        self.calls.append((inDocs, kwargs))
+
+
+class EditManagerTest(unittest.TestCase):
+    """Test turning layer edits into atomic updates."""
+
+    def setUp(self):
+        self.manager = EditManager(QueryManager(), None, inTableManager=TableManager())
+        self.manager.trackedLayers['layer1'] = 'places'
+
+    def test_dates(self):
+        """Qt dates and times are sent as UTC, which pysolr writes as ISO 8601."""
+        docs = self.manager.GetChangedDocuments(Layer({1: {2: QDateTime()}, 2: {2: QDate()}}))
+
+        self.assertEqual(docs, [{'system_id': 'a', 'updated': datetime.datetime(2018, 4, 2, 10, 0, 0)},
+                                {'system_id': 'b', 'updated': datetime.date(2018, 4, 2)}])
+        self.assertEqual(pysolr.Solr('http://localhost:8983/solr/places')._from_python_json(docs[0]['updated']),
+                         '2018-04-02T10:00:00Z')
+
+    def test_multi_valued(self):
+        """Edits of multi-valued fields, joined into one string on load, are not sent."""
+        docs = self.manager.GetChangedDocuments(Layer({1: {1: 'port a', 3: 'x, y'}, 2: {3: 'z'}}))
+
+        self.assertEqual(docs, [{'system_id': 'a', 'name': 'port a'}])
+
+    def test_new_features_skipped(self):
+        """Features added in the edit session, with negative ids, are not in Solr."""
+        docs = self.manager.GetChangedDocuments(Layer({-1: {1: 'new'}, 1: {1: 'port a'}}, {-2: Geometry()}))
+
+        self.assertEqual(docs, [{'system_id': 'a', 'name': 'port a'}])
+
+    def test_null_removes_field(self):
+        """NULL attributes are sent as None, which removes the field."""
+        docs = self.manager.GetChangedDocuments(Layer({1: {1: None}}))
+
+        self.assertEqual(docs, [{'system_id': 'a', 'name': None}])
+
+    def test_geometry(self):
+        """Changed geometries are sent as the WKT of the_geom."""
+        docs = self.manager.GetChangedDocuments(Layer({}, {2: Geometry()}))
+
+        self.assertEqual(docs, [{'system_id': 'b', 'the_geom': 'POINT(1 2)'}])
+
+    def test_empty_string(self):
+        """Edits to an empty string are sent like any other."""
+        docs = self.manager.GetChangedDocuments(Layer({1: {1: ''}}))
+
+        self.assertEqual(docs, [{'system_id': 'a', 'name': ''}])
+
+    def test_id_field_ignored(self):
+        """Edits of the id field are not sent, and a feature with only those has nothing to send."""
+        docs = self.manager.GetChangedDocuments(Layer({1: {0: 'z'}, 2: {0: 'y', 1: 'port b'}}))
+
+        self.assertEqual(docs, [{'system_id': 'b', 'name': 'port b'}])
+
+    def test_send_changes(self):
+        """Every changed field is set through one task, which adds the documents to the table's Solr."""
+        layer = Layer({1: {1: 'port a'}}, {2: Geometry()})
+        self.manager.TrackLayer(layer, 'places')
+
+        with mock.patch('managers.EditManager.QgsTask') as task, mock.patch('managers.EditManager.QgsApplication'):
+            layer.Commit()
+
+        function, solr, docs, fieldUpdates = task.fromFunction.call_args[0][1:]
+        self.assertEqual(solr, 'solr of places')
+        self.assertEqual(fieldUpdates, {'name': 'set', 'the_geom': 'set'})
+
+        fakeSolr = Solr()
+        self.assertEqual(function(None, fakeSolr, docs, fieldUpdates), 2)
+        self.assertEqual(fakeSolr.calls, [(docs, {'fieldUpdates': {'name': 'set', 'the_geom': 'set'},
+                                                  'commitWithin': 10000, 'solrapi': 'JSON', 'batch_size': 500})])
+
+    def test_failed_commit(self):
+        """Edits are only sent once QGIS committed them, and rolled back edits never are."""
+        layer = Layer({1: {1: 'port a'}})
+        self.manager.TrackLayer(layer, 'places')
+
+        with mock.patch('managers.EditManager.QgsTask') as task, mock.patch('managers.EditManager.QgsApplication'):
+            layer.Commit(inSucceeds=False)
+            self.assertFalse(task.fromFunction.called)
+
+            layer.afterRollBack.emit()
+            layer.afterCommitChanges.emit()
+            self.assertFalse(task.fromFunction.called)
+
+    def test_untracked_layer(self):
+        """Edits of layers that are not tracked are not sent."""
+        layer = Layer({1: {1: 'port a'}})
+        self.manager.TrackLayer(layer, 'places')
+        self.manager.UntrackLayer('layer1')
+
+        with mock.patch('managers.EditManager.QgsTask') as task:
+            layer.Commit()
+
+        self.assertFalse(task.fromFunction.called)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(EditManagerTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
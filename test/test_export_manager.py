@@ -0,0 +1,151 @@
+# coding=utf-8
+"""Tests for exporting search results to files.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    from osgeo import ogr
+except ImportError:
+    ogr = None
+
+from managers import pysolr
+from managers.ColumnarPage import ColumnarPage
+from managers.ExportManager import ExportManager
+
+SCHEMA = {
+    'fieldTypes': [
+        {'name': 'string', 'class': 'solr.StrField'},
+        {'name': 'plong', 'class': 'solr.LongPointField'},
+        {'name': 'pdate', 'class': 'solr.DatePointField'},
+    ],
+    'fields': [
+        {'name': 'system_id', 'type': 'string'},
+        {'name': 'population', 'type': 'plong'},
+        {'name': 'the_geom', 'type': 'string'},
+        {'name': 'last_modified', 'type': 'pdate'},
+    ],
+}
+
+PAGES = [
+    [{'system_id': 'a', 'population': '10', 'the_geom': 'POINT(12.5 41.9)'},
+     {'system_id': 'b', 'the_geom': 'LINESTRING(0 0, 1 1)'}],
+    [{'system_id': 'c', 'population': '30'}],
+]
+
+
+class FakeQueryManager(object):
+    """Hands out the pages of PAGES as columnar pages."""
+
+    def GetPages(self, inQuery, inTable, inMaxWorkers=4):
+        for tDocs in PAGES:
+            yield ColumnarPage(pysolr.Results({'response': {'numFound': 3, 'docs': tDocs}}))
+
+
+class FakeTableManager(object):
+    """Returns the fields of SCHEMA."""
+
+    def GetFieldDecoder(self, inTableName):
+        return pysolr.SchemaDecoder(SCHEMA)
+
+    def GetTableColumns(self, inTableName):
+        return [tField['name'] for tField in SCHEMA['fields']]
+
+
+class ExportManagerTest(unittest.TestCase):
+    """Test the export manager."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.manager = ExportManager(FakeQueryManager(), FakeTableManager())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_table_path(self):
+        """Several tables get a file each."""
+        self.assertEqual(ExportManager.GetTablePath('/tmp/out.fgb', 'places', 1), '/tmp/out.fgb')
+        self.assertEqual(ExportManager.GetTablePath('/tmp/out.fgb', 'places', 2), '/tmp/out_places.fgb')
+
+    def test_format(self):
+        """The extension chooses the driver."""
+        self.assertEqual(ExportManager.GetFormat('out.FGB')[0], 'FlatGeobuf')
+        self.assertEqual(ExportManager.GetFormat('out.gpkg')[0], 'GPKG')
+        self.assertEqual(ExportManager.GetFormat('out.parquet')[0], 'Parquet')
+        self.assertRaises(ValueError, ExportManager.GetFormat, 'out.shp')
+
+    @unittest.skipIf(ogr is None, 'GDAL is not installed')
+    def test_export(self):
+        """Every page is written with typed fields and geometries."""
+        path = os.path.join(self.directory, 'places.gpkg')
+        progress = list()
+
+        written = self.manager.Export('places', 'places', path,
+                                      inProgress=lambda inWritten, inHits: progress.append((inWritten, inHits)))
+
+        self.assertEqual(written, 3)
+        self.assertEqual(progress, [(2, 3), (3, 3)])
+
+        dataSource = ogr.Open(path)
+        layer = dataSource.GetLayer(0)
+        self.assertEqual(layer.GetFeatureCount(), 3)
+
+        populationField = layer.GetLayerDefn().GetFieldDefn(layer.GetLayerDefn().GetFieldIndex('population'))
+        self.assertEqual(populationField.GetType(), ogr.OFTInteger64)
+
+        features = sorted(layer, key=lambda inFeature: inFeature.GetField('system_id'))
+        self.assertEqual(features[0].GetField('population'), 10)
+        self.assertEqual(features[0].GetGeometryRef().GetX(), 12.5)
+        self.assertEqual(features[1].GetGeometryRef().GetGeometryName(), 'LINESTRING')
+        self.assertIsNone(features[2].GetGeometryRef())
+
+    def test_datetime_in_utc(self):
+        """Dates are written as UTC, as Solr stores them."""
+        ogrModule = mock.Mock()
+        decoder = pysolr.SchemaDecoder(SCHEMA)
+        fieldType, _, setter = self.manager._ExportManager__GetFieldType(ogrModule, 'last_modified', decoder)
+        self.assertIs(fieldType, ogrModule.OFTDateTime)
+
+        feature = mock.Mock()
+        setter(feature, 3, datetime.datetime(2018, 4, 2, 12, 30, 15))
+        feature.SetField.assert_called_once_with(3, 2018, 4, 2, 12, 30, 15.0, 100)
+
+    @unittest.skipIf(ogr is None, 'GDAL is not installed')
+    def test_export_can_stop(self):
+        """Returning False from the progress function stops after the page."""
+        path = os.path.join(self.directory, 'places.fgb')
+
+        self.assertEqual(self.manager.Export('places', 'places', path, inProgress=lambda inWritten, inHits: False), 2)
+
+
+    @unittest.skipIf(ogr is None, 'GDAL is not installed')
+    def test_export_without_fields(self):
+        """Documents are still written with their geometry when the table fields could not be read."""
+        path = os.path.join(self.directory, 'places.gpkg')
+        self.manager.tableManager.GetTableColumns = lambda inTableName: []
+
+        self.assertEqual(self.manager.Export('places', 'places', path), 3)
+
+        dataSource = ogr.Open(path)
+        self.assertEqual(dataSource.GetLayer(0).GetFeatureCount(), 3)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ExportManagerTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
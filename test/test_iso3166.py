@@ -0,0 +1,92 @@
+# coding=utf-8
+"""Tests for the country bounding boxes.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import unittest
+
+import iso3166
+
+
+class CountryBoundsTest(unittest.TestCase):
+    """Test the bounding box of the countries."""
+
+    def test_every_country_has_bounds(self):
+        """Every country should have a bounding box."""
+        missing = [tCountry.alpha3 for tCountry in iso3166.countries if tCountry.bbox is None]
+        self.assertEqual(missing, [])
+
+    def test_bounds_are_geographic(self):
+        """Bounding boxes should be valid longitude and latitude ranges."""
+        for tCountry in iso3166.countries:
+            xMin, yMin, xMax, yMax = tCountry.bbox
+            self.assertTrue(-180.0 <= xMin <= 180.0 and -180.0 <= xMax <= 180.0, tCountry.alpha3)
+            self.assertTrue(-90.0 <= yMin <= yMax <= 90.0, tCountry.alpha3)
+
+    def test_known_country(self):
+        """A country box should contain a point inside the country."""
+        xMin, yMin, xMax, yMax = iso3166.countries.get("FRA").bbox
+        self.assertTrue(xMin < 2.35 < xMax and yMin < 48.85 < yMax)
+
+    def test_antimeridian(self):
+        """Countries crossing the antimeridian have a minimum longitude east of the maximum."""
+        xMin, _, xMax, _ = iso3166.countries.get("FJI").bbox
+        self.assertGreater(xMin, xMax)
+
+    def test_country_is_a_tuple(self):
+        """Adding the bounding box should not change the country fields."""
+        country = iso3166.countries.get("US")
+        self.assertEqual(country.alpha3, "USA")
+        self.assertEqual(len(country), 5)
+
+
+
+class CountrySearchTest(unittest.TestCase):
+    """Test searching the countries."""
+
+    def search(self, inText, inLimit=10):
+        return [tCountry.alpha3 for tCountry in iso3166.countries.search(inText, inLimit)]
+
+    def test_codes(self):
+        """Codes should find their country."""
+        self.assertEqual(self.search("us", 1), ["USA"])
+        self.assertEqual(self.search("DEU", 1), ["DEU"])
+        self.assertEqual(self.search("840", 1), ["USA"])
+
+    def test_prefix(self):
+        """Names and words of names should match by prefix, without accents."""
+        self.assertEqual(self.search("swit", 1), ["CHE"])
+        self.assertEqual(sorted(self.search("korea", 2)), ["KOR", "PRK"])
+        self.assertEqual(self.search("cote d", 1), ["CIV"])
+        self.assertEqual(self.search("aland", 1), ["ALA"])
+
+    def test_fuzzy(self):
+        """Misspelled names should still find the country."""
+        self.assertEqual(self.search("germny", 1), ["DEU"])
+        self.assertEqual(self.search("untied kingdom", 1), ["GBR"])
+
+    def test_no_match(self):
+        """Nothing similar should find nothing."""
+        self.assertEqual(self.search("zz"), [])
+        self.assertEqual(self.search("  "), [])
+
+    def test_numeric_lookup(self):
+        """Three digit strings should still be numeric codes."""
+        self.assertEqual(iso3166.countries.get("250").alpha3, "FRA")
+        self.assertEqual(iso3166.countries.get(250).alpha3, "FRA")
+        self.assertEqual(iso3166.countries.get("FRA").numeric, "250")
+
+
+if __name__ == "__main__":
+    suite = unittest.TestSuite([unittest.makeSuite(CountryBoundsTest), unittest.makeSuite(CountrySearchTest)])
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
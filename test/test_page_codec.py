@@ -0,0 +1,103 @@
+# coding=utf-8
+"""Tests for the binary page records.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import json
+import struct
+import unittest
+
+from managers import pysolr
+from managers.ColumnarPage import ColumnarPage
+from managers.PageCodec import PAGE_HEADER, PAGE_MAGIC, PageCodec
+
+DOCS = [
+    {'system_id': 'a', 'country': 'FRA', 'population': 10, 'area': 1.5, 'capital': True,
+     'the_geom': 'POINT(2.35 48.85)', 'aliases': ['Paris', 'Lutèce']},
+    {'system_id': 'b', 'country': 'FRA', 'population': 3, 'capital': False,
+     'the_geom': 'LINESTRING(0 0, 1 1)'},
+    {'system_id': 'c', 'country': 'FRA', 'population': -2 ** 40, 'area': 0.25, 'capital': False,
+     'the_geom': 'POINT(-1 1e-3)'},
+    {'system_id': 'd', 'country': 'ITA', 'population': 7, 'area': 3.0, 'capital': True},
+]
+
+
+class PageCodecTest(unittest.TestCase):
+    """Test packing pages into records and back."""
+
+    def setUp(self):
+        self.page = ColumnarPage(pysolr.Results({'response': {'numFound': 42, 'docs': DOCS}}))
+
+    def test_round_trip(self):
+        """Every column comes back with its values, types and missing values."""
+        page = PageCodec.Decode(PageCodec.Encode(self.page))
+
+        self.assertEqual(page.hits, 42)
+        self.assertEqual(len(page), 4)
+        self.assertEqual(page.geomField, 'the_geom')
+        self.assertEqual(list(page.columns), list(self.page.columns))
+        self.assertEqual(page.columns, self.page.columns)
+        self.assertIsInstance(page.columns['population'][2], int)
+        self.assertIs(page.columns['capital'][0], True)
+
+    def test_coordinates(self):
+        """The parsed coordinates are stored, with NaN where no point was parsed."""
+        page = PageCodec.Decode(PageCodec.Encode(self.page))
+
+        self.assertEqual([float(tX) for tX in page.x[::2]], [2.35, -1.0])
+        self.assertEqual(float(page.y[2]), 1e-3)
+        self.assertNotEqual(float(page.x[1]), float(page.x[1]))
+        self.assertEqual(page.GetBounds(), self.page.GetBounds())
+
+    def test_memoryview(self):
+        """A record is read in place from a slice of a larger buffer."""
+        record = PageCodec.Encode(self.page)
+        buffer = bytearray(b'\0' * 8 + record + b'\0' * 8)
+
+        page = PageCodec.Decode(memoryview(buffer)[8:8 + len(record)])
+
+        self.assertEqual(page.columns, self.page.columns)
+
+    def test_compact(self):
+        """Repeated strings are stored once and field names once per page, so the record beats the JSON."""
+        docs = [{'system_id': str(tIndex), 'country': 'FRA' if tIndex % 2 else 'ITA', 'population': tIndex}
+                for tIndex in range(1000)]
+        page = ColumnarPage(pysolr.Results({'response': {'numFound': 1000, 'docs': docs}}))
+
+        record = PageCodec.Encode(page)
+
+        self.assertLess(len(record), len(json.dumps(docs).encode('utf-8')) * 3 // 4)
+        self.assertEqual(PageCodec.Decode(record).columns, page.columns)
+
+    def test_empty_page(self):
+        """A page without documents survives the round trip."""
+        page = PageCodec.Decode(PageCodec.Encode(ColumnarPage(pysolr.Results({'response': {'numFound': 0,
+                                                                                            'docs': []}}))))
+
+        self.assertEqual(len(page), 0)
+        self.assertEqual(page.columns, {})
+
+    def test_version(self):
+        """Records of another format or version are refused."""
+        record = bytearray(PageCodec.Encode(self.page))
+
+        self.assertRaises(ValueError, PageCodec.Decode, b'JSON' + bytes(record[4:]))
+        self.assertRaises(ValueError, PageCodec.Decode, record[:PAGE_HEADER.size - 1])
+
+        struct.pack_into('<4sH', record, 0, PAGE_MAGIC, 99)
+        self.assertRaises(ValueError, PageCodec.Decode, record)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(PageCodecTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,102 @@
+# coding=utf-8
+"""Tests for the on-disk page spool.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import threading
+import unittest
+
+from managers import pysolr
+from managers.ColumnarPage import ColumnarPage
+from managers.PageSpool import PageSpool
+
+
+def CreatePage(inStart, inCount, inHits=100):
+    return ColumnarPage(pysolr.Results({'response': {'numFound': inHits, 'docs': [
+        {'system_id': str(tIndex), 'the_geom': 'POINT({} 1)'.format(tIndex), 'name': 'x' * 5000}
+        for tIndex in range(inStart, inStart + inCount)]}}))
+
+
+class PageSpoolTest(unittest.TestCase):
+    """Test parking pages on disk and reading them back."""
+
+    def setUp(self):
+        self.spool = PageSpool()
+
+    def tearDown(self):
+        self.spool.Close()
+
+    def test_round_trip(self):
+        """Pages come back in order with their columns, hits and coordinates."""
+        pages = [CreatePage(tStart, 10) for tStart in range(0, 50, 10)]
+        self.spool.Start(iter(pages))
+
+        read = list(self.spool.Pages())
+
+        self.assertEqual(len(read), 5)
+        for tWritten, tRead in zip(pages, read):
+            self.assertEqual(tRead.columns, tWritten.columns)
+            self.assertEqual(tRead.hits, 100)
+            self.assertEqual(len(tRead), 10)
+            self.assertEqual(list(tRead.x), list(tWritten.x))
+
+    def test_reader_waits_for_writer(self):
+        """The reader blocks until the next page is written instead of stopping early."""
+        released = threading.Event()
+
+        def Pages():
+            yield CreatePage(0, 2)
+            released.wait(5)
+            yield CreatePage(2, 2)
+
+        self.spool.Start(Pages())
+        read = self.spool.Pages()
+
+        self.assertEqual(next(read).columns['system_id'], ['0', '1'])
+        released.set()
+        self.assertEqual(next(read).columns['system_id'], ['2', '3'])
+        self.assertIsNone(next(read, None))
+
+    def test_error_raised_after_last_page(self):
+        """A failing writer hands its exception to the reader once the written pages are read."""
+        def Pages():
+            yield CreatePage(0, 3)
+            raise pysolr.SolrError('timed out')
+
+        self.spool.Start(Pages())
+        read = self.spool.Pages()
+
+        self.assertEqual(len(next(read)), 3)
+        self.assertRaises(pysolr.SolrError, next, read)
+
+    def test_close_stops_writer(self):
+        """Closing the spool stops the writer and closes its iterator."""
+        closed = threading.Event()
+
+        def Pages():
+            try:
+                while True:
+                    yield CreatePage(0, 1)
+            finally:
+                closed.set()
+
+        self.spool.Start(Pages())
+        next(self.spool.Pages())
+        self.spool.Close()
+
+        self.assertTrue(closed.wait(5))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(PageSpoolTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,618 @@
+# coding=utf-8
+"""Tests for the bundled pysolr module.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import datetime
+import json
+import random
+import unittest
+
+import requests
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    from urllib.parse import parse_qs
+except ImportError:
+    from urlparse import parse_qs
+
+from managers import pysolr
+
+
+class FakeClock(object):
+    """Manually advanced clock for breaker tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakySolr(pysolr.Solr):
+    """Solr whose requests fail with the given errors before succeeding."""
+
+    def __init__(self, errors, **kwargs):
+        super(FlakySolr, self).__init__('http://localhost:8983/solr/core', **kwargs)
+        self.errors = list(errors)
+        self.calls = 0
+
+    def _send_single_request(self, method, path='', body=None, headers=None, files=None, base_url=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return '{}'
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    """Test the per-host circuit breaker."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.clock = FakeClock()
+        self.breaker = pysolr.CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=self.clock)
+
+    def test_opens_after_threshold(self):
+        """Consecutive failures open the breaker."""
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, pysolr.CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_half_open_probe(self):
+        """Only one probe is let through once the reset timeout has passed."""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 10
+        self.assertTrue(self.breaker.is_available())
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, pysolr.CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        """A failed half-open probe opens the breaker again."""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow_request())
+
+
+class RetryPolicyTest(unittest.TestCase):
+    """Test retries driven by RetryPolicy."""
+
+    def make_policy(self, **kwargs):
+        self.sleeps = []
+        kwargs.setdefault('sleep', self.sleeps.append)
+        return pysolr.RetryPolicy(**kwargs)
+
+    def test_backoff_is_capped(self):
+        """Delays grow exponentially up to max_backoff."""
+        policy = self.make_policy(backoff=1, multiplier=2, max_backoff=5, jitter=0)
+        self.assertEqual([policy.get_delay(i) for i in (1, 2, 3, 4)], [1, 2, 4, 5])
+
+    def test_jitter_bounds(self):
+        """Jitter only ever shortens the delay."""
+        policy = self.make_policy(backoff=1, jitter=0.5)
+        for _ in range(100):
+            self.assertTrue(0.5 <= policy.get_delay(1) <= 1.0)
+
+    def test_retries_transient_errors(self):
+        """Transient errors are retried until a request succeeds."""
+        solr = FlakySolr([pysolr.SolrTransientError('down')] * 2, retry_policy=self.make_policy(max_attempts=3))
+        self.assertEqual(solr._send_request('get', 'select/'), '{}')
+        self.assertEqual(solr.calls, 3)
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_max_attempts(self):
+        """The last error is raised once max_attempts is reached."""
+        solr = FlakySolr([pysolr.SolrTransientError('down')] * 5, retry_policy=self.make_policy(max_attempts=2))
+        self.assertRaises(pysolr.SolrTransientError, solr._send_request, 'get', 'select/')
+        self.assertEqual(solr.calls, 2)
+
+    def test_client_errors_not_retried(self):
+        """Plain SolrErrors (4xx) are raised straight away."""
+        solr = FlakySolr([pysolr.SolrError('bad request')], retry_policy=self.make_policy())
+        self.assertRaises(pysolr.SolrError, solr._send_request, 'get', 'select/')
+        self.assertEqual(solr.calls, 1)
+
+    def test_retry_budget(self):
+        """An exhausted budget stops retries."""
+        solr = FlakySolr([pysolr.SolrTransientError('down')] * 5,
+                         retry_policy=self.make_policy(max_attempts=5, retry_budget=0, max_budget=1))
+        self.assertRaises(pysolr.SolrTransientError, solr._send_request, 'get', 'select/')
+        self.assertEqual(solr.calls, 2)
+
+    def test_open_breaker_fails_fast(self):
+        """No request is sent to a host whose breaker is open."""
+        policy = self.make_policy(max_attempts=1, failure_threshold=1)
+        solr = FlakySolr([pysolr.SolrTransientError('down')], retry_policy=policy)
+        self.assertRaises(pysolr.SolrTransientError, solr._send_request, 'get', 'select/')
+        self.assertRaises(pysolr.SolrTransientError, solr._send_request, 'get', 'select/')
+        self.assertEqual(solr.calls, 1)
+
+    def test_unexpected_error_ends_probe(self):
+        """Errors other than SolrErrors count as failures, so a half-open probe does not stay open forever."""
+        clock = FakeClock()
+        policy = self.make_policy(max_attempts=1, failure_threshold=1, reset_timeout=10, clock=clock)
+        solr = FlakySolr([pysolr.SolrTransientError('down'), ValueError('bad response')], retry_policy=policy)
+        self.assertRaises(pysolr.SolrTransientError, solr._send_request, 'get', 'select/')
+
+        clock.now += 10
+        self.assertRaises(ValueError, solr._send_request, 'get', 'select/')
+
+        clock.now += 10
+        self.assertEqual(solr._send_request('get', 'select/'), '{}')
+        self.assertEqual(solr.calls, 3)
+
+    def test_request_errors(self):
+        """Request errors that are not transient become SolrErrors."""
+        solr = pysolr.Solr('http://localhost:8983/solr/core', retry_policy=self.make_policy())
+        session = mock.Mock()
+        session.get.side_effect = requests.exceptions.TooManyRedirects('redirected')
+        solr.session = session
+
+        self.assertRaises(pysolr.SolrError, solr._send_request, 'get', 'select/')
+        self.assertEqual(session.get.call_count, 1)
+
+    def test_verify_per_request(self):
+        """Clients sharing a session keep their own TLS verification."""
+        session = mock.Mock()
+        session.get.return_value = mock.Mock(status_code=200, content=b'{}')
+
+        for tVerify in (False, '/etc/ssl/solr.pem'):
+            pysolr.Solr('https://localhost:8983/solr/core', verify=tVerify, session=session)._send_request('get')
+            self.assertEqual(session.get.call_args[1]['verify'], tVerify)
+
+
+def make_replica(node, core, state='active', leader=False):
+    replica = {'base_url': 'http://%s/solr' % node, 'core': core, 'state': state,
+               'node_name': '%s_solr' % node}
+    if leader:
+        replica['leader'] = 'true'
+    return replica
+
+
+CLUSTER_STATE = {
+    'places': {
+        'shards': {
+            'shard1': {'state': 'active', 'replicas': {
+                'core_node1': make_replica('a:8983', 'places_shard1_replica1', leader=True),
+                'core_node2': make_replica('b:8983', 'places_shard1_replica2'),
+            }},
+            'shard2': {'state': 'active', 'replicas': {
+                'core_node3': make_replica('b:8983', 'places_shard2_replica1', leader=True),
+                'core_node4': make_replica('c:8983', 'places_shard2_replica2', state='down'),
+            }},
+            'shard3': {'state': 'inactive', 'replicas': {
+                'core_node5': make_replica('d:8983', 'places_shard3_replica1', leader=True),
+            }},
+        },
+    },
+    'roads': {
+        'shards': {
+            'shard1': {'state': 'active', 'replicas': {
+                'core_node1': make_replica('c:8983', 'roads_shard1_replica1', leader=True),
+            }},
+        },
+    },
+}
+
+
+class RoutingTableTest(unittest.TestCase):
+    """Test the precomputed ZooKeeper routing table."""
+
+    def test_active_replicas(self):
+        """Only active replicas of active shards are routed to."""
+        route = pysolr.build_routing_table(CLUSTER_STATE)['places']
+        self.assertEqual(route.hosts, ('http://a:8983/solr', 'http://b:8983/solr'))
+        self.assertEqual(route.leaders, ('http://a:8983/solr', 'http://b:8983/solr'))
+        self.assertEqual([shard.name for shard in route.shards], ['shard1', 'shard2'])
+        self.assertEqual(route.shards[1].leader, 'http://b:8983/solr/places_shard2_replica1')
+
+    def test_live_nodes_filter(self):
+        """Replicas on nodes missing from live_nodes are dropped."""
+        route = pysolr.build_routing_table(CLUSTER_STATE, live_nodes=['b:8983_solr'])['places']
+        self.assertEqual(route.hosts, ('http://b:8983/solr', ))
+        self.assertEqual(route.shards[0].replicas, ('http://b:8983/solr/places_shard1_replica2', ))
+        self.assertIsNone(route.shards[0].leader)
+
+    def test_aliases(self):
+        """Aliases resolve to the merged routes of their collections."""
+        routes = pysolr.build_routing_table(CLUSTER_STATE, aliases={'all': 'places,everything',
+                                                                    'everything': 'roads,all'})
+        self.assertEqual(routes['all'].hosts, ('http://a:8983/solr', 'http://b:8983/solr', 'http://c:8983/solr'))
+        self.assertEqual(len(routes['all'].shards), 3)
+
+    def test_alias_cycle_order(self):
+        """Aliases in a cycle resolve to the same routes whatever the order of the aliases."""
+        aliases = [('all', 'places,everything'), ('everything', 'roads,all'), ('more', 'everything')]
+
+        forward = pysolr.build_routing_table(CLUSTER_STATE, aliases=dict(aliases))
+        backward = pysolr.build_routing_table(CLUSTER_STATE, aliases=dict(reversed(aliases)))
+
+        for tAlias, _ in aliases:
+            self.assertEqual(forward[tAlias], backward[tAlias])
+        self.assertEqual(set(forward['everything'].hosts),
+                         {'http://a:8983/solr', 'http://b:8983/solr', 'http://c:8983/solr'})
+        self.assertEqual(len(forward['everything'].shards), 3)
+
+    def test_read_only(self):
+        """The table cannot be changed behind the watchers' back."""
+        routes = pysolr.build_routing_table(CLUSTER_STATE)
+        with self.assertRaises(TypeError):
+            routes['places'] = None
+
+
+class FakeZooKeeper(object):
+    """ZooKeeper stand-in serving a fixed routing table."""
+
+    def __init__(self, collections):
+        self.routes = pysolr.build_routing_table(collections)
+
+    def getRoute(self, collname):
+        return self.routes[collname]
+
+    def getHosts(self, collname, only_leader=False):
+        route = self.routes[collname]
+        return route.leaders if only_leader else route.hosts
+
+    def getRandomURL(self, collname, only_leader=False):
+        return '%s/%s' % (self.getHosts(collname, only_leader)[0], collname)
+
+
+def fake_shard_request(self, method, path='', body=None, headers=None, files=None, base_url=None):
+    """Serves two pages of two docs per shard core, keyed by cursorMark."""
+    params = parse_qs(path.split('?', 1)[1])
+    assert params['distrib'] == ['false']
+    cursor = params['cursorMark'][0]
+    core = base_url.rsplit('/', 1)[1]
+    if cursor == '*':
+        docs, next_cursor = [{'id': core + '-1'}, {'id': core + '-2'}], 'page2'
+    elif cursor == 'page2':
+        docs, next_cursor = [{'id': core + '-3'}, {'id': core + '-4'}], 'end'
+    else:
+        docs, next_cursor = [], 'end'
+    return json.dumps({'response': {'docs': docs, 'numFound': 4}, 'nextCursorMark': next_cursor})
+
+
+class ShardSearchTest(unittest.TestCase):
+    """Test distrib=false fan-out over the shards of a collection."""
+
+    def test_search_shards(self):
+        """Every doc of every active shard is returned exactly once."""
+        solr = pysolr.SolrCloud(FakeZooKeeper(CLUSTER_STATE), 'places')
+        with mock.patch.object(pysolr._ShardReplicas, '_send_single_request', fake_shard_request):
+            ids = [doc['id'] for page in solr.search_shards('*:*', sort='id asc', rows=2) for doc in page]
+
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(len(set(ids)), 8)
+
+    def test_shared_session(self):
+        """Shards are searched through the session of the collection with its auth and TLS settings."""
+        session = mock.Mock()
+        solr = pysolr.SolrCloud(FakeZooKeeper(CLUSTER_STATE), 'places', auth=('user', 'secret'), verify=False,
+                                session=session)
+        clients = []
+
+        def record_request(self, *args, **kwargs):
+            clients.append(self)
+            return fake_shard_request(self, *args, **kwargs)
+
+        with mock.patch.object(pysolr._ShardReplicas, '_send_single_request', record_request):
+            list(solr.search_shards('*:*', sort='id asc', rows=2))
+
+        self.assertTrue(clients)
+        for client in clients:
+            self.assertIs(client.get_session(), session)
+            self.assertEqual((client.auth, client.verify), (('user', 'secret'), False))
+            client.close()
+        self.assertIs(clients[0].session, session)
+
+    def test_early_close(self):
+        """Abandoning the generator stops the shard workers."""
+        solr = pysolr.SolrCloud(FakeZooKeeper(CLUSTER_STATE), 'places')
+        with mock.patch.object(pysolr._ShardReplicas, '_send_single_request', fake_shard_request):
+            pages = solr.search_shards('*:*', sort='id asc', rows=2, max_pages=1)
+            self.assertEqual(len(next(pages)), 2)
+            pages.close()
+
+
+class RecordingSolr(pysolr.Solr):
+    """Solr that records update requests instead of sending them."""
+
+    def __init__(self, **kwargs):
+        super(RecordingSolr, self).__init__('http://localhost:8983/solr/core', **kwargs)
+        self.requests = []
+
+    def _send_request(self, method, path='', body=None, headers=None, files=None):
+        if not isinstance(body, str):
+            body = b''.join(body).decode('utf-8')
+        self.requests.append((path, body, headers))
+        return '{}'
+
+
+class JSONUpdateTest(unittest.TestCase):
+    """Test the JSON update path of Solr.add."""
+
+    def test_json_documents(self):
+        """Values keep their JSON types and atomic updates become operation maps."""
+        solr = RecordingSolr()
+        solr.add([{'id': 'a', 'count': 3, 'flag': True, 'tags': ['x', None, ''], 'title': 'new', 'empty': None}],
+                 fieldUpdates={'title': 'set'}, solrapi='JSON', commitWithin=5000)
+
+        path, body, headers = solr.requests[0]
+        self.assertEqual(json.loads(body), [{'id': 'a', 'count': 3, 'flag': True, 'tags': ['x'],
+                                             'title': {'set': 'new'}}])
+        self.assertIn('commitWithin=5000', path)
+        self.assertTrue(headers['Content-type'].startswith('application/json'))
+
+    def test_atomic_null_and_empty(self):
+        """Atomic updates to null or to an empty string are sent, other empty values are left out."""
+        solr = RecordingSolr()
+        solr.add([{'id': 'a', 'title': '', 'note': None, 'other': ''}], fieldUpdates={'title': 'set', 'note': 'set'},
+                 solrapi='JSON')
+
+        self.assertEqual(json.loads(solr.requests[0][1]), [{'id': 'a', 'title': {'set': ''}, 'note': {'set': None}}])
+
+    def test_control_characters_escaped(self):
+        """Control characters survive as JSON escapes instead of being stripped."""
+        solr = RecordingSolr()
+        solr.add([{'id': 'a', 'text': 'bell\x07'}], solrapi='JSON')
+        self.assertEqual(json.loads(solr.requests[0][1])[0]['text'], 'bell\x07')
+
+    def test_batches(self):
+        """Batches are sent in parallel and committed once at the end."""
+        solr = RecordingSolr()
+        docs = ({'id': str(i)} for i in range(25))
+        responses = solr.add(docs, solrapi='JSON', batch_size=10, max_workers=3, commit=True)
+
+        self.assertEqual(len(responses), 3)
+        updates = [body for path, body, headers in solr.requests if body != '<commit />']
+        self.assertEqual(sorted(len(json.loads(body)) for body in updates), [5, 10, 10])
+        self.assertEqual(solr.requests[-1][1], '<commit />')
+        self.assertTrue(all('commit=true' not in path for path, body, headers in solr.requests[:-1]))
+
+    def test_json_rejects_boost(self):
+        """Index-time boosts are only available through XML."""
+        self.assertRaises(ValueError, RecordingSolr().add, [{'id': 'a'}], boost={'id': 2}, solrapi='JSON')
+
+
+def reference_sanitize(data):
+    """The original one-pass-per-character sanitize."""
+    fixed_string = pysolr.force_bytes(data)
+    for bad, good in pysolr.REPLACEMENTS:
+        fixed_string = fixed_string.replace(bad, good)
+    return pysolr.force_unicode(fixed_string)
+
+
+def reference_clean_xml_string(s):
+    """The original character-by-character clean_xml_string."""
+    return ''.join(c for c in s if pysolr.is_valid_xml_char_ordinal(ord(c)))
+
+
+# Characters around every boundary of the XML Char production, plus surrogates
+# and non-BMP characters that need special care in UTF-8.
+INTERESTING_CHARS = ([chr(i) for i in range(0x30)] +
+                     ['a', '<', '&', '\x7f', '\x80', '\xe9', '\u20ac', '\ud7ff', '\ud800', '\udc00', '\udfff',
+                      '\ue000', '\ufffd', '\ufffe', '\uffff', '\U00010000', '\U0001f600', '\U0010ffff'])
+
+
+def random_strings(count=500, seed=1234):
+    generator = random.Random(seed)
+    for _ in range(count):
+        length = generator.randint(0, 64)
+        yield ''.join(generator.choice(INTERESTING_CHARS) for _ in range(length))
+
+
+class CleaningPropertyTest(unittest.TestCase):
+    """Property test the fast sanitize/clean_xml_string against the original implementations."""
+
+    def test_sanitize_matches_reference(self):
+        """sanitize gives the same output for str and bytes input."""
+        for text in random_strings():
+            self.assertEqual(pysolr.sanitize(text), reference_sanitize(text))
+            data = text.encode('utf-8', 'surrogatepass')
+            self.assertEqual(pysolr.sanitize(data), reference_sanitize(data))
+
+    def test_clean_xml_string_matches_reference(self):
+        """clean_xml_string drops exactly the characters outside the XML Char production."""
+        for text in random_strings():
+            self.assertEqual(pysolr.clean_xml_string(text), reference_clean_xml_string(text))
+
+    def test_every_bmp_char(self):
+        """Every BMP code point is classified like is_valid_xml_char_ordinal does."""
+        text = ''.join(chr(i) for i in range(0x10000))
+        self.assertEqual(pysolr.clean_xml_string(text), reference_clean_xml_string(text))
+
+
+class CompactResultsTest(unittest.TestCase):
+    """Test the slot based results class."""
+
+    def setUp(self):
+        self.decoded = {
+            'responseHeader': {'QTime': 7},
+            'response': {'numFound': 10, 'docs': [{'id': 1}, {'id': 2}, {'id': 3}]},
+            'highlighting': {'1': {'name': ['<em>Rome</em>']}},
+            'nextCursorMark': 'AoE=',
+        }
+
+    def test_matches_results(self):
+        """The compact class exposes the same values as Results."""
+        results = pysolr.Results(self.decoded)
+        compact = pysolr.CompactResults(self.decoded)
+        for name in ('docs', 'hits', 'qtime', 'nextCursorMark', 'debug', 'highlighting', 'facets', 'spellcheck',
+                     'stats', 'grouped', 'raw_response'):
+            self.assertEqual(getattr(compact, name), getattr(results, name), name)
+        self.assertEqual(list(compact), list(results))
+        self.assertFalse(hasattr(compact, '__dict__'))
+
+    def test_docs_are_not_copied(self):
+        """docs is the decoded list itself."""
+        self.assertIs(pysolr.CompactResults(self.decoded).docs, self.decoded['response']['docs'])
+
+    def test_drop_raw_response(self):
+        """Without the raw response the metadata is still available."""
+        compact = pysolr.CompactResults(self.decoded, keep_raw=False)
+        self.assertIsNone(compact.raw_response)
+        self.assertNotIn('response', compact._response)
+        self.assertEqual(compact.highlighting, self.decoded['highlighting'])
+
+    def test_release_docs(self):
+        """Documents are dropped from the page as they are read."""
+        compact = pysolr.CompactResults(self.decoded, release_docs=True)
+        iterator = iter(compact)
+        self.assertEqual(next(iterator), {'id': 1})
+        self.assertEqual(len(compact), 2)
+        self.assertEqual(list(iterator), [{'id': 2}, {'id': 3}])
+        self.assertEqual(len(compact), 0)
+
+    def test_abandoned_release_keeps_order(self):
+        """Stopping early leaves the unread documents in order."""
+        compact = pysolr.CompactResults(self.decoded, release_docs=True)
+        iterator = iter(compact)
+        next(iterator)
+        iterator.close()
+        self.assertEqual(compact.docs, [{'id': 2}, {'id': 3}])
+
+
+def reference_pair_terms(values):
+    """The original pop(0) pairing of suggest_terms."""
+    values = list(values)
+    pairs = list()
+    while values:
+        pairs.append((values.pop(0), values.pop(0)))
+    return pairs
+
+
+class TermsSolr(pysolr.Solr):
+    """Solr serving the terms component from a sorted list of terms."""
+
+    def __init__(self, terms, **kwargs):
+        super(TermsSolr, self).__init__('http://localhost:8983/solr/core', **kwargs)
+        self.terms = terms
+        self.requests = list()
+
+    def _suggest_terms(self, params, handler='terms'):
+        self.requests.append(dict(params))
+        terms = [term for term in self.terms if term.startswith(params['terms.prefix'])]
+        if 'terms.lower' in params:
+            terms = [term for term in terms if term > params['terms.lower']]
+        flat = list()
+        for term in terms[:int(params['terms.limit'])]:
+            flat.extend([term, len(term)])
+        return json.dumps({'terms': {params['terms.fl']: flat}})
+
+
+class SuggestTermsTest(unittest.TestCase):
+    """Test pairing and streaming the terms component."""
+
+    def setUp(self):
+        self.terms = sorted('t%05d' % i for i in range(2500))
+        self.solr = TermsSolr(self.terms)
+
+    def test_pairing_matches_reference(self):
+        """Terms are paired like the original implementation did."""
+        flat = ['rome', 9, 'roman', 4, 'romania', 2]
+        self.assertEqual(list(pysolr._pair_terms(flat)), reference_pair_terms(flat))
+        self.assertEqual(list(pysolr._pair_terms([])), [])
+
+    def test_suggest_terms(self):
+        """suggest_terms returns pairs per field."""
+        result = self.solr.suggest_terms('_text_', 't0001', **{'terms.limit': 3})
+        self.assertEqual(result, {'_text_': [('t00010', 6), ('t00011', 6), ('t00012', 6)]})
+
+    def test_iter_suggest_terms_pages(self):
+        """Every term is streamed once, page by page."""
+        streamed = list(self.solr.iter_suggest_terms('_text_', 't', page_size=1000))
+        self.assertEqual([term for term, _ in streamed], self.terms)
+        self.assertEqual(len(self.solr.requests), 3)
+        self.assertEqual(self.solr.requests[1]['terms.lower'], 't00999')
+        self.assertEqual(self.solr.requests[1]['terms.lower.incl'], 'false')
+
+    def test_iter_suggest_terms_exact_page(self):
+        """A full last page is followed by one empty request."""
+        streamed = list(self.solr.iter_suggest_terms('_text_', 't0', page_size=500))
+        self.assertEqual(len(streamed), 2500)
+        self.assertEqual(len(self.solr.requests), 6)
+
+
+SCHEMA = {
+    'fieldTypes': [
+        {'name': 'string', 'class': 'solr.StrField'},
+        {'name': 'strings', 'class': 'solr.StrField', 'multiValued': True},
+        {'name': 'plong', 'class': 'solr.LongPointField'},
+        {'name': 'pdouble', 'class': 'solr.DoublePointField'},
+        {'name': 'pdate', 'class': 'solr.DatePointField'},
+        {'name': 'boolean', 'class': 'solr.BoolField'},
+    ],
+    'fields': [
+        {'name': 'system_id', 'type': 'string'},
+        {'name': 'population', 'type': 'plong'},
+        {'name': 'elevation', 'type': 'pdouble'},
+        {'name': 'updated', 'type': 'pdate'},
+        {'name': 'active', 'type': 'boolean'},
+        {'name': 'aliases', 'type': 'strings'},
+    ],
+    'dynamicFields': [
+        {'name': '*_d', 'type': 'pdouble'},
+        {'name': '*_dt', 'type': 'pdate'},
+        {'name': 'attr_*', 'type': 'string', 'multiValued': True},
+    ],
+}
+
+
+class SchemaDecoderTest(unittest.TestCase):
+    """Test the schema driven document decoding."""
+
+    def setUp(self):
+        self.decoder = pysolr.SchemaDecoder(SCHEMA)
+
+    def test_string_fields_are_untouched(self):
+        """Strings that look like numbers or lists stay strings."""
+        doc = self.decoder.decode({'system_id': '00123', 'aliases': ['[1, 2]', 'true']})
+        self.assertEqual(doc, {'system_id': '00123', 'aliases': ['[1, 2]', 'true']})
+
+    def test_typed_fields(self):
+        """Numbers, booleans and dates are converted by their field type."""
+        doc = self.decoder.decode({'population': '2873000', 'elevation': 21, 'active': 'true',
+                                   'updated': '2018-04-02T10:20:30Z'})
+        self.assertEqual(doc['population'], 2873000)
+        self.assertIsInstance(doc['elevation'], float)
+        self.assertIs(doc['active'], True)
+        self.assertEqual(doc['updated'], datetime.datetime(2018, 4, 2, 10, 20, 30))
+
+    def test_dynamic_fields(self):
+        """Dynamic fields resolve to the longest matching pattern."""
+        self.assertEqual(self.decoder.get_field_info('height_d'), (pysolr.SchemaDecoder.FLOAT, False))
+        self.assertEqual(self.decoder.get_field_info('seen_dt'), (pysolr.SchemaDecoder.DATETIME, False))
+        self.assertEqual(self.decoder.get_field_info('attr_color'), (pysolr.SchemaDecoder.STRING, True))
+        self.assertEqual(self.decoder.get_field_info('unknown'), (pysolr.SchemaDecoder.STRING, False))
+
+    def test_multi_valued_and_bad_values(self):
+        """Each value of a multi-valued field is converted and unparseable values are kept."""
+        decoder = pysolr.SchemaDecoder({'fields': [{'name': 'sizes', 'type': 'plong', 'multiValued': True}],
+                                        'fieldTypes': SCHEMA['fieldTypes']})
+        self.assertEqual(decoder.decode({'sizes': ['1', '2', 'n/a']}), {'sizes': [1, 2, 'n/a']})
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(RetryPolicyTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,88 @@
+# coding=utf-8
+"""Tests for building Solr queries from user input.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import unittest
+
+from managers.QueryBuilder import QueryBuilder, QueryError, QueryPlan
+
+
+class QueryBuilderTest(unittest.TestCase):
+    """Test the query builder."""
+
+    def setUp(self):
+        self.builder = QueryBuilder(inMaxTerms=4)
+
+    def test_terms_are_anded(self):
+        """Every word should be required, including a repeat of the last one."""
+        self.assertEqual(self.builder.Build("big red big").q, "_text_:big AND _text_:red")
+        self.assertEqual(self.builder.Build("red big big").q, "_text_:red AND _text_:big")
+
+    def test_escaping(self):
+        """Special characters should not reach the query parser."""
+        self.assertEqual(self.builder.Build("a:b (c) -d").q, "_text_:a\\:b AND _text_:\\(c\\) AND _text_:\\-d")
+        self.assertEqual(self.builder.Build("cats AND dogs").q, '_text_:cats AND _text_:"AND" AND _text_:dogs')
+
+    def test_phrases(self):
+        """Quoted text should be searched as a phrase."""
+        self.assertEqual(self.builder.Build('"new   york" city').q, '_text_:"new york" AND _text_:city')
+
+    def test_wildcards(self):
+        """Leading wildcards and wildcards after short prefixes should be dropped."""
+        self.assertEqual(self.builder.Build("*port").q, "_text_:port")
+        self.assertEqual(self.builder.Build("harb*").q, "_text_:harb*")
+        self.assertEqual(self.builder.Build("ha*").q, "_text_:ha")
+        self.assertRaises(QueryError, self.builder.Build, "* ?")
+
+    def test_too_many_terms(self):
+        """Queries with too many terms should be rejected."""
+        self.assertRaises(QueryError, self.builder.Build, "a b c d e")
+
+    def test_plan(self):
+        """Plans should be hashable and turn into search parameters."""
+        plan = self.builder.Build("port", ["_cc3:FRA"], ["id", "the_geom"], "id asc")
+        self.assertEqual(plan, QueryPlan("_text_:port", ("_cc3:FRA",), "id,the_geom", "id asc", ()))
+        self.assertEqual(len({plan, self.builder.Build("port", ("_cc3:FRA",), ("id", "the_geom"), "id asc")}), 1)
+        self.assertEqual(plan.GetParameters(), {"q": "_text_:port", "fq": ["_cc3:FRA"], "fl": "id,the_geom",
+                                                "sort": "id asc"})
+        self.assertEqual(self.builder.Build("port").GetParameters(), {"q": "_text_:port", "fq": []})
+
+    def test_plan_json(self):
+        """Plans should come back equal from their JSON."""
+        plan = self.builder.Build('port "new york"', ["_cc3:USA"], inParser="edismax",
+                                  inParserParameters={"qf": "name^3", "mm": "100%"})
+        self.assertEqual(QueryPlan.FromJSON(plan.ToJSON()), plan)
+
+    def test_edismax(self):
+        """Edismax should get the escaped text once, requiring every term unless configured otherwise."""
+        plan = self.builder.Build("big a:b big", inParser="edismax")
+        self.assertEqual(plan.GetParameters(), {"q": "big a\\:b", "fq": [], "defType": "edismax", "qf": "_text_",
+                                                "mm": "100%"})
+
+        plan = self.builder.Build("port", inParser="edismax", inParserParameters={"qf": "name^3 _text_", "mm": "2",
+                                                                                  "pf": "name^5"})
+        self.assertEqual(plan.params, (("defType", "edismax"), ("mm", "2"), ("pf", "name^5"),
+                                       ("qf", "name^3 _text_")))
+        self.assertEqual(hash(plan), hash(self.builder.Build("port", inParser="edismax",
+                                                             inParserParameters={"pf": "name^5", "mm": "2",
+                                                                                 "qf": "name^3 _text_"})))
+
+    def test_unknown_parser(self):
+        """Unknown query parsers should be rejected."""
+        self.assertRaises(QueryError, self.builder.Build, "port", inParser="lucene")
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(QueryBuilderTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,152 @@
+# coding=utf-8
+"""Tests for paging through search results.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import importlib
+import os
+import sys
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from managers import pysolr
+from managers.QueryManager import QueryManager
+
+
+class PagedSolr(pysolr.Solr):
+    """Answers cursor searches from a list of numbered documents, slowly, and records what was asked for."""
+
+    def __init__(self, inCount):
+        super(PagedSolr, self).__init__('http://localhost:8983/solr/places')
+        self.docs = [{'id': str(tIndex)} for tIndex in range(inCount)]
+        self.lock = threading.Lock()
+        self.searches = list()
+
+    def get_unique_key(self):
+        return 'id'
+
+    def search(self, q, search_handler=None, **kwargs):
+        with self.lock:
+            self.searches.append(kwargs)
+        time.sleep(0.01)
+
+        # The cursor mark is the offset of the next document
+        start = 0 if kwargs['cursorMark'] == '*' else int(kwargs['cursorMark'])
+        docs = self.docs[start:start + kwargs['rows']]
+        return pysolr.Results({'response': {'numFound': len(self.docs), 'docs': docs},
+                               'nextCursorMark': str(start + len(docs))})
+
+
+class QueryManagerTest(unittest.TestCase):
+    """Test the query manager."""
+
+    def setUp(self):
+        self.manager = QueryManager('http://localhost:8983/solr', None, ['places'],
+                                    inTableSettings={'places': {'rows': 10, 'max_connections': 3}})
+        self.solr = PagedSolr(95)
+        self.manager.mySOLR['places'] = self.solr
+
+    def test_pages_in_order(self):
+        """Every document is returned once, in order."""
+        ids = [tDoc['id'] for tPage in self.manager.GetPages('harbor', 'places', 8) for tDoc in tPage]
+        self.assertEqual(ids, [str(tIndex) for tIndex in range(95)])
+
+    def test_cursor(self):
+        """Pages are read with a cursor sorted on the unique key, never with start offsets."""
+        list(self.manager.GetPages('harbor', 'places', 8))
+
+        self.assertEqual([tSearch['cursorMark'] for tSearch in self.solr.searches],
+                         ['*', '10', '20', '30', '40', '50', '60', '70', '80', '90', '95'])
+        self.assertTrue(all(tSearch['sort'] == 'id asc' and 'start' not in tSearch
+                            for tSearch in self.solr.searches))
+
+    def test_cursor_sort(self):
+        """The sort of a plan is kept, with the unique key added when it is missing."""
+        plan = self.manager.CreatePlan('harbor', inTable='places')
+
+        list(self.manager.GetPages(plan._replace(sort='name desc'), 'places'))
+        list(self.manager.GetPages(plan._replace(sort='id desc'), 'places'))
+
+        self.assertEqual(self.solr.searches[0]['sort'], 'name desc,id asc')
+        self.assertEqual(self.solr.searches[-1]['sort'], 'id desc')
+
+    def test_fetch_ahead(self):
+        """The next pages are fetched while a page is read, but no more than the table allows."""
+        pages = self.manager.GetPages('harbor', 'places', 8)
+        next(pages)
+        time.sleep(0.2)
+
+        # The page being read, three waiting and one waiting to be put
+        self.assertEqual(len(self.solr.searches), 5)
+        pages.close()
+
+    def test_stopping_early(self):
+        """Closing the pages stops fetching beyond the pages already requested."""
+        pages = self.manager.GetPages('harbor', 'places', 2)
+        next(pages)
+        next(pages)
+        pages.close()
+        time.sleep(0.2)
+
+        self.assertLessEqual(len(self.solr.searches), 5)
+
+    def test_close(self):
+        """Closing stops the ZooKeeper client and closes the connections."""
+        zooKeeper = mock.Mock()
+        self.manager.zooKeeper = zooKeeper
+        self.manager.connectionPool = mock.Mock()
+
+        self.manager.Close()
+
+        zooKeeper.close.assert_called_once_with()
+        self.manager.connectionPool.Close.assert_called_once_with()
+        self.assertIsNone(self.manager.zooKeeper)
+
+    def test_bounds_filter(self):
+        """Bounds become a filter on the geometry."""
+        plan = self.manager.CreatePlan('harbor', inTable='places', inBounds=(-10.0, 40.0, 5.0, 50.0))
+        self.assertEqual(plan.fq, ('the_geom:[40.0,-10.0 TO 50.0,5.0]',))
+
+    def test_country_filter(self):
+        """A country only filters on _cc3, so a document just outside the box of the country is still found."""
+        plan = self.manager.CreatePlan('harbor', 'ITA', inTable='places')
+        self.assertEqual(plan.fq, ('_cc3:ITA',))
+
+    def test_country_bbox_filter(self):
+        """With cc3_bbox the box is combined with _cc3 and documents without a geometry are kept."""
+        # The boxes come from the iso3166 package of the plugin, so the manager is loaded as part of it
+        pluginDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        sys.path.insert(0, os.path.dirname(pluginDir))
+        try:
+            module = importlib.import_module(os.path.basename(pluginDir) + '.managers.QueryManager')
+        finally:
+            sys.path.remove(os.path.dirname(pluginDir))
+
+        manager = module.QueryManager('http://localhost:8983/solr', None, ['places'],
+                                      inTableSettings={'places': {'cc3_bbox': True}})
+        plan = manager.CreatePlan('harbor', 'ITA', inTable='places')
+
+        self.assertEqual(len(plan.fq), 1)
+        self.assertTrue(plan.fq[0].startswith('_cc3:ITA AND (the_geom:['))
+        self.assertTrue(plan.fq[0].endswith(' OR (*:* -the_geom:[* TO *]))'))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(QueryManagerTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,275 @@
+# coding=utf-8
+"""Tests for refreshing loaded layers.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import unittest
+
+from managers import pysolr
+from managers.ColumnarPage import ColumnarPage
+from managers.QueryBuilder import QueryPlan
+from managers.RefreshManager import PROPERTY_LATEST, RefreshManager
+
+FIELDS = ['system_id', 'name', 'last_modified']
+
+
+class Feature(object):
+    def __init__(self, inAttributes, inId=None):
+        self.values = list(inAttributes)
+        self.fid = inId
+
+    def attributes(self):
+        return self.values
+
+    def geometry(self):
+        return 'geometry'
+
+    def id(self):
+        return self.fid
+
+
+class Fields(object):
+    def names(self):
+        return FIELDS
+
+    def indexOf(self, inName):
+        return FIELDS.index(inName) if inName in FIELDS else -1
+
+
+class Signal(object):
+    def connect(self, inSlot):
+        pass
+
+
+class Provider(object):
+    """Keeps features in a dictionary like the memory provider."""
+
+    def __init__(self):
+        self.features = dict()
+        self.nextId = 1
+        self.changedIds = list()
+
+    def addFeatures(self, inFeatures):
+        added = list()
+        for tFeature in inFeatures:
+            self.features[self.nextId] = list(tFeature.attributes())
+            added.append(Feature(tFeature.attributes(), self.nextId))
+            self.nextId += 1
+        return True, added
+
+    def changeAttributeValues(self, inChanges):
+        for tId, tValues in inChanges.items():
+            self.changedIds.append(tId)
+            for tIndex, tValue in tValues.items():
+                self.features[tId][tIndex] = tValue
+
+    def changeGeometryValues(self, inChanges):
+        pass
+
+    def deleteFeatures(self, inIds):
+        for tId in inIds:
+            del self.features[tId]
+
+
+class Layer(object):
+    def __init__(self):
+        self.properties = dict()
+        self.provider = Provider()
+        self.willBeDeleted = Signal()
+
+    def id(self):
+        return 'layer1'
+
+    def name(self):
+        return 'places_port'
+
+    def fields(self):
+        return Fields()
+
+    def setCustomProperty(self, inKey, inValue):
+        self.properties[inKey] = inValue
+
+    def customProperty(self, inKey):
+        return self.properties.get(inKey)
+
+    def removeCustomProperty(self, inKey):
+        self.properties.pop(inKey, None)
+
+    def isEditable(self):
+        return False
+
+    def dataProvider(self):
+        return self.provider
+
+    def updateExtents(self):
+        pass
+
+    def triggerRepaint(self):
+        pass
+
+    def GetNames(self):
+        return dict((tValues[0], tValues[1]) for tValues in self.provider.features.values())
+
+
+def FilterDocs(inDocs, inFilterQueries):
+    """Apply the timestamp ranges of the filter queries, whose bounds are quoted or *."""
+    docs = inDocs
+    for tFilter in inFilterQueries:
+        if tFilter.startswith('last_modified:'):
+            bounds = tFilter.split('"')
+            docs = [tDoc for tDoc in docs if tDoc['last_modified'] >= bounds[1]]
+            if len(bounds) > 3:
+                docs = [tDoc for tDoc in docs if tDoc['last_modified'] <= bounds[3]]
+    return docs
+
+
+class Solr(object):
+    def __init__(self, inDocs):
+        self.docs = inDocs
+
+    def search(self, q, fq=(), fl='', sort='', rows=10):
+        docs = sorted(FilterDocs(self.docs, fq), key=lambda inDoc: inDoc['last_modified'], reverse=True)[:rows]
+        return pysolr.Results({'response': {'numFound': len(docs), 'docs': docs}})
+
+
+class QueryManager(object):
+    """Answers searches from a list of documents, applying only the timestamp filter. A function may change the
+    documents after each search."""
+
+    def __init__(self, inDocs):
+        self.docs = inDocs
+        self.plans = list()
+        self.afterSearch = None
+
+    def GetSolr(self, inTable):
+        return Solr(self.docs)
+
+    def GetPages(self, inPlan, inTable):
+        self.plans.append(inPlan)
+        docs = FilterDocs(self.docs, inPlan.fq)
+        if inPlan.q != '*:*':
+            docs = [tDoc for tDoc in docs if tDoc.get('name', '').startswith('port')]
+        fields = inPlan.fl.split(',') if inPlan.fl else None
+        docs = [dict((tKey, tValue) for tKey, tValue in tDoc.items() if fields is None or tKey in fields)
+                for tDoc in docs]
+        yield ColumnarPage(pysolr.Results({'response': {'numFound': len(docs), 'docs': docs}}))
+        if self.afterSearch is not None:
+            self.afterSearch(len(self.plans))
+
+
+class TableManager(object):
+    def GetFieldDecoder(self, inTable):
+        return None
+
+
+def CreateFeatures(inLayer, inPage):
+    return [Feature(tAttributes) for tAttributes in inPage.GetAttributes(FIELDS)]
+
+
+class RefreshManagerTest(unittest.TestCase):
+    """Test refreshing a layer with what changed."""
+
+    def setUp(self):
+        self.docs = [
+            {'system_id': 'a', 'name': 'port a', 'last_modified': '2024-01-01T00:00:00Z'},
+            {'system_id': 'b', 'name': 'port b', 'last_modified': '2024-01-02T00:00:00Z'},
+            {'system_id': 'c', 'name': 'port c', 'last_modified': '2024-01-03T00:00:00.5Z'},
+        ]
+        self.queryManager = QueryManager(self.docs)
+        self.manager = RefreshManager(self.queryManager, TableManager(),
+                                      {'places': {'timestamp_field': 'last_modified'}, 'roads': {}})
+        self.plan = QueryPlan('name:port*', ('_cc3:FRA',), '', '', ())
+
+        # Load the layer like the plugin does
+        self.layer = Layer()
+        self.manager.TrackLayer(self.layer, 'places', self.plan)
+        for tPage in self.queryManager.GetPages(self.plan, 'places'):
+            _, features = self.layer.provider.addFeatures(CreateFeatures(self.layer, tPage.Decode()))
+            self.manager.AddPage(self.layer, tPage, features)
+
+    def test_refreshable(self):
+        """Only tables with a timestamp field can be refreshed."""
+        self.assertTrue(self.manager.IsRefreshable('places'))
+        self.assertFalse(self.manager.IsRefreshable('roads'))
+        self.assertFalse(self.manager.IsRefreshable('rivers'))
+
+    def test_latest(self):
+        """The latest timestamp is kept, fractions of a second included."""
+        self.assertEqual(self.layer.customProperty(PROPERTY_LATEST), '2024-01-03T00:00:00.5Z')
+
+    def test_upsert_and_remove(self):
+        """Changed documents are updated or added and those that no longer match are removed."""
+        self.docs[0]['name'] = 'port a2'
+        self.docs[0]['last_modified'] = '2024-02-01T00:00:00Z'
+        self.docs[1]['name'] = 'harbor b'
+        self.docs[1]['last_modified'] = '2024-02-02T00:00:00Z'
+        self.docs.append({'system_id': 'd', 'name': 'port d', 'last_modified': '2024-02-03T00:00:00Z'})
+
+        self.assertEqual(self.manager.Refresh(self.layer, CreateFeatures), (1, 2, 1))
+        self.assertEqual(self.layer.GetNames(), {'a': 'port a2', 'c': 'port c', 'd': 'port d'})
+        self.assertEqual(self.layer.customProperty(PROPERTY_LATEST), '2024-02-03T00:00:00Z')
+
+        # The filters of the plan are kept and only what changed is asked for
+        self.assertEqual(self.queryManager.plans[-2].fq, ('_cc3:FRA', 'last_modified:["2024-01-03T00:00:00.5Z" TO '
+                                                                      '"2024-02-03T00:00:00Z"]'))
+        self.assertEqual(self.queryManager.plans[-1].fl, 'system_id,last_modified')
+
+    def test_nothing_changed(self):
+        """Only the documents at the latest timestamp are fetched again."""
+        self.assertEqual(self.manager.Refresh(self.layer, CreateFeatures), (0, 1, 0))
+        self.assertEqual(self.layer.provider.changedIds, [3])
+
+    def test_change_during_refresh(self):
+        """A document changed between the two searches is left to the next refresh instead of being lost."""
+        def AfterSearch(inSearches):
+            if inSearches == 2:
+                self.docs.append({'system_id': 'd', 'name': 'port d', 'last_modified': '2024-02-05T00:00:00Z'})
+                self.docs[0]['name'] = 'port a2'
+                self.docs[0]['last_modified'] = '2024-02-05T00:00:00Z'
+
+        self.docs[0]['name'] = 'harbor a'
+        self.docs[0]['last_modified'] = '2024-02-01T00:00:00Z'
+        self.queryManager.afterSearch = AfterSearch
+
+        # a left the plan before the first search and came back before the second one, so it is kept. Only c, at
+        # the latest timestamp, is fetched again.
+        self.assertEqual(self.manager.Refresh(self.layer, CreateFeatures), (0, 1, 0))
+        self.assertEqual(self.layer.customProperty(PROPERTY_LATEST), '2024-02-01T00:00:00Z')
+        self.assertIn('a', self.layer.GetNames())
+
+        self.queryManager.afterSearch = None
+        self.assertEqual(self.manager.Refresh(self.layer, CreateFeatures), (1, 1, 0))
+        self.assertEqual(self.layer.GetNames(), {'a': 'port a2', 'b': 'port b', 'c': 'port c', 'd': 'port d'})
+
+    def test_index_rebuilt(self):
+        """A manager that did not load the layer reads its index from the layer."""
+        self.manager.indexes.clear()
+        self.layer.getFeatures = lambda inRequest: [Feature(tValues, tId) for tId, tValues in
+                                                   self.layer.provider.features.items()]
+
+        self.docs[2]['name'] = 'port c2'
+        self.docs[2]['last_modified'] = '2024-02-01T00:00:00Z'
+
+        self.assertEqual(self.manager.Refresh(self.layer, CreateFeatures), (0, 1, 0))
+        self.assertEqual(self.layer.GetNames()['c'], 'port c2')
+
+    def test_not_refreshable(self):
+        """Layers of tables without a timestamp field are refused."""
+        layer = Layer()
+        self.manager.TrackLayer(layer, 'roads', self.plan)
+        self.assertRaises(ValueError, self.manager.Refresh, layer, CreateFeatures)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(RefreshManagerTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
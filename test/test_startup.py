@@ -0,0 +1,48 @@
+# coding=utf-8
+"""Tests that loading the plugin defers its heavy imports.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import unittest
+
+from .utilities import DEFERRED_MODULES, DEFERRED_PLUGIN_MODULES, load_plugin_gui, measure_plugin_import
+
+
+class StartupTest(unittest.TestCase):
+    """Test the plugin module import at QGIS startup."""
+
+    def test_heavy_modules_are_deferred(self):
+        """Importing the plugin does not pull in pysolr, requests, osgeo or the dialogs."""
+        _, modules = measure_plugin_import()
+        loaded = set(modules)
+
+        for name in DEFERRED_MODULES:
+            self.assertFalse([module for module in loaded if module == name or module.startswith(name + '.')],
+                             '{} is imported at startup'.format(name))
+
+        for name in DEFERRED_PLUGIN_MODULES:
+            self.assertNotIn(name, loaded)
+
+    def test_no_warm_up(self):
+        """Without warm up, initGui and what it schedules do not pull in pysolr, requests or kazoo."""
+        # The config.ini shipped with the plugin does not warm up
+        loaded = set(load_plugin_gui())
+
+        for name in ('managers.pysolr', 'requests', 'kazoo'):
+            self.assertFalse([module for module in loaded if module == name or module.startswith(name + '.')],
+                             '{} is imported by initGui'.format(name))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(StartupTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,57 @@
+# coding=utf-8
+"""Tests for the prefix cache of query suggestions.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import unittest
+
+from managers.SuggestionCache import SuggestionCache
+
+
+class SuggestionCacheTest(unittest.TestCase):
+    """Test answering prefixes from earlier suggestions."""
+
+    def setUp(self):
+        self.cache = SuggestionCache(inLimit=3)
+
+    def test_miss_and_exact_hit(self):
+        """Unknown prefixes need Solr, stored ones do not."""
+        self.assertIsNone(self.cache.Lookup('rom'))
+        self.cache.Store('rom', [('rome', 9), ('roman', 4), ('romania', 2)])
+        self.assertEqual(self.cache.Lookup('ROM'), [('rome', 9), ('roman', 4), ('romania', 2)])
+
+    def test_longer_prefix_of_complete_list(self):
+        """A complete list answers every longer prefix."""
+        self.cache.Store('rom', [('rome', 9), ('roman', 4)])
+        self.assertEqual(self.cache.Lookup('roma'), [('roman', 4)])
+        self.assertEqual(self.cache.Lookup('romx'), [])
+        self.assertEqual(self.cache.misses, 0)
+
+    def test_longer_prefix_of_truncated_list(self):
+        """A list cut off at the limit cannot answer longer prefixes."""
+        self.cache.Store('rom', [('rome', 9), ('roman', 4), ('romania', 2)])
+        self.assertIsNone(self.cache.Lookup('romani'))
+
+    def test_cache_starts_over_when_full(self):
+        """The cache does not grow without bounds."""
+        cache = SuggestionCache(inLimit=3, inMaxEntries=2)
+        cache.Store('abc', [('abcd', 1)] * 3)
+        cache.Store('xyz', [('xyzw', 1)] * 3)
+        cache.Store('lmn', [('lmno', 1)] * 3)
+        self.assertEqual(cache.entries, 1)
+        self.assertIsNone(cache.Lookup('abc'))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(SuggestionCacheTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,135 @@
+# coding=utf-8
+"""Tests for autocompleting the query box.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from managers.SuggestionManager import SuggestionManager
+
+
+class LineEdit(object):
+    """Holds the text typed so far and the slot connected to textEdited."""
+
+    def __init__(self):
+        self.typed = ''
+        self.textEdited = mock.Mock()
+
+    def text(self):
+        return self.typed
+
+    def setCompleter(self, inCompleter):
+        pass
+
+    def hasFocus(self):
+        return True
+
+    def Type(self, inText):
+        self.typed = inText
+        self.textEdited.connect.call_args[0][0](inText)
+
+
+class SuggestionManagerTest(unittest.TestCase):
+    """Test when suggestions are fetched and where they come from."""
+
+    def setUp(self):
+        patched = dict()
+        for tName in ('QStringListModel', 'QCompleter', 'Qt', 'QTimer', 'QgsTask', 'QgsApplication'):
+            patcher = mock.patch('managers.SuggestionManager.{}'.format(tName))
+            patched[tName] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.fromFunction = patched['QgsTask'].fromFunction
+
+        self.lineEdit = LineEdit()
+        self.queryManager = mock.Mock()
+        self.manager = SuggestionManager(self.lineEdit, lambda: (self.queryManager, ['places']))
+        self.timer = self.manager.timer
+
+    def Pause(self):
+        """Let the timer fire as it does once typing pauses."""
+        self.timer.timeout.connect.call_args[0][0]()
+
+    def Finish(self, inResult, inException=None):
+        """Finish the running task like the task manager does in the main thread."""
+        self.fromFunction.call_args[1]['on_finished'](inException, inResult)
+
+    def test_debounce(self):
+        """Every keystroke restarts the timer and Solr is only asked once typing pauses."""
+        for tText in ('r', 'ro', 'rom', 'roma'):
+            self.lineEdit.Type(tText)
+
+        self.assertEqual(self.timer.start.call_count, 4)
+        self.assertFalse(self.fromFunction.called)
+
+        self.Pause()
+
+        self.assertEqual(self.fromFunction.call_count, 1)
+        self.assertEqual(self.fromFunction.call_args[0][2:], (self.queryManager, ['places'], 'roma'))
+
+    def test_short_prefix(self):
+        """Words shorter than the minimum length are not looked up."""
+        self.lineEdit.Type('paris ro')
+        self.Pause()
+
+        self.assertFalse(self.fromFunction.called)
+
+    def test_one_task_in_flight(self):
+        """Pauses while a task runs wait for it, and its complete terms answer the longer prefix."""
+        self.lineEdit.Type('rom')
+        self.Pause()
+        self.lineEdit.Type('roma')
+        self.Pause()
+
+        self.assertEqual(self.fromFunction.call_count, 1)
+        self.assertTrue(self.manager.suggestAgain)
+
+        self.Finish(([('rome', 9), ('roman', 4)], True))
+
+        self.assertEqual(self.fromFunction.call_count, 1)
+        self.assertFalse(self.manager.suggestAgain)
+        self.manager.model.setStringList.assert_called_with(['roman'])
+
+    def test_cache_applied(self):
+        """Fetched terms are shown after the leading words and answer the prefix again without Solr."""
+        self.lineEdit.Type('paris rom')
+        self.Pause()
+        self.Finish(([('rome', 9), ('roman', 4)], False))
+
+        self.manager.model.setStringList.assert_called_with(['paris rome', 'paris roman'])
+
+        self.lineEdit.Type('lyon rom')
+        self.Pause()
+
+        self.assertEqual(self.fromFunction.call_count, 1)
+        self.manager.model.setStringList.assert_called_with(['lyon rome', 'lyon roman'])
+
+    def test_failed_task(self):
+        """A failed task caches nothing, so the next pause asks Solr again."""
+        self.lineEdit.Type('rom')
+        self.Pause()
+        self.Finish(None, IOError('Connection refused'))
+
+        self.Pause()
+
+        self.assertEqual(self.fromFunction.call_count, 2)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(SuggestionManagerTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,66 @@
+# coding=utf-8
+"""Tests for the background warm up of the configured cores.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+__author__ = 'brian.maddox@gmail.com'
+__date__ = '2018-04-02'
+__copyright__ = 'Copyright 2018, Brian Maddox'
+
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from managers.WarmUpManager import WarmUpManager
+
+
+class WarmUpManagerTest(unittest.TestCase):
+    """Test checking single tables."""
+
+    def setUp(self):
+        self.tableManager = mock.Mock()
+        self.queryManager = mock.Mock()
+        self.manager = WarmUpManager(self.tableManager, self.queryManager)
+
+    def test_available_table(self):
+        """The schema is cached and the latency of the query is reported."""
+        available, latency, error = self.manager.CheckTable('places')
+
+        self.tableManager.GetTableSchema.assert_called_once_with('places')
+        self.queryManager.Ping.assert_called_once_with('places')
+        self.assertTrue(available)
+        self.assertGreaterEqual(latency, 0.0)
+        self.assertEqual(error, '')
+
+    def test_unavailable_table(self):
+        """Errors mark the table as unavailable instead of stopping the warm up."""
+        self.tableManager.GetTableSchema.side_effect = IOError('Connection refused')
+
+        self.assertEqual(self.manager.CheckTable('places'), (False, None, 'Connection refused'))
+        self.queryManager.Ping.assert_not_called()
+
+    def test_create_managers(self):
+        """Managers built by the task are kept and their tables are checked."""
+        self.tableManager.GetSOLRTables.return_value = {'places': 'Places', 'roads': 'Roads'}
+        manager = WarmUpManager(inCreateManagers=lambda: (self.tableManager, self.queryManager))
+
+        status = manager._WarmUpManager__WarmUp(None)
+
+        self.assertIs(manager.tableManager, self.tableManager)
+        self.assertIs(manager.queryManager, self.queryManager)
+        self.assertEqual(sorted(status), ['places', 'roads'])
+        self.assertTrue(all(tAvailable for tAvailable, _, _ in status.values()))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(WarmUpManagerTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -60,3 +60,88 @@ def get_qgis_app():
         IFACE = QgisInterface(CANVAS)
 
     return QGIS_APP, CANVAS, IFACE, PARENT
+
+
+# Modules the plugin should only import once it is used, not when QGIS loads it
+DEFERRED_MODULES = (
+    'configparser', 'osgeo', 'pkg_resources', 'requests', 'kazoo',
+)
+DEFERRED_PLUGIN_MODULES = (
+    'managers', 'managers.pysolr', 'iso3166', 'qgis_solr_dialog', 'ConfigurationDialog',
+)
+
+IMPORT_SNIPPET = """
+import importlib, json, sys, time
+# QGIS has these loaded before it loads any plugin
+import qgis.core, qgis.gui, qgis.PyQt.QtCore, PyQt5.QtWidgets
+preloaded = set(sys.modules)
+start = time.perf_counter()
+importlib.import_module({package!r} + '.qgis_solr')
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, sorted(set(sys.modules) - preloaded)]))
+"""
+
+INIT_GUI_SNIPPET = """
+import importlib, json, sys
+from unittest import mock
+from qgis.core import QgsApplication
+import qgis.gui, qgis.PyQt.QtCore, PyQt5.QtWidgets
+app = QgsApplication([], False)
+app.initQgis()
+preloaded = set(sys.modules)
+plugin = importlib.import_module({package!r} + '.qgis_solr')
+iface = mock.MagicMock()
+iface.mainWindow.return_value = None
+with mock.patch.object(plugin, 'QTimer') as timer:
+    # Run what QGIS would run once it finished loading right away
+    timer.singleShot.side_effect = lambda inDelay, inCallback: inCallback()
+    plugin.QGISSolr(iface).initGui()
+print(json.dumps(sorted(set(sys.modules) - preloaded)))
+"""
+
+
+def measure_plugin_import():
+    """Import the plugin module the way QGIS does, in a fresh interpreter.
+
+    :returns: Seconds the import took and the names of the modules it loaded.
+        Names of plugin modules are given without the package prefix.
+    :rtype: (float, list)
+    """
+    import json
+    import os
+    import subprocess
+
+    plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    package = os.path.basename(plugin_dir)
+
+    output = subprocess.check_output(
+        [sys.executable, '-c', IMPORT_SNIPPET.format(package=package)],
+        cwd=os.path.dirname(plugin_dir))
+    seconds, modules = json.loads(output.decode('utf-8').splitlines()[-1])
+
+    prefix = package + '.'
+    return seconds, [name[len(prefix):] if name.startswith(prefix) else name for name in modules]
+
+
+def load_plugin_gui():
+    """Load the plugin the way QGIS does, including initGui and what it
+    schedules once QGIS has finished loading, in a fresh interpreter.
+
+    :returns: Names of the modules loaded, with plugin modules given without
+        the package prefix.
+    :rtype: list
+    """
+    import json
+    import os
+    import subprocess
+
+    plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    package = os.path.basename(plugin_dir)
+
+    output = subprocess.check_output(
+        [sys.executable, '-c', INIT_GUI_SNIPPET.format(package=package)],
+        cwd=os.path.dirname(plugin_dir))
+    modules = json.loads(output.decode('utf-8').splitlines()[-1])
+
+    prefix = package + '.'
+    return [name[len(prefix):] if name.startswith(prefix) else name for name in modules]